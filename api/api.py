@@ -1,21 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import HTMLResponse
 from fastapi.responses import PlainTextResponse
 from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from pydantic import BaseModel, EmailStr, HttpUrl, field_validator
+from pydantic import BaseModel, EmailStr, Field, HttpUrl, field_validator
 from typing import List, Literal, Optional
 from datetime import datetime
 from pathlib import Path
 import psycopg2
 from psycopg2 import pool as psycopg2_pool
 from contextlib import contextmanager
+from urllib.parse import urlparse
 import pytz
+import asyncio
 import logging
 import traceback
-import markdown
 import os
 from dotenv import load_dotenv
 import re
@@ -25,6 +28,7 @@ from api.websocket_manager import WebSocketManager
 import redis.asyncio as aioredis
 import redis
 import json
+import time
 import uuid
 
 ws_manager = WebSocketManager()
@@ -80,7 +84,10 @@ def get_db_config():
 from api.auth_manager import AuthManager
 from web_crawler.crawler import main as crawl_main
 from web_crawler.config import CrawlConfig
-from web_crawler.celery_tasks import crawl_website, crawl_single_page, crawl_links
+from web_crawler.dns_cache import DnsResolutionError, DnsTemporaryError, dns_cache
+from web_crawler.celery_tasks import BATCH_TTL, crawl_website, crawl_single_page, crawl_links
+from web_crawler.scheduler import CrawlJob, scheduler, tenant_of
+from web_crawler.progress import CELERY_STATES, TERMINAL_STATES, mark_queued, parse_progress, progress_key
 from api.auth_routes import (
     SignupOTPRequest,
     VerifyOTPRequest,
@@ -94,6 +101,10 @@ from api.auth_routes import (
 )
 from api.contact_routes import router as contact_router
 from api.search_routes import router as search_router
+from api.bundle_routes import router as bundle_router
+from api.pagination import decode_cursor, encode_cursor, project_fields
+from api.file_routes import router as file_router, not_modified, resolve_artifact_path, stream_content_json
+from api.render_cache import needs_streaming, render_cache, render_chunks, render_key
 
 # ================= LOGGING =================
 
@@ -122,6 +133,8 @@ auth_manager: Optional[AuthManager] = None
 # ── Routers ──
 app.include_router(contact_router)
 app.include_router(search_router)
+app.include_router(file_router)
+app.include_router(bundle_router)
 
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -247,8 +260,11 @@ class CrawlRequest(BaseModel):
     enable_html: bool = False
     enable_ss: bool = False
     enable_seo: bool = False
+    enable_structured: bool = False
     proxy: Optional[Literal["basic", "stealth", "enhanced", "auto"]] = None
+    search_scrape_results: int = Field(0, ge=0, le=10)
     user_id: Optional[int] = None
+    priority: Literal["high", "normal", "low"] = "normal"
 
 class CrawlResponse(BaseModel):
     status_code: int = 200
@@ -263,6 +279,40 @@ class CrawlResponse(BaseModel):
     Markdown: bool
     status: str
 
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))
+
+class BatchCrawlOptions(BaseModel):
+    crawl_mode: Literal["single", "all", "links"] = "single"
+    enable_md: bool = False
+    enable_html: bool = False
+    enable_ss: bool = False
+    enable_seo: bool = False
+    enable_structured: bool = False
+    proxy: Optional[Literal["basic", "stealth", "enhanced", "auto"]] = None
+    user_id: Optional[int] = None
+    priority: Literal["high", "normal", "low"] = "normal"
+
+class BatchCrawlRequest(BatchCrawlOptions):
+    urls: List[HttpUrl] = Field(..., min_length=1)
+
+class BatchCrawlItem(BaseModel):
+    crawl_id: str
+    url: str
+
+class BatchRejectedUrl(BaseModel):
+    url: str
+    reason: str
+
+class BatchCrawlResponse(BaseModel):
+    status_code: int = 200
+    status: str = "queued"
+    batch_id: str
+    crawl_mode: str
+    created_at: str
+    total: int
+    crawls: List[BatchCrawlItem]
+    rejected: List[BatchRejectedUrl] = []
+
 class PagePaths(BaseModel):
     url: Optional[str] = None
     title: Optional[str] = None
@@ -278,23 +328,31 @@ class CrawlPathsResponse(BaseModel):
     status: str = "success"
     crawl_id: str
     pages: List[PagePaths]
+    next_cursor: Optional[str] = None
 
+# Fields are optional so `?fields=` projections validate; unselected ones are left unset
 class UserCrawlJobResponse(BaseModel):
     user_id: Optional[int] = None
     crawl_id: str
-    url: str
-    crawl_mode: str
-    seo: bool
-    html: bool
-    screenshot: bool
-    markdown: bool
+    url: Optional[str] = None
+    crawl_mode: Optional[str] = None
+    seo: Optional[bool] = None
+    html: Optional[bool] = None
+    screenshot: Optional[bool] = None
+    markdown: Optional[bool] = None
     links_file_path: Optional[str] = None
-    created_at: datetime
+    created_at: Optional[datetime] = None
 
 class UserCrawlsResponse(BaseModel):
     status_code: int = 200
     status: str = "success"
     crawls: List[UserCrawlJobResponse]
+    next_cursor: Optional[str] = None
+
+USER_CRAWL_FIELDS = ("user_id", "crawl_id", "url", "crawl_mode", "seo", "html",
+                     "screenshot", "markdown", "links_file_path", "created_at")
+PAGE_PATH_FIELDS = ("url", "title", "markdown_file", "html_file", "screenshot",
+                    "seo_json", "seo_md", "seo_xlsx")
 
 # ================= HEALTH =================
 
@@ -303,177 +361,90 @@ def root():
     return {"status": "running"}
 
 # ================= CRAWLER ENDPOINT =================
-def _run_background_crawl_task(client_id: str, **kwargs):
-    """Wrapper to run synchronous crawls (single, links) and persist their completion to DB."""
-    # Run the actual crawl
-    summary = crawl_main(**kwargs)
-    
-    # Persist the completion to the database directly
-    # This prevents WebSockets from hanging if they connect AFTER the short crawl completes
-    try:
-        with get_pooled_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE crawl_jobs SET updated_at = %s, links_file_path = %s, summary_file_path = %s WHERE crawl_id = %s",
-                (datetime.now(), summary.get("links_file_path"), summary.get("summary_file_path"), client_id)
-            )
-            cur.execute(
-                """
-                INSERT INTO crawl_events (crawl_id, event_type, url, title, markdown_file, html_file, screenshot, seo_json, seo_md, seo_xlsx)
-                VALUES (%s, 'page_processed', %s, 'Scraped Page', %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (crawl_id, url) DO NOTHING
-                """,
-                (client_id, summary.get("start_url", ""), summary.get("markdown_file"), summary.get("html_file"), summary.get("screenshot"), summary.get("seo_json"), summary.get("seo_md"), summary.get("seo_xlsx"))
-            )
-            cur.execute(
-                """
-                INSERT INTO crawl_events (crawl_id, event_type, url, title, markdown_file)
-                VALUES (%s, 'crawl_completed', '', 'Crawl Completed', %s)
-                ON CONFLICT (crawl_id, url) DO NOTHING
-                """,
-                (client_id, summary.get("markdown_file"))
-            )
-            conn.commit()
-            cur.close()
-    except Exception as e:
-        logger.error(f"Failed to persist BG crawl completion for {client_id}: {e}")
-        
+def _crawl_config(proxy: Optional[str] = None, search_scrape_results: int = 0) -> CrawlConfig:
+    config = CrawlConfig(
+        max_pages=10,
+        max_workers=4,
+        headless=True,
+        use_stealth=True
+    )
+    if proxy:
+        config.proxy_mode = proxy
+    if search_scrape_results:
+        config.search_scrape_results = search_scrape_results
+    return config
+
+def _celery_config_dict(config: CrawlConfig) -> dict:
+    """The CrawlConfig fields a Celery worker needs (JSON-serialisable)."""
+    return {
+        "max_pages": config.max_pages,
+        "max_workers": config.max_workers,
+        "headless": config.headless,
+        "use_stealth": config.use_stealth,
+        "output_dir": str(config.output_dir),  # ✅ convert Path → str
+        "proxy": config.proxy,
+        "basic_proxies": config.basic_proxies,
+        "stealth_proxies": config.stealth_proxies,
+        "enhanced_proxies": config.enhanced_proxies,
+        "proxy_mode": config.proxy_mode,
+        "proxy_server": config.proxy_server,
+        "proxy_username": config.proxy_username,
+        "proxy_password": config.proxy_password,
+        "search_scrape_results": config.search_scrape_results,
+    }
+
+def _crawl_job(crawl_mode: str, crawl_id: str, url: str, task_kwargs: dict, priority: str) -> CrawlJob:
+    """The Celery task for `crawl_mode`; task_routes sends it to crawl_queue / page_queue / map_queue."""
+    if crawl_mode == "all":
+        task, kwargs = crawl_website, dict(start_url=url, crawl_mode="all", **task_kwargs)
+    else:
+        task = crawl_single_page if crawl_mode == "single" else crawl_links
+        kwargs = dict(url=url, enable_json=False, **task_kwargs)
+    return CrawlJob(id=crawl_id, task=task.name, kwargs=kwargs, priority=priority)
+
+async def _validate_hostname(url: str) -> None:
+    """Reject URLs whose host does not resolve (cached, off the threadpool)."""
+    hostname = urlparse(url).hostname
+    if not hostname:
+        return
     try:
-        from web_crawler.redis_events import publish_event
-        # Publish page_processed for the single page so frontend grabs SEO/HTML/Screenshot
-        publish_event(
-            crawl_id=client_id,
-            payload={
-                "type": "page_processed",
-                "page": 1,
-                "url": summary.get("start_url", ""),
-                "title": "Scraped Page",
-                "markdown_file": summary.get("markdown_file"),
-                "html_file": summary.get("html_file"),
-                "screenshot": summary.get("screenshot"),
-                "seo_json": summary.get("seo_json"),
-                "seo_md": summary.get("seo_md"),
-                "seo_xlsx": summary.get("seo_xlsx")
-            }
-        )
-        
-        # Then publish completion as before
-        publish_event(
-            crawl_id=client_id,
-            payload={
-                "type": "crawl_completed",
-                "summary": summary
-            }
+        await dns_cache.resolve_async(hostname)
+    except DnsResolutionError:
+        raise HTTPException(
+            status_code=400,
+            detail=f'DNS resolution failed for hostname "{hostname}". This means the domain name could not be translated to an IP address. Possible causes: (1) The domain name is misspelled (check for typos), (2) The domain does not exist or has expired, (3) The DNS servers are temporarily unavailable, or (4) The domain was recently registered and DNS has not propagated yet. Please verify the URL is correct and the website exists.'
         )
-    except Exception as e:
-        logger.error(f"Failed to publish Redis event for BG crawl completion for {client_id}: {e}")
+    except (asyncio.TimeoutError, DnsTemporaryError):
+        # A slow or failing resolver says nothing about the domain — let the crawl find out
+        logger.warning(f"DNS lookup for {hostname} timed out or failed; accepting crawl request")
 
 @app.post("/crawler", response_model=CrawlResponse)
-def run_crawler(payload: CrawlRequest, background_tasks: BackgroundTasks):
+async def run_crawler(payload: CrawlRequest):
     """
-    single → direct crawl (no celery)
-    all    → celery multiprocess crawl
-    links  → celery multiprocess crawl
+    single → celery page task (page_queue)
+    all    → celery multiprocess crawl (crawl_queue)
+    links  → celery map task (map_queue)
+
+    Jobs pass through the scheduler: they are sent to Celery once the
+    user's concurrency quota and worker capacity allow, fairly across users.
     """
-    try:
-        import socket
-        from urllib.parse import urlparse
-        
-        parsed_url = urlparse(str(payload.url))
-        hostname = parsed_url.hostname
-        if hostname:
-            try:
-                socket.gethostbyname(hostname)
-            except socket.gaierror:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f'DNS resolution failed for hostname "{hostname}". This means the domain name could not be translated to an IP address. Possible causes: (1) The domain name is misspelled (check for typos), (2) The domain does not exist or has expired, (3) The DNS servers are temporarily unavailable, or (4) The domain was recently registered and DNS has not propagated yet. Please verify the URL is correct and the website exists.'
-                )
+    await _validate_hostname(str(payload.url))
+    # Enqueueing and the DB insert are blocking — keep them off the event loop
+    return await run_in_threadpool(_submit_crawl, payload)
 
+def _submit_crawl(payload: CrawlRequest):
+    try:
         ist = pytz.timezone("Asia/Kolkata")
         created_at = datetime.now(ist)
 
         # ---------- CONFIG ----------
-        config = CrawlConfig(
-            max_pages=10,
-            max_workers=4,
-            headless=True,
-            use_stealth=True
-        )
-        if payload.proxy:
-            config.proxy_mode = payload.proxy
-
-        # ---------- SINGLE PAGE ----------
-        if payload.crawl_mode == "single":
-            crawl_id = uuid.uuid4().hex
-
-            background_tasks.add_task(
-                _run_background_crawl_task,
-                client_id=crawl_id,
-                start_url=str(payload.url),
-                crawl_mode="single",
-                enable_links=True,
-                enable_md=payload.enable_md,
-                enable_html=payload.enable_html,
-                enable_ss=payload.enable_ss,
-                enable_seo=payload.enable_seo,
-                config=config
-            )
-
-            markdown_path = ""
-            status = "queued"
-            task_id = None
-
-        elif payload.crawl_mode == "links":
-            crawl_id = uuid.uuid4().hex
-
-            background_tasks.add_task(
-                _run_background_crawl_task,
-                client_id=crawl_id,
-                start_url=str(payload.url),
-                crawl_mode="links",
-                enable_links=True,
-                enable_md=payload.enable_md,
-                enable_html=payload.enable_html,
-                enable_ss=payload.enable_ss,
-                enable_seo=payload.enable_seo,
-                config=config
-            )
-
-            markdown_path = ""
-            status = "queued"
-            task_id = None
+        config = _crawl_config(payload.proxy, payload.search_scrape_results)
 
-        # ---------- FULL SITE (CELERY) ----------
-        else:
-            task = crawl_website.delay(
-                start_url=str(payload.url),
-                config_dict = {
-                    "max_pages": config.max_pages,
-                    "max_workers": config.max_workers,
-                    "headless": config.headless,
-                    "use_stealth": config.use_stealth,
-                    "output_dir": str(config.output_dir),  # ✅ convert Path → str
-                    "proxy": config.proxy,
-                    "basic_proxies": config.basic_proxies,
-                    "stealth_proxies": config.stealth_proxies,
-                    "enhanced_proxies": config.enhanced_proxies,
-                    "proxy_mode": config.proxy_mode,
-                    "proxy_server": config.proxy_server,
-                    "proxy_username": config.proxy_username,
-                    "proxy_password": config.proxy_password,
-                },
-                crawl_mode="all",
-                enable_md=payload.enable_md,
-                enable_html=payload.enable_html,
-                enable_ss=payload.enable_ss,
-                enable_seo=payload.enable_seo,
-            )
-
-            crawl_id = task.id
-            markdown_path = ""
-            status = "queued"
-            task_id = task.id
+        # crawl_id doubles as the Celery task id; it is assigned up front so the
+        # crawl_jobs row exists before a (fast) worker writes events against it
+        crawl_id = str(uuid.uuid4())
+        task_id = crawl_id
+        status = "queued"
 
         # ---------- DB INSERT ----------
         with get_pooled_connection() as conn:
@@ -500,6 +471,25 @@ def run_crawler(payload: CrawlRequest, background_tasks: BackgroundTasks):
             conn.commit()
             cur.close()
 
+        task_kwargs = dict(
+            config_dict=_celery_config_dict(config),
+            enable_md=payload.enable_md,
+            enable_html=payload.enable_html,
+            enable_ss=payload.enable_ss,
+            enable_seo=payload.enable_seo,
+            enable_structured=payload.enable_structured,
+        )
+
+        # ---------- SCHEDULE (CELERY) ----------
+        # Crawls run on the workers, never in the API process. The progress
+        # hash is seeded first so a fast worker's "running" is never overwritten
+        mark_queued([(crawl_id, str(payload.url))], payload.crawl_mode,
+                    config.max_pages if payload.crawl_mode == "all" else 1)
+        scheduler.submit(
+            tenant_of(payload.user_id),
+            [_crawl_job(payload.crawl_mode, crawl_id, str(payload.url), task_kwargs, payload.priority)],
+        )
+
         return {
             "status_code": 200,
             "crawl_id": crawl_id,
@@ -520,106 +510,415 @@ def run_crawler(payload: CrawlRequest, background_tasks: BackgroundTasks):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/crawler/scheduler")
+def scheduler_stats():
+    """Worker capacity, crawls in flight and pending crawls per user."""
+    if not scheduler.enabled:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, **scheduler.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Scheduler unavailable: {e}")
+
+# ================= BATCH CRAWLS =================
+
+async def _batch_urls(urls: List[str]) -> tuple:
+    """De-duplicate `urls` and drop those whose host does not resolve (one lookup per host)."""
+    unique = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    if not unique:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(unique) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_URLS} URLs")
+
+    hosts = {u: (urlparse(u).hostname or "") for u in unique}
+    distinct = [h for h in dict.fromkeys(hosts.values()) if h]
+
+    async def check(host: str) -> Optional[str]:
+        try:
+            await dns_cache.resolve_async(host)
+        except DnsResolutionError:
+            return "DNS resolution failed"
+        except (asyncio.TimeoutError, DnsTemporaryError):
+            return None
+        return None
+
+    failures = dict(zip(distinct, await asyncio.gather(*(check(h) for h in distinct))))
+
+    accepted, rejected = [], []
+    for url in unique:
+        host = hosts[url]
+        if urlparse(url).scheme not in ("http", "https") or not host:
+            rejected.append(BatchRejectedUrl(url=url, reason="Invalid URL"))
+        elif failures.get(host):
+            rejected.append(BatchRejectedUrl(url=url, reason=failures[host]))
+        else:
+            accepted.append(url)
+    return accepted, rejected
+
+def _submit_batch(urls: List[str], options: BatchCrawlOptions, rejected: List[BatchRejectedUrl]) -> BatchCrawlResponse:
+    """One INSERT for every crawl_jobs row, one scheduler submission for every task."""
+    from psycopg2.extras import execute_values
+
+    if not urls:
+        raise HTTPException(status_code=400, detail={"message": "No valid URLs in batch",
+                                                     "rejected": [r.model_dump() for r in rejected]})
+
+    ist = pytz.timezone("Asia/Kolkata")
+    created_at = datetime.now(ist)
+    batch_id = uuid.uuid4().hex
+    config_dict = _celery_config_dict(_crawl_config(options.proxy))
+    # crawl_id doubles as the Celery task id, as for single full-site crawls
+    crawls = [BatchCrawlItem(crawl_id=str(uuid.uuid4()), url=url) for url in urls]
+
+    with get_pooled_connection() as conn:
+        cur = conn.cursor()
+        execute_values(
+            cur,
+            """
+            INSERT INTO crawl_jobs
+            (crawl_id, url, crawl_mode, created_at, task_id, SEO, HTML, Screenshot, Markdown, user_id, batch_id)
+            VALUES %s
+            """,
+            [
+                (c.crawl_id, c.url, options.crawl_mode, created_at, c.crawl_id, options.enable_seo,
+                 options.enable_html, options.enable_ss, options.enable_md, options.user_id, batch_id)
+                for c in crawls
+            ],
+            page_size=500,
+        )
+        conn.commit()
+        cur.close()
+
+    # Counters first, so progress from the fastest tasks is never lost
+    key = f"batch:{batch_id}"
+    redis_client_sync.hset(key, mapping={"total": len(crawls), "completed": 0, "failed": 0,
+                                         "created_at": created_at.isoformat()})
+    redis_client_sync.expire(key, BATCH_TTL)
+
+    task_kwargs = dict(
+        config_dict=config_dict,
+        enable_md=options.enable_md,
+        enable_html=options.enable_html,
+        enable_ss=options.enable_ss,
+        enable_seo=options.enable_seo,
+        enable_structured=options.enable_structured,
+        batch_id=batch_id,
+    )
+    # Same routing as /crawler; the user's quota keeps a large batch from starving others
+    mark_queued([(c.crawl_id, c.url) for c in crawls], options.crawl_mode,
+                config_dict["max_pages"] if options.crawl_mode == "all" else 1)
+    scheduler.submit(
+        tenant_of(options.user_id),
+        [_crawl_job(options.crawl_mode, c.crawl_id, c.url, task_kwargs, options.priority) for c in crawls],
+    )
+
+    logger.info(f"Queued batch {batch_id}: {len(crawls)} crawls, {len(rejected)} rejected")
+    return BatchCrawlResponse(
+        batch_id=batch_id,
+        crawl_mode=options.crawl_mode,
+        created_at=created_at.isoformat(),
+        total=len(crawls),
+        crawls=crawls,
+        rejected=rejected,
+    )
+
+@app.post("/crawler/batch", response_model=BatchCrawlResponse)
+async def run_batch_crawler(payload: BatchCrawlRequest):
+    """
+    Queue one crawl per URL with shared options. Progress for the whole
+    batch is streamed on /ws/batch/{batch_id}.
+    """
+    accepted, rejected = await _batch_urls([str(u) for u in payload.urls])
+    options = BatchCrawlOptions(**payload.model_dump(exclude={"urls"}))
+    return await run_in_threadpool(_submit_batch, accepted, options, rejected)
+
+@app.post("/crawler/batch/upload", response_model=BatchCrawlResponse)
+async def run_batch_crawler_upload(
+    file: UploadFile = File(..., description="Text or CSV file, one URL per line (first column)"),
+    crawl_mode: Literal["single", "all", "links"] = Form("single"),
+    enable_md: bool = Form(False),
+    enable_html: bool = Form(False),
+    enable_ss: bool = Form(False),
+    enable_seo: bool = Form(False),
+    enable_structured: bool = Form(False),
+    proxy: Optional[Literal["basic", "stealth", "enhanced", "auto"]] = Form(None),
+    user_id: Optional[int] = Form(None),
+    priority: Literal["high", "normal", "low"] = Form("normal"),
+):
+    """Same as /crawler/batch with the URL list uploaded as a file."""
+    text = (await file.read()).decode("utf-8", errors="replace")
+    # Every non-blank line is a candidate: non-http(s) entries come back under `rejected`
+    urls = []
+    for line in text.splitlines():
+        first = line.split(",", 1)[0].strip().strip('"')
+        if first:
+            urls.append(first)
+
+    accepted, rejected = await _batch_urls(urls)
+    options = BatchCrawlOptions(
+        crawl_mode=crawl_mode, enable_md=enable_md, enable_html=enable_html, enable_ss=enable_ss,
+        enable_seo=enable_seo, enable_structured=enable_structured, proxy=proxy, user_id=user_id,
+        priority=priority,
+    )
+    return await run_in_threadpool(_submit_batch, accepted, options, rejected)
+
+BATCH_WS_SNAPSHOT_INTERVAL = float(os.getenv("BATCH_WS_SNAPSHOT_INTERVAL", "15"))
+BATCH_WS_TIMEOUT = float(os.getenv("BATCH_WS_TIMEOUT", "3600"))
+
+async def _batch_snapshot(batch_id: str) -> Optional[dict]:
+    counts = await redis_client_async.hgetall(f"batch:{batch_id}")
+    if not counts:
+        return None
+    return {
+        "type": "batch_progress",
+        "batch_id": batch_id,
+        "total": int(counts.get("total", 0)),
+        "completed": int(counts.get("completed", 0)),
+        "failed": int(counts.get("failed", 0)),
+    }
+
+@app.websocket("/ws/batch/{batch_id}")
+async def batch_ws(websocket: WebSocket, batch_id: str):
+    """
+    Aggregate progress of a batch: a snapshot, then one event per finished
+    crawl, with a fresh snapshot every BATCH_WS_SNAPSHOT_INTERVAL seconds
+    (so a missed event cannot stall the client). The socket closes after
+    batch_completed, or with a batch_timeout event after BATCH_WS_TIMEOUT.
+    """
+    await websocket.accept()
+
+    key = f"batch:{batch_id}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_WS_TIMEOUT
+    # Subscribe before reading the snapshot so no event falls in between
+    pubsub = redis_client_async.pubsub()
+    await pubsub.subscribe(key)
+    try:
+        snapshot = await _batch_snapshot(batch_id)
+        if snapshot is None:
+            await websocket.send_json({"type": "error", "batch_id": batch_id, "message": "Unknown or expired batch"})
+            await websocket.close()
+            return
+
+        next_snapshot = loop.time()
+        while True:
+            now = loop.time()
+            if now >= next_snapshot:
+                snapshot = await _batch_snapshot(batch_id) or snapshot
+                await websocket.send_json(snapshot)
+                if snapshot["completed"] + snapshot["failed"] >= snapshot["total"]:
+                    await websocket.send_json({**snapshot, "type": "batch_completed"})
+                    break
+                next_snapshot = now + BATCH_WS_SNAPSHOT_INTERVAL
+            if now >= deadline:
+                await websocket.send_json({**snapshot, "type": "batch_timeout"})
+                break
+
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=max(0.0, min(next_snapshot, deadline) - loop.time()),
+            )
+            if message is None:
+                continue
+            await websocket.send_text(message["data"])
+            if json.loads(message["data"]).get("type") == "batch_completed":
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Batch websocket disconnected for {batch_id}")
+    finally:
+        await pubsub.unsubscribe(key)
+        await pubsub.close()
+
 # ================= TASK STATUS =================
 
-@app.get("/crawler/status/{task_id}")
-def get_task_status(task_id: str):
+def _celery_status(task_id: str, include_result: bool) -> dict:
     from web_crawler.celery_config import celery_app
 
     task = celery_app.AsyncResult(task_id)
+    ready = task.ready()
+    return {
+        "state": task.state,
+        "progress": task.info if task.state == "PROGRESS" else None,
+        "result": task.result if (include_result and ready) else None,
+    }
+
+_CRAWL_TASKS = {"all": crawl_website, "single": crawl_single_page, "links": crawl_links}
+
+def _progress_stale(progress: dict) -> bool:
+    """A started crawl whose hash has not moved for longer than its task may run (killed or lost)."""
+    if progress.get("state") in TERMINAL_STATES or progress.get("state") == "queued":
+        return False
+    task = _CRAWL_TASKS.get(progress.get("crawl_mode"))
+    time_limit = getattr(task, "time_limit", None) or crawl_website.time_limit
+    return time.time() - (progress.get("updated_at") or 0) > time_limit
+
+async def _wait_for_progress(task_id: str, since: int, wait: float) -> None:
+    """Block until the progress hash moves past `since` or `wait` seconds pass."""
+    key = progress_key(task_id)
+    deadline = asyncio.get_running_loop().time() + wait
+    pubsub = redis_client_async.pubsub()
+    await pubsub.subscribe(key)
+    try:
+        # Re-check after subscribing so an update in between is not missed
+        if int(await redis_client_async.hget(key, "version") or 0) > since:
+            return
+        while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+            if await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining):
+                return
+    finally:
+        await pubsub.unsubscribe(key)
+        await pubsub.close()
+
+@app.get("/crawler/status/{task_id}")
+async def get_task_status(
+    task_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Long-poll: seconds to wait for a change"),
+    since: Optional[int] = Query(None, description="Progress version the client already has"),
+    include_result: bool = False,
+):
+    """
+    Live crawl progress from the Redis hash the worker keeps up to date
+    (pages done / queued / failed, bytes, ETA); no result-backend read.
+
+    With `wait`, the call returns as soon as the progress version exceeds
+    `since` (default: the current version), or after `wait` seconds.
+    The full summary is only loaded from Celery with `include_result=true`.
+    Crawls without a progress hash (expired, or queued before it existed),
+    and running crawls whose hash has not moved for longer than the task's
+    time limit (killed or lost without a final write), fall back to the
+    Celery result backend.
+    """
+    key = progress_key(task_id)
+    raw = await redis_client_async.hgetall(key)
+
+    if raw and wait and raw.get("state") not in TERMINAL_STATES and not _progress_stale(parse_progress(raw)):
+        current = int(raw.get("version") or 0)
+        await _wait_for_progress(task_id, current if since is None else since, wait)
+        raw = await redis_client_async.hgetall(key)
+
+    if not raw or _progress_stale(parse_progress(raw)):
+        celery_status = await run_in_threadpool(_celery_status, task_id, include_result)
+        return {"status_code": 200, "status": "success", "task_id": task_id, **celery_status}
+
+    progress = parse_progress(raw)
+    result = None
+    if include_result and progress.get("state") in TERMINAL_STATES:
+        result = (await run_in_threadpool(_celery_status, task_id, True))["result"]
 
     return {
         "status_code": 200,
         "status": "success",
         "task_id": task_id,
-        "state": task.state,
-        "result": task.result if task.ready() else None
+        "state": CELERY_STATES.get(progress.get("state"), "PENDING"),
+        "version": progress.pop("version", 0),
+        "progress": progress,
+        "result": result,
     }
 
-@app.get("/crawls/user/{user_id}", response_model=UserCrawlsResponse)
-def get_user_crawls(user_id: int):
+@app.get("/crawls/user/{user_id}", response_model=UserCrawlsResponse, response_model_exclude_unset=True)
+def get_user_crawls(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
-    Returns all crawl jobs for a specific user_id.
+    Returns a user's crawl jobs, newest first, one page at a time.
+    Pass `next_cursor` back as `cursor` for the next page; `fields` is an
+    optional comma-separated subset of columns (crawl_id is always included).
     """
+    columns = project_fields(fields, USER_CRAWL_FIELDS, required=("crawl_id",))
+    after = decode_cursor(cursor)
     try:
         from psycopg2.extras import RealDictCursor
         with get_pooled_connection() as conn:
             cur = conn.cursor(cursor_factory=RealDictCursor)
-            
+
+            # Served by idx_crawl_jobs_user_created (user_id, created_at DESC, id DESC)
             cur.execute(
-                """
-                SELECT 
-                    user_id, crawl_id, url, crawl_mode, 
-                    seo, html, 
-                    screenshot, markdown, 
-                    links_file_path, 
-                    created_at
+                f"""
+                SELECT {", ".join(columns)}, id AS _id, created_at AS _created_at
                 FROM crawl_jobs
                 WHERE user_id = %s
-                ORDER BY created_at DESC
+                  {"AND (created_at, id) < (%s, %s)" if after else ""}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
                 """,
-                (user_id,)
+                (user_id, *(after or ()), limit + 1)
             )
             rows = cur.fetchall()
-            
-            crawls = []
-            for row in rows:
-                crawls.append(UserCrawlJobResponse(**row))
-                
             cur.close()
-        
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["_created_at"], rows[-1]["_id"])
+
+        crawls = [
+            UserCrawlJobResponse(**{k: v for k, v in row.items() if not k.startswith("_")})
+            for row in rows
+        ]
+
         return UserCrawlsResponse(
             status_code=200,
             status="success",
-            crawls=crawls
+            crawls=crawls,
+            next_cursor=next_cursor
         )
-        
+
     except Exception as e:
         logger.error(f"Error fetching user crawls for {user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to fetch user crawls: {str(e)}")
 
-@app.get("/crawler/paths/{crawl_id}", response_model=CrawlPathsResponse)
-def get_crawl_paths(crawl_id: str):
+@app.get("/crawler/paths/{crawl_id}", response_model=CrawlPathsResponse, response_model_exclude_unset=True)
+def get_crawl_paths(
+    crawl_id: str,
+    limit: int = Query(500, ge=1, le=2000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
-    Returns all file paths for a specific crawl_id from the crawl_events table.
+    Returns the file paths of a crawl's processed pages from the crawl_events
+    table, oldest first, one page at a time (see get_user_crawls for
+    `cursor` / `fields`).
     """
+    columns = project_fields(fields, PAGE_PATH_FIELDS)
+    after = decode_cursor(cursor)
     try:
         with get_pooled_connection() as conn:
             cur = conn.cursor()
-            
+
+            # Served by idx_crawl_events_crawl_type_created (crawl_id, event_type, created_at, id)
             cur.execute(
-                """
-                SELECT url, title, markdown_file, html_file, screenshot, seo_json, seo_md, seo_xlsx
+                f"""
+                SELECT {", ".join(columns)}, created_at, id
                 FROM crawl_events
                 WHERE crawl_id = %s AND event_type = 'page_processed'
-                ORDER BY created_at ASC
+                  {"AND (created_at, id) > (%s, %s)" if after else ""}
+                ORDER BY created_at ASC, id ASC
+                LIMIT %s
                 """,
-                (crawl_id,)
+                (crawl_id, *(after or ()), limit + 1)
             )
             rows = cur.fetchall()
-            
-            pages = []
-            for row in rows:
-                pages.append(PagePaths(
-                    url=row[0],
-                    title=row[1],
-                    markdown_file=row[2],
-                    html_file=row[3],
-                    screenshot=row[4],
-                    seo_json=row[5],
-                    seo_md=row[6],
-                    seo_xlsx=row[7]
-                ))
-                
             cur.close()
-        
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+
+        pages = [PagePaths(**dict(zip(columns, row))) for row in rows]
+
         return CrawlPathsResponse(
             status_code=200,
             status="success",
             crawl_id=crawl_id,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
-        
+
     except Exception as e:
         logger.error(f"Error fetching crawl paths for {crawl_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch crawl paths: {str(e)}")
@@ -627,72 +926,30 @@ def get_crawl_paths(crawl_id: str):
 # ================= MARKDOWN RENDER =================
 
 @app.get("/crawl/render")
-def render_markdown(file_path: str):
-    md_path = Path(file_path)
+def render_markdown(request: Request, file_path: str):
+    md_path = resolve_artifact_path(file_path)
 
-    if not md_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    # ETag follows the file's mtime/size, so an unchanged page costs a 304
+    key = render_key(md_path)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, max-age=0, must-revalidate"}
+    if not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    content = md_path.read_text(encoding="utf-8")
-    html = markdown.markdown(content, extensions=["fenced_code", "tables", "toc"])
+    if needs_streaming(md_path):
+        return StreamingResponse(render_chunks(md_path), media_type="text/html; charset=utf-8", headers=headers)
 
-    return HTMLResponse(content=html)
+    html = render_cache.render(md_path, key)
+    return HTMLResponse(content=html, headers=headers)
 
 @app.get("/crawl/get/content")
 def get_markdown(file_path: str):
     """
-    Return markdown content + metadata as JSON
+    Return markdown content + metadata as JSON.
+    The envelope is streamed from disk; raw bytes are served by GET /crawl/file.
     """
     try:
-        md_path = Path(file_path).resolve()
-        filename = md_path.name
-        filename_parts = filename.split(".")
-        formatted_title = filename_parts[0].replace("_", " ").title()
-        if formatted_title == "Links":
-            clean_title = formatted_title
-        else:
-            clean_title = formatted_title[2:]  # strip first 2 characters
-
-        if not md_path.exists() or not md_path.is_file():
-            raise HTTPException(status_code=404, detail="File not found")
-
-        base_dir = Path("web_crawler/crawl_output-api").resolve()
-        # Security check: ensure file is within output directory
-        if base_dir not in md_path.parents:
-            # We relax this slightly to allow relative path resolutions if needed, 
-            # but ideally we should keep it strict. 
-            # If the user passes absolute path that basically matches, it's fine.
-            # For now, let's keep the check but ensure it's robust.
-            pass
-            # raise HTTPException(status_code=403, detail="Invalid file path")
-
-        suffix = md_path.suffix.lower()
-
-        if suffix == ".md":
-            content = md_path.read_text(encoding="utf-8")
-            return JSONResponse(content={"status_code": 200, "status": "success", "title": clean_title, "markdown": content})
-
-        elif suffix == ".json":
-            # Return parsed JSON
-            content = json.loads(md_path.read_text(encoding="utf-8"))
-            return JSONResponse(content={"status_code": 200, "status": "success", "title": clean_title, "json": content})
-
-        elif suffix == ".xlsx":
-            # Return base64 encoded Excel
-            import base64
-            encoded = base64.b64encode(md_path.read_bytes()).decode("utf-8")
-            return JSONResponse(content={"status_code": 200, "status": "success", "title": clean_title, "xlsx": encoded})
-
-        elif suffix == ".png":
-            # Return base64 encoded Image
-            import base64
-            encoded = base64.b64encode(md_path.read_bytes()).decode("utf-8")
-            return JSONResponse(content={"status_code": 200, "status": "success", "title": clean_title, "image": encoded})
-
-        else:
-            # Default/Fallback to text
-            content = md_path.read_text(encoding="utf-8")
-            return JSONResponse(content={"status_code": 200, "status": "success", "title": clean_title, "content": content})
+        md_path = resolve_artifact_path(file_path)
+        return stream_content_json(md_path)
 
     except HTTPException:
         raise
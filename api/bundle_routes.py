@@ -0,0 +1,217 @@
+"""
+Crawl Bundle Routes
+
+GET /crawler/bundle/{crawl_id} streams a crawl's output directory as one
+archive, built on the fly while it is being sent:
+
+  - zip     → zipfile writing to a non-seekable sink (data descriptors),
+              deflate for text, stored for images / workbooks
+  - tar     → ustar/PAX headers + file bytes + padding, written by hand
+  - tar.gz  → the tar stream through a streaming zlib compressor
+
+Nothing is assembled in memory or on disk: each file is read in
+_CHUNK_SIZE pieces and every piece is yielded as soon as it is encoded.
+
+`include` limits the bundle to some artifact groups, e.g.
+?include=markdown,seo. Cache sidecars (.gz/.br variants, the response
+cache directory) are never included.
+"""
+
+import logging
+import re
+import tarfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from api.file_routes import OUTPUT_ROOT
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/crawler", tags=["Crawl Files"])
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_CHUNK_SIZE = 256 * 1024
+_CRAWL_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# include group → paths relative to the crawl directory
+_GROUPS = {
+    "markdown": ("markdown",),
+    "html": ("html",),
+    "screenshots": ("screenshots",),
+    "seo": ("seo",),
+    "structured": ("structured", "structured.jsonl"),
+    "meta": ("summary.json", "links.txt", "pages.json"),
+}
+_SKIP_SUFFIXES = (".gz", ".br", ".tmp")
+_SKIP_DIRS = frozenset({".response_cache"})
+_STORED_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".webp", ".xlsx", ".zip"})
+
+_MEDIA_TYPES = {"zip": "application/zip", "tar": "application/x-tar", "tar.gz": "application/gzip"}
+
+
+# ── File selection ───────────────────────────────────────────────────────────
+
+def _crawl_dir(crawl_id: str) -> Path:
+    if not _CRAWL_ID_RE.match(crawl_id):
+        raise HTTPException(status_code=400, detail="Invalid crawl_id")
+    crawl_dir = OUTPUT_ROOT / f"crawl_{crawl_id}"
+    if not crawl_dir.is_dir():
+        raise HTTPException(status_code=404, detail="Crawl output not found")
+    return crawl_dir
+
+
+def _iter_files(root: Path, include: Optional[List[str]]) -> Iterator[Path]:
+    if include:
+        unknown = [g for g in include if g not in _GROUPS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown include group(s): {', '.join(unknown)}")
+        starts = [root / rel for group in include for rel in _GROUPS[group]]
+    else:
+        starts = [root]
+
+    for start in starts:
+        if start.is_file():
+            yield start
+        elif start.is_dir():
+            for path in sorted(start.rglob("*")):
+                rel_parts = path.relative_to(root).parts
+                if any(part in _SKIP_DIRS for part in rel_parts):
+                    continue
+                if path.is_file() and not path.name.endswith(_SKIP_SUFFIXES):
+                    yield path
+
+
+def _read_chunks(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+# ── Archive writers ──────────────────────────────────────────────────────────
+
+class _Sink:
+    """Write-only, non-seekable file object that hands out what was written."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._parts.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _zip_stream(root: Path, files: Iterator[Path]) -> Iterator[bytes]:
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for path in files:
+            stat = path.stat()
+            info = zipfile.ZipInfo(
+                str(path.relative_to(root)),
+                date_time=time.localtime(stat.st_mtime)[:6],
+            )
+            info.compress_type = (
+                zipfile.ZIP_STORED if path.suffix.lower() in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            )
+            info.external_attr = 0o644 << 16
+            with zf.open(info, "w", force_zip64=stat.st_size > 0x7FFFFFFF) as dst:
+                for chunk in _read_chunks(path):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _tar_stream(root: Path, files: Iterator[Path]) -> Iterator[bytes]:
+    for path in files:
+        stat = path.stat()
+        info = tarfile.TarInfo(str(path.relative_to(root)))
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        info.mode = 0o644
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        written = 0
+        for chunk in _read_chunks(path):
+            # Never emit more than the header promised, even if the file grew
+            chunk = chunk[: info.size - written]
+            written += len(chunk)
+            yield chunk
+            if written >= info.size:
+                break
+        if written < info.size:
+            yield b"\0" * (info.size - written)
+        remainder = info.size % tarfile.BLOCKSIZE
+        if remainder:
+            yield b"\0" * (tarfile.BLOCKSIZE - remainder)
+    yield b"\0" * (tarfile.BLOCKSIZE * 2)
+
+
+def _gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)    # wbits 31 → gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ── Routes ───────────────────────────────────────────────────────────────────
+
+@router.get("/bundle/{crawl_id}")
+def download_bundle(crawl_id: str, format: str = "zip", include: Optional[str] = None):
+    """
+    Stream every artifact of a crawl as a single zip / tar / tar.gz.
+    `include` is a comma-separated subset of: markdown, html, screenshots,
+    seo, structured, meta.
+    """
+    archive_format = format.strip().lower()
+    if archive_format == "tgz":
+        archive_format = "tar.gz"
+    if archive_format not in _MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be zip, tar or tar.gz")
+
+    root = _crawl_dir(crawl_id)
+    groups = [g.strip().lower() for g in include.split(",") if g.strip()] if include else None
+    files = list(_iter_files(root, groups))
+    if not files:
+        raise HTTPException(status_code=404, detail="No files to bundle")
+
+    if archive_format == "zip":
+        body = _zip_stream(root, iter(files))
+    elif archive_format == "tar":
+        body = _tar_stream(root, iter(files))
+    else:
+        body = _gzip_stream(_tar_stream(root, iter(files)))
+
+    logger.info(f"Streaming {archive_format} bundle of {len(files)} files for crawl {crawl_id}")
+    filename = f"crawl_{crawl_id}.{archive_format}"
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[archive_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -230,11 +230,20 @@ class DatabaseSetup:
             user_id INTEGER,
             links_file_path TEXT,
             summary_file_path TEXT,
+            batch_id VARCHAR(64),
             CONSTRAINT fk_crawl_jobs_user
                 FOREIGN KEY (user_id)
                 REFERENCES users (user_id)
                 ON DELETE CASCADE
         );
+
+        -- Batch submissions (POST /crawler/batch); older tables predate the column
+        ALTER TABLE crawl_jobs ADD COLUMN IF NOT EXISTS batch_id VARCHAR(64);
+        CREATE INDEX IF NOT EXISTS idx_crawl_jobs_batch_id ON crawl_jobs(batch_id);
+
+        -- Keyset pagination for /crawls/user/{user_id}
+        CREATE INDEX IF NOT EXISTS idx_crawl_jobs_user_created
+            ON crawl_jobs(user_id, created_at DESC, id DESC);
         """
 
         conn = None
@@ -296,6 +305,9 @@ class DatabaseSetup:
         $$;
 
         CREATE INDEX IF NOT EXISTS idx_crawl_events_crawl_id ON crawl_events(crawl_id);
+        -- Keyset pagination for /crawler/paths/{crawl_id}
+        CREATE INDEX IF NOT EXISTS idx_crawl_events_crawl_type_created
+            ON crawl_events(crawl_id, event_type, created_at, id);
         """
 
         conn = None
@@ -410,6 +422,51 @@ class DatabaseSetup:
             if conn:
                 conn.close()
 
+    def create_crawl_bandwidth_table(self) -> bool:
+        """
+        Create crawl_bandwidth table if it doesn't exist.
+        Bytes and request counts per crawl, aggregated by scope
+        ('crawl' / 'host' / 'page'), name and proxy tier.
+        """
+        create_table_query = """
+        CREATE TABLE IF NOT EXISTS crawl_bandwidth (
+            id SERIAL PRIMARY KEY,
+            crawl_id VARCHAR(64) NOT NULL,
+            scope VARCHAR(10) NOT NULL,
+            name TEXT NOT NULL DEFAULT '',
+            proxy_tier VARCHAR(20) NOT NULL,
+            bytes BIGINT NOT NULL DEFAULT 0,
+            requests INTEGER NOT NULL DEFAULT 0,
+            recorded_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT fk_bandwidth_crawl_job
+                FOREIGN KEY (crawl_id)
+                REFERENCES crawl_jobs (crawl_id)
+                ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_crawl_bandwidth_crawl_id ON crawl_bandwidth(crawl_id, scope);
+        CREATE INDEX IF NOT EXISTS idx_crawl_bandwidth_tier ON crawl_bandwidth(proxy_tier, recorded_at);
+        """
+
+        conn = None
+        try:
+            conn = self._get_db_connection()
+            cursor = conn.cursor()
+
+            cursor.execute(create_table_query)
+            conn.commit()
+
+            cursor.close()
+            logger.info("✓ crawl_bandwidth table created successfully (or already exists)")
+            return True
+
+        except Exception as e:
+            logger.error(f"✗ Failed to create crawl_bandwidth table: {e}", exc_info=True)
+            return False
+        finally:
+            if conn:
+                conn.close()
+
     def setup_all_tables(self) -> bool:
         logger.info("Starting database setup...")
 
@@ -419,9 +476,10 @@ class DatabaseSetup:
         crawl_events_created = self.create_crawl_events_table()
         failed_pages_created = self.create_failed_crawl_pages_table()
         reported_issues_created = self.create_reported_issues_table()
+        bandwidth_created = self.create_crawl_bandwidth_table()
 
         if all([users_created, otps_created, crawl_jobs_created, crawl_events_created,
-                failed_pages_created, reported_issues_created]):
+                failed_pages_created, reported_issues_created, bandwidth_created]):
             logger.info("✓ Database setup completed successfully")
             return True
         else:
@@ -0,0 +1,239 @@
+"""
+Crawl Artifact File Routes
+
+Serves crawl output files (markdown, HTML, screenshots, SEO workbooks,
+JSON) without loading them into API memory:
+
+  - GET /crawl/file        → raw bytes with the right Content-Type,
+                             HTTP Range (206), ETag / If-None-Match (304)
+                             and an optional gzip / brotli variant
+  - stream_content_json()  → the legacy /crawl/get/content JSON envelope,
+                             produced chunk by chunk (text is JSON-escaped,
+                             binary is base64-encoded in 3-byte-aligned blocks,
+                             .json files are spliced in without re-parsing)
+
+Compressed variants are written once next to the artifact
+("<file>.gz" / "<file>.br") and reused while they are newer than the
+source. Only paths inside the crawl output directory are served.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import mimetypes
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/crawl", tags=["Crawl Files"])
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+OUTPUT_ROOT = (Path(__file__).resolve().parent.parent / "web_crawler" / "crawl_output-api").resolve()
+
+_CHUNK_SIZE = 64 * 1024
+_B64_CHUNK_SIZE = 3 * 16 * 1024       # multiple of 3 → chunks concatenate to valid base64
+_MIN_COMPRESS_BYTES = 1024
+
+_CONTENT_TYPES = {
+    ".md": "text/markdown; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+    ".json": "application/json",
+    ".jsonl": "application/x-ndjson",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+_COMPRESSIBLE = frozenset({".md", ".txt", ".html", ".json", ".jsonl", ".csv", ".xml"})
+_IMAGE_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".webp"})
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def resolve_artifact_path(file_path: str) -> Path:
+    """Resolve `file_path` to an existing file inside the crawl output directory."""
+    try:
+        path = Path(file_path).resolve()
+    except (OSError, RuntimeError):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    if OUTPUT_ROOT not in path.parents:
+        raise HTTPException(status_code=403, detail="Invalid file path")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
+
+
+def content_type(path: Path) -> str:
+    suffix = path.suffix.lower()
+    return _CONTENT_TYPES.get(suffix) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def _etag(path: Path, variant: str = "") -> str:
+    stat = path.stat()
+    suffix = f"-{variant}" if variant else ""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _accepted_encoding(request: Request, path: Path, requested: str) -> Optional[str]:
+    """Pick "br" / "gzip" for compressible files the client accepts (never for Range requests)."""
+    if requested == "none" or "range" in request.headers:
+        return None
+    if path.suffix.lower() not in _COMPRESSIBLE or path.stat().st_size < _MIN_COMPRESS_BYTES:
+        return None
+    accept = request.headers.get("accept-encoding", "").lower()
+    if brotli is not None and "br" in accept and requested in ("auto", "br"):
+        return "br"
+    if "gzip" in accept and requested in ("auto", "gzip"):
+        return "gzip"
+    return None
+
+
+def _compressed_variant(path: Path, encoding: str) -> Path:
+    """Return the cached .gz / .br sibling of `path`, (re)building it when stale."""
+    variant = path.with_name(path.name + (".br" if encoding == "br" else ".gz"))
+    try:
+        if variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return variant
+    except FileNotFoundError:
+        pass
+
+    # A private temp file per request: concurrent builders must not share one
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{variant.name}.", suffix=".tmp", delete=False
+    ) as tmp:
+        try:
+            if encoding == "br":
+                tmp.write(brotli.compress(path.read_bytes(), quality=5))
+            else:
+                with open(path, "rb") as src, gzip.GzipFile(
+                    filename=path.name, mode="wb", compresslevel=6, fileobj=tmp
+                ) as dst:
+                    shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        except BaseException:
+            tmp.close()
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+    Path(tmp.name).replace(variant)
+    return variant
+
+
+def _read_chunks(path: Path, size: int = _CHUNK_SIZE, mode: str = "rb") -> Iterator:
+    kwargs = {"encoding": "utf-8", "errors": "replace"} if "b" not in mode else {}
+    with open(path, mode, **kwargs) as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def display_title(path: Path) -> str:
+    """Title shown by the frontend for an artifact (same rules as before)."""
+    formatted_title = path.name.split(".")[0].replace("_", " ").title()
+    if formatted_title == "Links":
+        return formatted_title
+    return formatted_title[2:]  # strip first 2 characters
+
+
+def stream_content_json(path: Path) -> StreamingResponse:
+    """
+    Stream the /crawl/get/content envelope for `path`:
+    {"status_code": 200, "status": "success", "title": ..., "<key>": <content>}
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".md":
+        key, kind = "markdown", "text"
+    elif suffix == ".json":
+        key, kind = "json", "raw"
+    elif suffix == ".xlsx":
+        key, kind = "xlsx", "base64"
+    elif suffix in _IMAGE_SUFFIXES:
+        key, kind = "image", "base64"
+    else:
+        key, kind = "content", "text"
+
+    head = json.dumps({"status_code": 200, "status": "success", "title": display_title(path)})[:-1]
+
+    def body() -> Iterator[bytes]:
+        yield f'{head}, "{key}": '.encode("utf-8")
+        if kind == "raw":
+            # Already JSON on disk — splice it in instead of parsing and re-serialising
+            if path.stat().st_size == 0:
+                yield b"null"
+            for chunk in _read_chunks(path):
+                yield chunk
+        elif kind == "base64":
+            yield b'"'
+            for chunk in _read_chunks(path, _B64_CHUNK_SIZE):
+                yield base64.b64encode(chunk)
+            yield b'"'
+        else:
+            yield b'"'
+            for chunk in _read_chunks(path, _CHUNK_SIZE, "r"):
+                yield json.dumps(chunk, ensure_ascii=False)[1:-1].encode("utf-8")
+            yield b'"'
+        yield b"}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+# ── Routes ───────────────────────────────────────────────────────────────────
+
+@router.get("/file")
+def get_file(request: Request, file_path: str, compress: str = "auto"):
+    """
+    Serve a crawl artifact as raw bytes.
+
+    Supports Range requests (screenshots / workbooks can be fetched in
+    parts), conditional requests via ETag, and `compress=auto|gzip|br|none`
+    for text artifacts when the client sends a matching Accept-Encoding.
+    """
+    path = resolve_artifact_path(file_path)
+    media_type = content_type(path)
+
+    encoding = _accepted_encoding(request, path, compress.strip().lower())
+    etag = _etag(path, encoding or "")
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=0, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        try:
+            variant = _compressed_variant(path, encoding)
+        except OSError as e:
+            logger.warning(f"Could not build {encoding} variant of {path}: {e}")
+        else:
+            headers["Content-Encoding"] = encoding
+            return FileResponse(variant, media_type=media_type, headers=headers)
+
+    headers["ETag"] = _etag(path)
+    # FileResponse handles Range / If-Range and uses zero-copy send when the server supports it
+    return FileResponse(path, media_type=media_type, headers=headers, filename=path.name,
+                        content_disposition_type="inline")
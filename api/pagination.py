@@ -0,0 +1,53 @@
+"""
+Keyset pagination and field projection for the listing endpoints
+(/crawls/user/{user_id}, /crawler/paths/{crawl_id}).
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of
+the last row returned, so every page is an index range scan
+("WHERE (created_at, id) < (%s, %s) ... LIMIT n") instead of an OFFSET
+that re-reads everything before it. `id` breaks ties between rows
+created in the same instant.
+
+`fields` lets the dashboard ask for only the columns it shows; names are
+checked against a per-endpoint whitelist before they reach SQL.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """(created_at, id) from a cursor produced by encode_cursor(); None for the first page."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def project_fields(fields: Optional[str], allowed: Iterable[str], required: Iterable[str] = ()) -> List[str]:
+    """
+    Columns to select for a comma-separated `fields` parameter.
+    Returns every allowed column when `fields` is empty.
+    """
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+    requested = [f.strip().lower() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    # Keep the table's column order so responses look the same with or without `fields`
+    return [c for c in allowed if c in requested or c in required]
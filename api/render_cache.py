@@ -0,0 +1,210 @@
+"""
+Markdown → HTML render cache for /crawl/render.
+
+The frontend polls and re-renders the same pages, and every request used
+to re-read the file and re-run python-markdown. Rendered HTML is now
+cached under a key built from the file path, mtime and size, so a file
+that changes on disk can never be served stale:
+
+  1. In-process LRU bounded by total HTML bytes
+  2. Redis (shared by all API workers), best effort — failures are ignored
+
+The key doubles as the response ETag, so unchanged pages are answered
+with 304 and no body at all.
+
+Files larger than _STREAM_THRESHOLD are not rendered in one piece:
+render_chunks() splits the markdown at blank lines outside fenced code
+blocks and renders ~_SEGMENT_CHARS at a time, so the response starts
+streaming immediately and peak memory stays bounded. The segments share
+one Markdown instance: link reference definitions are collected in a
+first pass over the file, and heading ids stay unique across segments,
+so the output matches a one-piece render.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+import markdown
+from markdown.extensions.toc import unique
+from markdown.treeprocessors import Treeprocessor
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "toc"]
+
+_STREAM_THRESHOLD = 2 * 1024 * 1024     # bytes of markdown rendered in one piece
+_SEGMENT_CHARS = 256 * 1024
+_MAX_BYTES = int(os.getenv("RENDER_CACHE_MB", "64") or 0) * 1024 * 1024
+_MAX_ENTRY_BYTES = 4 * 1024 * 1024      # larger renders are not cached
+_REDIS_TTL = int(os.getenv("RENDER_CACHE_TTL", "3600") or 0)
+
+_REFERENCE_RE = re.compile(r"^[ ]{0,3}\[[^\[\]]*\]:")     # start of a link reference definition
+
+
+def render_key(path: Path) -> str:
+    """Cache key / ETag for the current on-disk version of `path`."""
+    stat = path.stat()
+    raw = f"{path}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_markdown_text(text: str) -> str:
+    return markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+
+class _SegmentIds(Treeprocessor):
+    """Runs after toc: renames ids already used by an earlier segment, as a one-piece render would."""
+
+    def __init__(self, md, used: Set[str]):
+        super().__init__(md)
+        self.used = used
+
+    def run(self, doc):
+        for el in doc.iter():
+            if "id" in el.attrib:
+                el.attrib["id"] = unique(el.attrib["id"], self.used)
+
+
+def _lines(path: Path) -> Iterator[Tuple[str, bool]]:
+    """(line, inside a fenced code block) for every line of `path`."""
+    in_fence = False
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            stripped = line.lstrip()
+            if stripped.startswith("```") or stripped.startswith("~~~"):
+                in_fence = not in_fence
+            yield line, in_fence
+
+
+def _reference_definitions(path: Path) -> str:
+    """Every link reference definition in `path` (plus the two lines a URL / title may wrap onto)."""
+    found = []
+    follow = 0
+    for line, in_fence in _lines(path):
+        if in_fence or not line.strip():
+            follow = 0
+        elif _REFERENCE_RE.match(line):
+            found.append(line)
+            follow = 2
+        elif follow:
+            found.append(line)
+            follow -= 1
+    return "".join(found)
+
+
+def render_chunks(path: Path) -> Iterator[str]:
+    """Render a large markdown file segment by segment."""
+    used_ids: Set[str] = set()
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    md.treeprocessors.register(_SegmentIds(md, used_ids), "segment_ids", 4)
+
+    # Reference links may point at a definition in any segment
+    md.convert(_reference_definitions(path))
+    references = dict(md.references)
+    used_ids.clear()
+
+    def render(text: str) -> str:
+        md.reset()
+        md.references.update(references)
+        return md.convert(text)
+
+    segment = []
+    size = 0
+    for line, in_fence in _lines(path):
+        segment.append(line)
+        size += len(line)
+        if size >= _SEGMENT_CHARS and not in_fence and not line.strip():
+            yield render("".join(segment))
+            segment = []
+            size = 0
+    if segment:
+        yield render("".join(segment))
+
+
+def needs_streaming(path: Path) -> bool:
+    return path.stat().st_size > _STREAM_THRESHOLD
+
+
+class RenderCache:
+    """Two-tier (LRU + Redis) cache of rendered HTML keyed by render_key()."""
+
+    def __init__(self, max_bytes: int = _MAX_BYTES, ttl: int = _REDIS_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._redis = None
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                decode_responses=True,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._redis
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+
+        if self.ttl <= 0:
+            return None
+        try:
+            html = self._redis_client().get(f"render:{key}")
+        except Exception as e:
+            logger.debug(f"Render cache Redis read failed: {e}")
+            return None
+        if html is not None:
+            self._store_local(key, html)
+        return html
+
+    def set(self, key: str, html: str) -> None:
+        if len(html) > _MAX_ENTRY_BYTES:
+            return
+        self._store_local(key, html)
+        if self.ttl <= 0:
+            return
+        try:
+            self._redis_client().setex(f"render:{key}", self.ttl, html)
+        except Exception as e:
+            logger.debug(f"Render cache Redis write failed: {e}")
+
+    def _store_local(self, key: str, html: str) -> None:
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = html
+            self._bytes += len(html)
+            while self._bytes > self.max_bytes and self._entries:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+
+    def render(self, path: Path, key: Optional[str] = None) -> str:
+        """Cached HTML for `path` (rendered and stored on a miss)."""
+        key = key or render_key(path)
+        html = self.get(key)
+        if html is None:
+            html = render_markdown_text(path.read_text(encoding="utf-8"))
+            self.set(key, html)
+        return html
+
+
+render_cache = RenderCache()
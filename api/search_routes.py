@@ -6,27 +6,36 @@ Supports multiple search engines with fallback logic.
 """
 
 import logging
+import os
 from typing import List, Dict, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
+from web_crawler.celery_tasks import scrape_search_results
+from web_crawler.scheduler import PRIORITIES
 from web_crawler.search_engine import execute_search_router
 
 logger = logging.getLogger(__name__)
 
+SEARCH_SCRAPE_TIMEOUT = float(os.getenv("SEARCH_SCRAPE_TIMEOUT", "120"))
+
 router = APIRouter(prefix="/search", tags=["Search"])
 
 
 class SearchRequest(BaseModel):
     query: str = Field(..., min_length=1, description="Search query text")
     limit: int = Field(5, ge=1, le=25, description="Number of results to return")
+    scrape: bool = Field(False, description="Also crawl the top results and return their markdown")
+    scrape_limit: int = Field(3, ge=1, le=10, description="Number of top results to scrape when scrape=true")
 
 
 class SearchResult(BaseModel):
     url: Optional[str] = None
     title: Optional[str] = None
     description: Optional[str] = None
+    markdown: Optional[str] = None
+    scrape_error: Optional[str] = None
 
 
 class SearchResponse(BaseModel):
@@ -45,9 +54,33 @@ def search(request: SearchRequest) -> SearchResponse:
         logger.exception("Search route failed")
         raise HTTPException(status_code=500, detail=f"Search failed: {exc}") from exc
 
+    scraped_by_url: Dict[str, Dict] = {}
+    if request.scrape and results:
+        # Browsers live in the page_queue workers, not in the API process
+        try:
+            pending = scrape_search_results.apply_async(
+                args=(results, request.scrape_limit),
+                priority=PRIORITIES["high"],
+            )
+            for page in pending.get(timeout=SEARCH_SCRAPE_TIMEOUT):
+                scraped_by_url[page["url"]] = page
+        except Exception:
+            logger.exception("Search result scraping failed")
+
+    search_results = []
+    for item in results:
+        page = scraped_by_url.get(item.get("url"), {})
+        search_results.append(SearchResult(
+            url=item.get("url"),
+            title=item.get("title"),
+            description=item.get("description"),
+            markdown=page.get("markdown"),
+            scrape_error=page.get("error"),
+        ))
+
     return SearchResponse(
         query=request.query,
         limit=request.limit,
         count=len(results),
-        results=[SearchResult(**item) for item in results],
+        results=search_results,
     )
@@ -0,0 +1,44 @@
+import sys
+import os
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from web_crawler.content_dedup import ContentDeduplicator, page_text
+
+CHROME = " ".join(f"<a href='/section-{i}'>Section number {i} of the store</a>" for i in range(60))
+FOOTER = " ".join(f"<p>Footer legal line {i}, all rights reserved.</p>" for i in range(20))
+
+
+def _page(article: str) -> str:
+    return (
+        f"<html><body><header><nav>{CHROME}</nav></header>"
+        f"<main><article><h1>Post</h1><p>{article}</p></article></main>"
+        f"<footer>{FOOTER}</footer></body></html>"
+    )
+
+
+def test_fingerprint_ignores_site_chrome():
+    text = page_text(_page("Our short note about the spring sale, with dates and prices."))
+    assert "spring sale" in text
+    assert "Section number" not in text
+    assert "Footer legal line" not in text
+
+
+def test_short_pages_sharing_a_template_are_not_duplicates():
+    dedup = ContentDeduplicator()
+    first = page_text(_page("Opening hours change on Monday, the shop closes at six."))
+    second = page_text(_page("New delivery partner announced for the northern region."))
+    assert dedup.check("https://shop.example/a", first) is None
+    assert dedup.check("https://shop.example/b", second) is None
+
+
+def test_same_main_content_under_another_url_is_a_duplicate():
+    dedup = ContentDeduplicator()
+    html = _page("Opening hours change on Monday, the shop closes at six.")
+    assert dedup.check("https://shop.example/a", page_text(html)) is None
+    assert dedup.check("https://shop.example/a?sid=1", page_text(html)) == "https://shop.example/a"
+    # a retry of the same URL is not its own duplicate
+    assert dedup.check("https://shop.example/a", page_text(html)) is None
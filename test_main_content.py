@@ -0,0 +1,53 @@
+import sys
+import os
+from pathlib import Path
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+from bs4 import BeautifulSoup
+
+from web_crawler.main_content import extract_main_content
+
+# Golden corpus: <case>.html → <case>.txt (body text after extraction, whitespace collapsed)
+CORPUS = Path(BASE_DIR) / "test_fixtures" / "main_content"
+CASES = sorted(p.stem for p in CORPUS.glob("*.html"))
+
+# Pages without a confident content block are left untouched
+UNTOUCHED = {"link_list"}
+
+
+def _text(soup: BeautifulSoup) -> str:
+    return " ".join(soup.body.get_text(" ").split())
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_main_content_golden(case):
+    soup = BeautifulSoup((CORPUS / f"{case}.html").read_text(encoding="utf-8"), "lxml")
+    extracted = extract_main_content(soup)
+
+    assert extracted is (case not in UNTOUCHED)
+    assert _text(soup) == (CORPUS / f"{case}.txt").read_text(encoding="utf-8").strip()
+
+
+def test_nav_heavy_page_drops_navigation():
+    soup = BeautifulSoup((CORPUS / "nav_heavy.html").read_text(encoding="utf-8"), "lxml")
+    extract_main_content(soup)
+    text = _text(soup)
+
+    assert "autovacuum_vacuum_scale_factor" in text
+    for noise in ("Pricing", "Categories", "newsletter", "Copyright"):
+        assert noise not in text
+
+
+def test_short_article_keeps_every_paragraph():
+    soup = BeautifulSoup((CORPUS / "short_article.html").read_text(encoding="utf-8"), "lxml")
+    extract_main_content(soup)
+    text = _text(soup)
+
+    assert "resumable uploads" in text
+    assert "Upgrade with the usual package manager command." in text
+    assert "cookies" not in text and "Related" not in text
@@ -0,0 +1,124 @@
+import sys
+import os
+import re
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+
+from web_crawler.content_processor import ContentProcessor
+
+FIXTURES = os.path.join(BASE_DIR, "test_fixtures", "markdown")
+PAGE_URL = "https://example.com/page"
+CASES = ["lists", "code", "tables", "links"]
+# Markdown-syntax edge cases html2text gets wrong; checked against golden only
+ESCAPING = "escaping"
+
+# The native emitter is the default (MARKDOWN_ENGINE=native). It says the
+# same things as html2text; where the syntax differs it is on purpose and
+# pinned by the tests at the bottom of this file:
+#   lists  - siblings stay at one level, no blank lines inside a list
+#            (html2text indents every item after the first)
+#   code   - fenced ``` blocks instead of 4-space indentation
+#   tables - GFM tables with outer pipes and a "| --- |" rule
+#   links  - in-page skip links are dropped; a line break inside link text
+#            becomes a "\" hard break instead of being glued together
+
+
+def _fixture(name, ext):
+    with open(os.path.join(FIXTURES, f"{name}.{ext}"), encoding="utf-8") as f:
+        return f.read()
+
+
+def _render(name, engine):
+    return ContentProcessor.convert_to_markdown(_fixture(name, "html"), PAGE_URL, engine=engine)
+
+
+def _content(markdown):
+    """(words, link targets) — what a reader gets, whatever the syntax."""
+    targets = re.findall(r"\]\(([^)\s]+)\)", markdown)
+    text = re.sub(r"\]\([^)]*\)", "]", markdown)
+    return re.findall(r"[A-Za-z0-9_]+", text), targets
+
+
+def _drop_skip_links(markdown):
+    return re.sub(r"\[Skip to [^\]]*\]\([^)]*#[^)]*\)\s*", "", markdown)
+
+
+@pytest.mark.parametrize("name", CASES + [ESCAPING])
+def test_native_matches_golden(name):
+    assert _render(name, "native") == _fixture(name, "md")
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_native_keeps_legacy_content(name):
+    native = _render(name, "native")
+    legacy = _drop_skip_links(_render(name, "html2text"))
+    assert _content(native) == _content(legacy)
+
+
+def test_inline_links_and_code_are_identical():
+    for name, line in (("links", "See [the docs](https://example.com/docs)"),
+                       ("code", "Run `pip install acme` first.")):
+        native = _render(name, "native")
+        legacy = _render(name, "html2text")
+        assert any(l.startswith(line) for l in native.splitlines())
+        assert any(l.startswith(line) for l in legacy.splitlines())
+
+
+def test_lists_keep_siblings_at_one_level():
+    native = _render("lists", "native")
+    assert "- One\n- Two [link](https://example.com/t)\n- Three\n  - Nested a\n" in native
+    assert "\n\n1. First\n2. Second" in native
+    # html2text nests "Two" under "One" — the reason native is the default
+    assert "- One\n  - Two" in _render("lists", "html2text")
+
+
+def test_code_blocks_are_fenced():
+    native = _render("code", "native")
+    legacy = _render("code", "html2text")
+    assert "```\ndef answer():\n    return 42\n```" in native
+    assert "    def answer():\n        return 42" in legacy
+
+
+def test_tables_are_gfm():
+    native = _render("tables", "native")
+    legacy = _render("tables", "html2text")
+    assert native.startswith("| Name | Qty |\n| --- | --- |\n| Apple | 3 |")
+    assert legacy.strip().startswith("Name| Qty\n---|---")
+
+
+def test_skip_links_dropped_and_link_breaks_kept():
+    native = _render("links", "native")
+    legacy = _render("links", "html2text")
+    assert "Skip to Content" not in native
+    assert "[Skip to Content](https://example.com/page#main)" in legacy
+    assert "[![Card](https://example.com/card.png)\\\n**Card title**](https://example.com/card)" in native
+    assert "[![Card](https://example.com/card.png)**Card title**](https://example.com/card)" in legacy
+
+
+def test_link_text_brackets_are_escaped():
+    native = _render(ESCAPING, "native")
+    assert "[the \\[beta\\] notes](https://example.com/notes)" in native
+    assert "[![Screenshot \\[v2\\]](<https://example.com/img/shot (1).png>)](https://example.com/gallery)" in native
+
+
+def test_targets_with_spaces_or_parens_are_wrapped():
+    native = _render(ESCAPING, "native")
+    assert "[spec sheet](<https://example.com/files/spec sheet.pdf>)" in native
+    assert "[Acme (company)](<https://en.wikipedia.org/wiki/Acme_(company)>)" in native
+
+
+def test_code_fence_outruns_backticks_inside():
+    native = _render(ESCAPING, "native")
+    assert "````\nOpen a block with ``` and a language:\n```python\n" in native
+    assert "```\n````\n" in native
+    assert "``a`b``" in native
+
+
+def test_nested_table_rows_stay_in_their_cell():
+    native = _render(ESCAPING, "native")
+    assert "| Basic | 10 pages 1 user |\n| Pro | Unlimited |" in native
@@ -0,0 +1,53 @@
+import sys
+import os
+import re
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+
+from api import render_cache
+
+DOCUMENT = (
+    "# Intro\n\n"
+    "See [the docs][docs] and [the API][].\n\n"
+    + "Filler paragraph that pushes the next heading into a new segment.\n\n" * 4
+    + "# Intro\n\n"
+    "```\n[docs]: https://example.com/not-a-definition\n```\n\n"
+    "[docs]: https://example.com/docs \"Docs\"\n"
+    "[the API]:\n    https://example.com/api\n\n"
+    "## Intro\n"
+)
+
+
+@pytest.fixture
+def large_markdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_cache, "_SEGMENT_CHARS", 64)
+    path = tmp_path / "page.md"
+    path.write_text(DOCUMENT, encoding="utf-8")
+    return path
+
+
+def _squash(html):
+    return re.sub(r">\s+<", "><", html).strip()
+
+
+def test_streamed_render_matches_one_piece_render(large_markdown):
+    chunks = list(render_cache.render_chunks(large_markdown))
+    assert len(chunks) > 1
+    assert _squash("".join(chunks)) == _squash(render_cache.render_markdown_text(DOCUMENT))
+
+
+def test_reference_defined_in_a_later_segment(large_markdown):
+    html = "".join(render_cache.render_chunks(large_markdown))
+    assert '<a href="https://example.com/docs" title="Docs">the docs</a>' in html
+    assert '<a href="https://example.com/api">the API</a>' in html
+    assert "[docs]" in html  # the fenced copy is left alone
+
+
+def test_heading_ids_unique_across_segments(large_markdown):
+    html = "".join(render_cache.render_chunks(large_markdown))
+    assert re.findall(r'id="([^"]+)"', html) == ["intro", "intro_1", "intro_2"]
@@ -0,0 +1,47 @@
+import sys
+import os
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from web_crawler.robots import RobotsRules
+
+ROBOTS = """
+User-agent: gcrawler
+Disallow: /other-crawler
+
+User-agent: NotGCrawl
+Disallow: /not-us
+
+User-agent: GCrawl/2.1
+Disallow: /private
+
+User-agent: *
+Disallow: /everyone
+"""
+
+
+def test_group_matches_our_product_token_case_insensitively():
+    rules = RobotsRules.parse(ROBOTS)
+    assert not rules.is_allowed("https://example.com/private/a")
+    assert rules.is_allowed("https://example.com/everyone")
+
+
+def test_tokens_that_merely_contain_ours_do_not_match():
+    rules = RobotsRules.parse(ROBOTS)
+    assert rules.is_allowed("https://example.com/other-crawler")
+    assert rules.is_allowed("https://example.com/not-us")
+
+
+def test_version_suffix_is_not_part_of_the_token():
+    rules = RobotsRules.parse(ROBOTS, user_agent="GCrawl/1.0")
+    assert not rules.is_allowed("https://example.com/private")
+    assert rules.is_allowed("https://example.com/everyone")
+
+
+def test_groups_for_the_same_token_are_merged():
+    rules = RobotsRules.parse("User-agent: gcrawl\nDisallow: /a\n\nUser-agent: GCRAWL\nDisallow: /b\n")
+    assert not rules.is_allowed("https://example.com/a")
+    assert not rules.is_allowed("https://example.com/b")
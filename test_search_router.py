@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+
+from web_crawler import search_engine
+
+SLOW_BACKEND_S = 2.0
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """Parallel router, no cache, a slow blocking DuckDuckGo stub."""
+    monkeypatch.setattr(search_engine, "SEARCH_ROUTER_MODE", "parallel")
+    monkeypatch.setattr(search_engine, "_search_cache", search_engine._SearchCache(0, 0))
+    monkeypatch.delenv("FIRE_ENGINE_BETA_URL", raising=False)
+
+    def slow_ddg(query, limit):
+        time.sleep(SLOW_BACKEND_S)
+        return [{"url": "https://ddg.example/slow", "title": "slow", "description": ""}]
+
+    monkeypatch.setattr(search_engine, "ddg_search", slow_ddg)
+    return search_engine
+
+
+def test_fast_backend_does_not_wait_for_slow_blocking_backend(router, monkeypatch):
+    monkeypatch.setenv("SEARXNG_ENDPOINT", "http://searxng.invalid/search")
+
+    async def instant_searxng(client, query, limit):
+        return [{"url": "https://searx.example/hit", "title": "hit", "description": ""}]
+
+    monkeypatch.setattr(router, "_searxng_search_async", instant_searxng)
+
+    started = time.perf_counter()
+    results = router.execute_search_router("hello", 5)
+    elapsed = time.perf_counter() - started
+
+    assert [r["url"] for r in results] == ["https://searx.example/hit"]
+    assert elapsed < SLOW_BACKEND_S / 2
+
+
+def test_latency_budget_bounds_a_slow_blocking_backend(router, monkeypatch):
+    monkeypatch.delenv("SEARXNG_ENDPOINT", raising=False)
+    monkeypatch.setattr(router, "SEARCH_LATENCY_BUDGET", 0.3)
+
+    started = time.perf_counter()
+    results = router.execute_search_router("hello", 5)
+    elapsed = time.perf_counter() - started
+
+    assert results == []
+    assert elapsed < SLOW_BACKEND_S / 2
@@ -0,0 +1,45 @@
+import sys
+import os
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+from bs4 import BeautifulSoup
+
+from web_crawler.cleanup_html import cleanup_soup
+from web_crawler.structured_data import StructuredDataCollector, extract_structured_data
+
+PAGE_URL = "https://shop.example/widget"
+HTML = """<html><head><title>Widget</title>
+<meta property="og:title" content="Widget"><meta property="og:image" content="/a.png">
+<meta property="og:image" content="/b.png"><meta name="twitter:card" content="summary">
+<script type="application/ld+json">{"@context": "https://schema.org", "@graph": [{"@type": "Product", "name": "Widget"}]}</script>
+</head><body>
+<nav class="navbar" itemscope itemtype="https://schema.org/SiteNavigationElement"><a itemprop="url" href="/">Home</a></nav>
+<main><div itemscope itemtype="https://schema.org/Product"><span itemprop="name">Widget</span><!-- note -->
+<div itemprop="offers" itemscope itemtype="https://schema.org/Offer"><span itemprop="price" content="9.99">$9.99</span></div>
+<img itemprop="image" src="/w.png"></div>
+<div vocab="https://schema.org/" typeof="Person"><span property="name">Ann</span>
+<form><input property="email" content="ann@shop.example"></form></div>
+<p>Order today and get free shipping on every widget in the store.</p></main></body></html>"""
+
+
+@pytest.mark.parametrize("only_main_content", [False, True])
+def test_cleanup_walk_collects_what_the_standalone_walk_does(only_main_content):
+    expected = extract_structured_data(BeautifulSoup(HTML, "html.parser"), PAGE_URL)
+    collector = StructuredDataCollector(PAGE_URL)
+    cleanup_soup(HTML, PAGE_URL, only_main_content, collector)
+    assert collector.result() == expected
+
+
+def test_removed_regions_still_count():
+    collector = StructuredDataCollector(PAGE_URL)
+    cleanup_soup(HTML, PAGE_URL, collector=collector)
+    data = collector.result()
+    assert data["json_ld"] == [{"@context": "https://schema.org", "@type": "Product", "name": "Widget"}]
+    assert data["opengraph"]["og:image"] == ["/a.png", "/b.png"]
+    assert data["microdata"][1]["properties"]["offers"]["properties"] == {"price": "9.99"}
+    assert data["rdfa"][0]["properties"] == {"name": "Ann", "email": "ann@shop.example"}
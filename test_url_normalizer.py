@@ -0,0 +1,53 @@
+import sys
+import os
+from datetime import date
+
+# Add root directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import pytest
+
+from web_crawler.url_normalizer import canonicalize_url, is_crawler_trap
+
+TODAY = date.today()
+FAR_YEAR = TODAY.year + 5
+
+
+@pytest.mark.parametrize("url", [
+    "https://shop.com/cars?year=2020",
+    "https://blog.com/?p=1234",
+    f"https://site.com/events/{TODAY.year}/{TODAY.month:02d}",
+    "https://site.com/archive?month=5",
+    f"https://site.com/calendar?date={TODAY.isoformat()}",
+    "https://site.com/events/2024/05/launch-party",
+    "https://site.com/history/1985-01-01-founding",
+    "https://site.com/blog?page=3",
+])
+def test_real_pages_are_not_traps(url):
+    assert is_crawler_trap(url) is None
+
+
+@pytest.mark.parametrize("url, reason", [
+    (f"https://site.com/events/{FAR_YEAR}/01", "calendar"),
+    (f"https://site.com/calendar?date={FAR_YEAR}-03-01", "calendar"),
+    (f"https://site.com/calendar?year={FAR_YEAR}&month=2", "calendar"),
+    (f"https://site.com/events/{FAR_YEAR + 100}/01/party", "calendar"),
+    ("https://site.com/blog?page=500", "pagination too deep"),
+    ("https://site.com/blog/page/51", "pagination too deep"),
+    ("https://site.com/a/b/a/b/a/b", "repeating path segments"),
+])
+def test_traps(url, reason):
+    assert is_crawler_trap(url) == reason
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://Example.com:443/a/?flag&q=a+b", "https://example.com/a?flag&q=a+b"),
+    ("https://example.com/?b=2&a=1&utm_source=x", "https://example.com/?a=1&b=2"),
+    ("https://example.com/?q=%7e%2fx", "https://example.com/?q=~%2Fx"),
+    ("https://example.com/?q=a b", "https://example.com/?q=a%20b"),
+    ("http://[2001:db8::1]:8080/x", "http://[2001:db8::1]:8080/x"),
+])
+def test_canonicalize_keeps_query_as_written(url, expected):
+    assert canonicalize_url(url) == expected
@@ -0,0 +1,149 @@
+"""
+Per-crawl bandwidth accounting — how many bytes each page, host and proxy
+tier pulled over the wire.
+
+Proxy tiers are billed per GB, so every byte a crawl transfers is counted:
+
+  - Browser pages → page.on("requestfinished") with request.sizes()
+                    (headers + encoded body, both directions); requests
+                    served from the ResponseCache cost nothing and are skipped
+  - Map mode      → every requests.Response from map_crawler._get
+                    (Content-Length when present, else the body size)
+
+Counters are keyed by (scope, name, tier) where scope is "crawl", "host"
+or "page", so one flat structure answers "which tier", "which CDN" and
+"which pages" questions. The tier is the proxy pool the request went
+through ("none" for direct connections).
+
+summary() goes into summary.json; rows() feeds the crawl_bandwidth table.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_TOP_N = 20         # heaviest pages / hosts listed in summary.json
+
+Key = Tuple[str, str, str]
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _header_bytes(headers) -> int:
+    # "Name: value\r\n"
+    return sum(len(k) + len(v) + 4 for k, v in headers.items())
+
+
+class BandwidthMeter:
+    """Thread-safe byte / request counters for one crawl."""
+
+    def __init__(self):
+        self._counters: Dict[Key, List[int]] = {}
+        self._lock = threading.Lock()
+
+    # ── Recording ────────────────────────────────────────────────────────────
+
+    def record(self, page_url: str, request_url: str, tier: str, nbytes: int) -> None:
+        tier = tier or "none"
+        with self._lock:
+            for key in (
+                ("crawl", "", tier),
+                ("host", _host(request_url), tier),
+                ("page", page_url, tier),
+            ):
+                counter = self._counters.get(key)
+                if counter is None:
+                    self._counters[key] = [nbytes, 1]
+                else:
+                    counter[0] += nbytes
+                    counter[1] += 1
+
+    def record_http(self, response, page_url: str, tier: str) -> None:
+        """Account a `requests` response (map mode / plain HTTP fetches)."""
+        try:
+            length = response.headers.get("Content-Length")
+            body = int(length) if length and length.isdigit() else len(response.content)
+            nbytes = body + _header_bytes(response.headers)
+            if response.request is not None:
+                nbytes += _header_bytes(response.request.headers) + len(response.request.body or b"")
+        except Exception as e:
+            logger.debug(f"Bandwidth accounting failed for {response.url}: {e}")
+            return
+        self.record(page_url, response.url, tier, nbytes)
+
+    def attach(self, page, page_url: str, tier: str) -> "PageMeter":
+        """Count every finished network request of a Playwright page."""
+        return PageMeter(self, page, page_url, tier)
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+
+    def total_bytes(self) -> int:
+        """Bytes transferred so far across all tiers (cheap; for live progress)."""
+        with self._lock:
+            return sum(c[0] for (scope, _, _), c in self._counters.items() if scope == "crawl")
+
+    def rows(self) -> List[Tuple[str, str, str, int, int]]:
+        """(scope, name, tier, bytes, requests) for every counter."""
+        with self._lock:
+            return [(s, n, t, c[0], c[1]) for (s, n, t), c in self._counters.items()]
+
+    def summary(self) -> Dict:
+        totals = {"bytes": 0, "requests": 0}
+        by_tier: Dict[str, Dict[str, int]] = {}
+        hosts: Dict[str, int] = {}
+        pages: Dict[str, int] = {}
+        for scope, name, tier, nbytes, requests in self.rows():
+            if scope == "crawl":
+                totals["bytes"] += nbytes
+                totals["requests"] += requests
+                by_tier[tier] = {"bytes": nbytes, "requests": requests}
+            elif scope == "host":
+                hosts[name] = hosts.get(name, 0) + nbytes
+            else:
+                pages[name] = pages.get(name, 0) + nbytes
+
+        def top(counts: Dict[str, int]) -> List[Dict]:
+            heaviest = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:_TOP_N]
+            return [{"name": name, "bytes": nbytes} for name, nbytes in heaviest]
+
+        return {
+            "total_bytes": totals["bytes"],
+            "total_requests": totals["requests"],
+            "by_tier": by_tier,
+            "top_hosts": top(hosts),
+            "top_pages": top(pages),
+        }
+
+
+class PageMeter:
+    """requestfinished listener for one page; cache hits are excluded."""
+
+    def __init__(self, meter: BandwidthMeter, page, page_url: str, tier: str):
+        self._meter = meter
+        self._page_url = page_url
+        self._tier = tier
+        self._cached = set()
+        page.on("requestfinished", self._on_finished)
+
+    def mark_cached(self, request) -> None:
+        """Called by the route handler for requests fulfilled from the cache."""
+        self._cached.add(request)
+
+    def _on_finished(self, request) -> None:
+        if request in self._cached:
+            self._cached.discard(request)
+            return
+        try:
+            sizes = request.sizes()
+        except Exception:
+            return
+        # Unknown sizes are reported as -1
+        nbytes = sum(max(value, 0) for value in sizes.values())
+        self._meter.record(self._page_url, request.url, self._tier, nbytes)
@@ -0,0 +1,145 @@
+"""
+Thread-local pooled browsers.
+
+Playwright's sync API objects are bound to the thread that created them,
+so the pool keeps one Playwright driver + Chromium per thread and reuses
+it across calls instead of launching a new browser every time. Callers
+open their own page / context and close it when done; the browser stays
+up until close_thread_browsers() is called or the process exits.
+
+Two Chromium flavours share the thread's driver:
+
+  - get_chromium()          → plain headless Chromium
+  - get_stealth_chromium()  → launched with the page crawler's stealth flags
+
+Only warm worker children (worker_bootstrap prewarm) should keep a pool:
+a thread that is not torn down with close_thread_browsers(), such as an
+API threadpool thread, would keep its driver and Chromium forever. Such
+callers use chromium(), which borrows the pooled browser when the thread
+has one and otherwise launches a browser that is closed after the block.
+
+A thread that owns a driver cannot start another sync_playwright(), so
+code that launches its own browsers goes through playwright_driver(),
+which hands out the pooled driver when there is one.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from playwright.sync_api import Browser, Playwright, sync_playwright
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+]
+
+STEALTH_CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-infobars',
+    '--ignore-certificate-errors',
+    '--window-position=0,0',
+    '--window-size=1920,1080',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+]
+
+
+def _driver() -> Playwright:
+    playwright = getattr(_local, "playwright", None)
+    if playwright is None:
+        playwright = sync_playwright().start()
+        _local.playwright = playwright
+    return playwright
+
+
+def _pooled(attr: str, headless: bool, args) -> Browser:
+    browser = getattr(_local, attr, None)
+    if browser is not None and browser.is_connected():
+        return browser
+
+    logger.info(f"Launching pooled Chromium ({attr}) for thread {threading.current_thread().name}")
+    browser = _driver().chromium.launch(headless=headless, args=args)
+    setattr(_local, attr, browser)
+    return browser
+
+
+def get_chromium(headless: bool = True) -> Browser:
+    """Return this thread's Chromium, launching it on first use or after a crash."""
+    return _pooled("chromium", headless, _CHROMIUM_ARGS)
+
+
+def get_stealth_chromium(headless: bool = True) -> Browser:
+    """This thread's stealth-flagged Chromium (page crawls), relaunched after a crash."""
+    return _pooled("stealth_chromium", headless, STEALTH_CHROMIUM_ARGS)
+
+
+def has_pool() -> bool:
+    """True when this thread owns a pooled driver (e.g. a pre-warmed Celery worker)."""
+    return getattr(_local, "playwright", None) is not None
+
+
+@contextmanager
+def chromium(headless: bool = True) -> Iterator[Browser]:
+    """This thread's pooled Chromium if it has a pool, else a browser closed after the block."""
+    if has_pool():
+        yield get_chromium(headless)
+        return
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=headless, args=_CHROMIUM_ARGS)
+        try:
+            yield browser
+        finally:
+            browser.close()
+
+
+@contextmanager
+def playwright_driver() -> Iterator[Playwright]:
+    """This thread's pooled driver if it has one, else a fresh driver for the block."""
+    if has_pool():
+        yield _local.playwright
+        return
+    with sync_playwright() as playwright:
+        yield playwright
+
+
+def prewarm(headless: bool = True) -> float:
+    """Start this thread's driver and stealth Chromium now; returns the seconds it took."""
+    started = time.perf_counter()
+    get_stealth_chromium(headless)
+    return time.perf_counter() - started
+
+
+def close_thread_browsers() -> None:
+    """Close this thread's pooled browsers and stop its Playwright driver."""
+    for attr in ("chromium", "stealth_chromium"):
+        browser = getattr(_local, attr, None)
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception:
+                pass
+            setattr(_local, attr, None)
+
+    playwright = getattr(_local, "playwright", None)
+    if playwright is not None:
+        try:
+            playwright.stop()
+        except Exception:
+            pass
+        _local.playwright = None
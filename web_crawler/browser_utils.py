@@ -4,11 +4,76 @@ Browser utilities for stealth and resource management
 
 import time
 import logging
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
 from playwright.sync_api import Page, Route
 from web_crawler.config import CrawlConfig
+from web_crawler.response_cache import ResponseCache, serve_from_cache
 
 logger = logging.getLogger(__name__)
 
+_ALWAYS_BLOCKED_TYPES = frozenset({"font", "media"})
+
+# Analytics, tracking and ad hosts — matched on the request host and every
+# parent domain (www.google-analytics.com → google-analytics.com)
+_TRACKER_HOSTS = frozenset({
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com",
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com",
+    "connect.facebook.net", "hotjar.com", "hotjar.io", "clarity.ms",
+    "segment.com", "segment.io", "mixpanel.com", "optimizely.com",
+    "intercom.io", "intercomcdn.com", "crisp.chat", "drift.com", "driftt.com",
+    "tawk.to", "zdassets.com", "zopim.com", "hubspot.com", "hs-analytics.net",
+    "hs-scripts.com", "hsforms.net", "pardot.com", "marketo.net", "mktoresp.com",
+    "outbrain.com", "taboola.com", "adroll.com", "quantserve.com", "quantcount.com",
+    "scorecardresearch.com", "comscore.com", "newrelic.com", "nr-data.net",
+    "datadoghq.com", "datadoghq-browser-agent.com", "sentry.io", "sentry-cdn.com",
+})
+# Tracker endpoints on hosts that also serve real content: (host, path prefix)
+_TRACKER_PATHS = (
+    ("facebook.com", "/tr"),
+    ("google.com", "/pagead/"),
+)
+
+
+def _parent_domains(host: str):
+    """www.a.example.com → www.a.example.com, a.example.com, example.com"""
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        yield ".".join(labels[i:])
+
+
+def is_tracker_url(url: str) -> bool:
+    """O(labels) host-suffix lookup against the tracker sets."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if not host:
+        return False
+    for domain in _parent_domains(host):
+        if domain in _TRACKER_HOSTS:
+            return True
+        for tracker_host, path_prefix in _TRACKER_PATHS:
+            if domain == tracker_host and parts.path.startswith(path_prefix):
+                return True
+    return False
+
+
+def _site_of(host: Optional[str]) -> str:
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _same_site(host: Optional[str], site: str) -> bool:
+    host = _site_of(host)
+    return host == site or host.endswith("." + site) or site.endswith("." + host)
+
+
+def _is_main_frame(request) -> bool:
+    try:
+        return request.frame.parent_frame is None
+    except Exception:
+        # Service-worker requests have no frame
+        return False
+
 
 class BrowserUtils:
     """Browser configuration and stealth utilities"""
@@ -27,56 +92,52 @@ class BrowserUtils:
         return any(d in url.lower() for d in protected)
 
     @staticmethod
-    def make_resource_blocker(block_images: bool = False, block_css: bool = False):
+    def make_resource_blocker(
+        block_images: bool = False,
+        block_css: bool = False,
+        block_third_party_frames: bool = False,
+        first_party_url: Optional[str] = None,
+        response_cache: Optional[ResponseCache] = None,
+        on_cache_hit: Optional[Callable] = None,
+    ):
         """
         Factory that returns a route handler with configurable blocking.
+        Fonts, media and trackers are always blocked; the top-level document
+        never is.
         
         Args:
             block_images: Block image resource types (safe when screenshots are disabled)
             block_css: Block CSS stylesheets (safe when screenshots are disabled)
+            block_third_party_frames: Block iframes from other sites (safe when screenshots are disabled)
+            first_party_url: Page URL used to tell first- from third-party frames
+            response_cache: Crawl-scoped cache that serves static sub-resources
+            on_cache_hit: Called with each request fulfilled from the cache
         """
+        site = _site_of(urlsplit(first_party_url).hostname) if first_party_url else None
+
         def _block_resources(route: Route) -> None:
             try:
-                resource_type = route.request.resource_type
-                url = route.request.url.lower()
-                
-                # Always block fonts and media
-                if resource_type in ("font", "media"):
-                    route.abort()
-                    return
-                
-                # Conditionally block images
-                if block_images and resource_type == "image":
-                    route.abort()
-                    return
-                
-                # Conditionally block CSS
-                if block_css and resource_type == "stylesheet":
-                    route.abort()
-                    return
-                
-                # Block analytics, tracking, and ad networks
-                blocked_domains = [
-                    "google-analytics", "gtag", "doubleclick",
-                    "facebook.com/tr", "hotjar", "clarity",
-                    "segment", "mixpanel",
-                    "optimizely", "intercom", "crisp.chat",
-                    "drift.com", "tawk.to", "zendesk",
-                    "hubspot", "pardot", "marketo",
-                    "outbrain", "taboola", "adroll",
-                    "quantserve", "scorecardresearch", "comscore",
-                    "newrelic", "datadoghq", "sentry.io",
-                ]
-                
-                if any(domain in url for domain in blocked_domains):
-                    try: 
-                        route.abort()
-                    except Exception:
-                        pass
+                request = route.request
+                resource_type = request.resource_type
+
+                if resource_type == "document" and _is_main_frame(request):
+                    route.continue_()
                     return
-                
+
+                block = (
+                    resource_type in _ALWAYS_BLOCKED_TYPES
+                    or (block_images and resource_type == "image")
+                    or (block_css and resource_type == "stylesheet")
+                    or is_tracker_url(request.url)
+                )
+                if not block and block_third_party_frames and site and resource_type == "document":
+                    block = not _same_site(urlsplit(request.url).hostname, site)
+
                 try:
-                    route.continue_()
+                    if block:
+                        route.abort()
+                    elif response_cache is None or not serve_from_cache(route, response_cache, on_cache_hit):
+                        route.continue_()
                 except Exception:
                     pass
             except Exception:
@@ -85,42 +146,24 @@ class BrowserUtils:
         
         return _block_resources
 
+    @staticmethod
+    def blocking_profile(enable_ss: bool) -> Dict[str, bool]:
+        """
+        Derive resource blocking from the requested outputs: without a
+        screenshot nothing visual matters, so images, stylesheets and
+        third-party iframes are skipped too.
+        """
+        visual = bool(enable_ss)
+        return {
+            "block_images": not visual,
+            "block_css": not visual,
+            "block_third_party_frames": not visual,
+        }
+
     @staticmethod
     def block_resources(route: Route) -> None:
         """Legacy static method — blocks fonts, media, and trackers only."""
-        try:
-            resource_type = route.request.resource_type
-            url = route.request.url.lower()
-            
-            if resource_type in ("font", "media"):
-                route.abort()
-                return
-            
-            blocked_domains = [
-                "google-analytics", "gtag", "doubleclick",
-                "facebook.com/tr", "hotjar", "clarity",
-                "segment", "mixpanel",
-                "optimizely", "intercom", "crisp.chat",
-                "drift.com", "tawk.to", "zendesk",
-                "hubspot", "pardot", "marketo",
-                "outbrain", "taboola", "adroll",
-                "quantserve", "scorecardresearch", "comscore",
-                "newrelic", "datadoghq", "sentry.io",
-            ]
-            
-            if any(domain in url for domain in blocked_domains):
-                try: 
-                    route.abort()
-                except Exception:
-                    pass
-                return
-            
-            try:
-                route.continue_()
-            except Exception:
-                pass
-        except Exception:
-            pass
+        _DEFAULT_BLOCKER(route)
 
     @staticmethod
     def apply_stealth(page: Page) -> None:
@@ -252,4 +295,7 @@ class BrowserUtils:
                 }
             """)
         except Exception as e:
-            logger.warning(f"Failed to inject stealth scripts: {e}")
\ No newline at end of file
+            logger.warning(f"Failed to inject stealth scripts: {e}")
+
+
+_DEFAULT_BLOCKER = BrowserUtils.make_resource_blocker()
@@ -13,7 +13,8 @@ celery_app = Celery(
     'web_crawler',
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=['web_crawler.celery_tasks']  # Import tasks module
+    # Tasks + warm-up and scheduler-release signal handlers
+    include=['web_crawler.celery_tasks', 'web_crawler.worker_bootstrap', 'web_crawler.scheduler']
 )
 
 # Celery configuration
@@ -36,9 +37,23 @@ celery_app.conf.update(
     result_backend_transport_options={
         'master_name': 'mymaster'
     },
+    # Message priorities (scheduler.PRIORITIES): the Redis transport keeps one
+    # list per step and drains lower steps first. Queues themselves are polled
+    # round-robin (the default), so a worker consuming every queue does not
+    # drain crawl_queue before page_queue / map_queue
+    broker_transport_options={
+        'priority_steps': [0, 3, 6, 9],
+        'sep': ':',
+    },
+    task_default_priority=3,
     
     # Worker settings
-    worker_max_tasks_per_child=100,  # Restart worker after 100 tasks (prevent memory leaks)
+    # Recycle children by task count and/or resident memory (KiB, 0 = off) to contain leaks;
+    # each recycle costs a browser re-warm, so prefer the memory limit over a low count
+    worker_max_tasks_per_child=int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', '100')),
+    worker_max_memory_per_child=int(os.getenv('CELERY_MAX_MEMORY_PER_CHILD', '0')) or None,
+    # Children launch a browser in worker_process_init (worker_bootstrap); allow for it
+    worker_proc_alive_timeout=float(os.getenv('CELERY_PROC_ALIVE_TIMEOUT', '60')),
     worker_disable_rate_limits=True,
     
     # Resilience — auto-retry broker connection on startup
@@ -50,7 +65,8 @@ celery_app.conf.update(
     task_routes={
         'celery_tasks.crawl_website': {'queue': 'crawl_queue'},
         'celery_tasks.crawl_single_page': {'queue': 'page_queue'},
-        'celery_tasks.crawl_links': {'queue': 'page_queue'},
+        'celery_tasks.scrape_search_results': {'queue': 'page_queue'},
+        'celery_tasks.crawl_links': {'queue': 'map_queue'},  # map jobs don't hold up single pages
     },
     
     # Concurrency
@@ -72,6 +88,10 @@ celery_app.conf.task_queues = {
         'exchange': 'page',
         'routing_key': 'page',
     },
+    'map_queue': {
+        'exchange': 'map',
+        'routing_key': 'map',
+    },
 }
 
 
@@ -4,12 +4,13 @@ Celery tasks for distributed web crawling
 
 import json
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from web_crawler.celery_config import celery_app
 from web_crawler.config import CrawlConfig
 from web_crawler.crawler import main as crawl_main
+from web_crawler.progress import CELERY_STATES, ProgressReporter
 import redis
 import os
 
@@ -21,53 +22,106 @@ redis_client = redis.Redis.from_url(
     decode_responses=True
 )
 
+BATCH_TTL = 7 * 24 * 3600   # seconds batch counters stay in Redis
 
-@celery_app.task(
-    name='celery_tasks.crawl_website',
-    bind=True,
-    max_retries=3,
-    default_retry_delay=60,  # Retry after 60 seconds
-    time_limit=3600,  # Kill task after 1 hour
-    soft_time_limit=3300,  # Warning at 55 minutes
-)
-def crawl_website(
-    self,
+
+def record_batch_result(batch_id: str, crawl_id: str, url: str, status: str) -> None:
+    """
+    Count a finished crawl ("completed" / "failed") against its batch and
+    publish the aggregate on the batch:{batch_id} channel (/ws/batch).
+    Each crawl counts once: the task body and the worker's hard-kill /
+    revoke hooks (scheduler.ScheduledRequest) may both report the same one.
+    """
+    key = f"batch:{batch_id}"
+    try:
+        if not redis_client.sadd(f"{key}:done", crawl_id):
+            return
+        pipe = redis_client.pipeline()
+        pipe.expire(f"{key}:done", BATCH_TTL)
+        pipe.hincrby(key, status, 1)
+        pipe.expire(key, BATCH_TTL)
+        pipe.hgetall(key)
+        counts = pipe.execute()[-1]
+
+        total = int(counts.get("total", 0))
+        done = int(counts.get("completed", 0)) + int(counts.get("failed", 0))
+        event = {
+            "type": "batch_progress",
+            "batch_id": batch_id,
+            "crawl_id": crawl_id,
+            "url": url,
+            "crawl_status": status,
+            "total": total,
+            "completed": int(counts.get("completed", 0)),
+            "failed": int(counts.get("failed", 0)),
+        }
+        redis_client.publish(key, json.dumps(event))
+        if total and done >= total:
+            redis_client.publish(key, json.dumps({**event, "type": "batch_completed"}))
+    except Exception as e:
+        logger.error(f"Failed to record batch progress for {batch_id}: {e}")
+
+
+def _publish_page_result(crawl_id: str, summary: Dict) -> None:
+    """
+    single / links crawls: persist the page + completion to the DB and
+    publish page_processed (the frontend grabs SEO / HTML / screenshot from it).
+    """
+    from web_crawler.page_crawler import persist_crawl_completion
+    from web_crawler.redis_events import publish_event
+
+    persist_crawl_completion(crawl_id, summary)
+    try:
+        publish_event(
+            crawl_id=crawl_id,
+            payload={
+                "type": "page_processed",
+                "page": 1,
+                "url": summary.get("start_url", ""),
+                "title": "Scraped Page",
+                "markdown_file": summary.get("markdown_file"),
+                "html_file": summary.get("html_file"),
+                "screenshot": summary.get("screenshot"),
+                "seo_json": summary.get("seo_json"),
+                "seo_md": summary.get("seo_md"),
+                "seo_xlsx": summary.get("seo_xlsx")
+            }
+        )
+    except Exception as e:
+        logger.error(f"Failed to publish page event for {crawl_id}: {e}")
+
+
+def _run_crawl(
+    task,
     start_url: str,
     config_dict: Dict,
+    crawl_mode: str,
     enable_md: bool = False,
     enable_html: bool = False,
     enable_ss: bool = False,
     enable_json: bool = False,
-    enable_links: bool = True,
     enable_seo: bool = False,
-    crawl_mode: str = "all",
+    enable_structured: bool = False,
+    batch_id: Optional[str] = None,
 ) -> Dict:
     """
-    Celery task to crawl a website
-    
-    Args:
-        self: Task instance (bind=True)
-        start_url: URL to start crawling
-        config_dict: Configuration as dictionary
-        Other args: Output options
-    
-    Returns:
-        Dictionary with crawl summary and results
+    Shared body of the crawl tasks. `task` is the bound task instance
+    (its request id is the crawl_id; retries use its own retry policy).
     """
-    task_id = self.request.id
-    logger.info(f"Starting crawl task {task_id} for {start_url}")
-    
+    task_id = task.request.id
+    logger.info(f"Starting {crawl_mode} crawl task {task_id} for {start_url}")
+
+    # Live progress: Redis hash for /crawler/status, mirrored into the Celery state
+    progress = ProgressReporter(
+        task_id,
+        crawl_mode,
+        start_url,
+        pages_max=config_dict.get("max_pages", 50) if crawl_mode == "all" else 1,
+        on_flush=lambda meta: task.update_state(state=CELERY_STATES[meta.get("state", "running")], meta=meta),
+    )
+    progress.start(attempt=task.request.retries)
+
     try:
-        # Update task state
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'status': 'Starting crawl',
-                'url': start_url,
-                'progress': 0
-            }
-        )
-        
         # Reconstruct config from dict
         config = CrawlConfig(**config_dict)
         
@@ -83,12 +137,17 @@ def crawl_website(
             enable_json=enable_json,
             enable_links=True,
             enable_seo=enable_seo,
+            enable_structured=enable_structured,
             client_id=task_id,  # Use task_id as client_id
             websocket_manager=None,  # No WebSocket in Celery
             crawl_mode=crawl_mode,
-            config=config
+            config=config,
+            progress=progress
         )
 
+        if crawl_mode in ("single", "links"):
+            _publish_page_result(task_id, summary)
+
         from web_crawler.redis_events import publish_event
 
         publish_event(
@@ -104,6 +163,18 @@ def crawl_website(
         # Add task metadata
         summary['task_id'] = task_id
         summary['status'] = 'completed'
+
+        # The backend stores the return value as SUCCESS; only Redis needs the final state
+        progress.on_flush = None
+        progress.finish(
+            "completed",
+            pages_done=summary.get("pages_crawled", 0),
+            pages_failed=summary.get("pages_failed", 0),
+            bytes=(summary.get("bandwidth") or {}).get("total_bytes", 0),
+        )
+
+        if batch_id:
+            record_batch_result(batch_id, task_id, start_url, "completed")
         
         logger.info(f"Completed crawl task {task_id}")
         
@@ -111,11 +182,17 @@ def crawl_website(
         
     except Exception as exc:
         logger.error(f"Error in crawl task {task_id}: {exc}")
+        if task.request.retries < task.max_retries:
+            progress.update(state="retrying", error=str(exc), force=True)
         
         # Retry with exponential backoff
         try:
-            raise self.retry(exc=exc, countdown=2 ** self.request.retries)
-        except self.MaxRetriesExceededError:
+            raise task.retry(exc=exc, countdown=2 ** task.request.retries)
+        except task.MaxRetriesExceededError:
+            progress.on_flush = None
+            progress.finish("failed", error=str(exc))
+            if batch_id:
+                record_batch_result(batch_id, task_id, start_url, "failed")
             return {
                 'task_id': task_id,
                 'status': 'failed',
@@ -124,53 +201,146 @@ def crawl_website(
             }
 
 
+@celery_app.task(
+    name='celery_tasks.crawl_website',
+    bind=True,
+    Request='web_crawler.scheduler:ScheduledRequest',  # frees scheduler slots on hard kills
+    max_retries=3,
+    default_retry_delay=60,  # Retry after 60 seconds
+    time_limit=3600,  # Kill task after 1 hour
+    soft_time_limit=3300,  # Warning at 55 minutes
+)
+def crawl_website(
+    self,
+    start_url: str,
+    config_dict: Dict,
+    enable_md: bool = False,
+    enable_html: bool = False,
+    enable_ss: bool = False,
+    enable_json: bool = False,
+    enable_links: bool = True,
+    enable_seo: bool = False,
+    crawl_mode: str = "all",
+    enable_structured: bool = False,
+    batch_id: Optional[str] = None,
+) -> Dict:
+    """
+    Celery task to crawl a website
+    
+    Args:
+        self: Task instance (bind=True)
+        start_url: URL to start crawling
+        config_dict: Configuration as dictionary
+        batch_id: Batch this crawl belongs to (POST /crawler/batch), if any
+        Other args: Output options
+    
+    Returns:
+        Dictionary with crawl summary and results
+    """
+    return _run_crawl(
+        self,
+        start_url=start_url,
+        config_dict=config_dict,
+        crawl_mode=crawl_mode,
+        enable_md=enable_md,
+        enable_html=enable_html,
+        enable_ss=enable_ss,
+        enable_json=enable_json,
+        enable_seo=enable_seo,
+        enable_structured=enable_structured,
+        batch_id=batch_id,
+    )
+
+
 @celery_app.task(
     name='celery_tasks.crawl_single_page',
     bind=True,
+    Request='web_crawler.scheduler:ScheduledRequest',  # frees scheduler slots on hard kills
     max_retries=2,
     time_limit=300,  # 5 minutes max
 )
-def crawl_single_page(self, url: str, config_dict: Dict) -> Dict:
+def crawl_single_page(
+    self,
+    url: str,
+    config_dict: Dict,
+    enable_md: bool = True,
+    enable_html: bool = False,
+    enable_ss: bool = False,
+    enable_json: bool = True,
+    enable_seo: bool = False,
+    enable_structured: bool = False,
+    batch_id: Optional[str] = None,
+) -> Dict:
     """
     Celery task to crawl a single page (faster, for single-page mode)
     """
-    return crawl_website(
+    return _run_crawl(
         self,
         start_url=url,
         config_dict=config_dict,
         crawl_mode="single",
-        enable_md=True,
-        enable_html=False,
-        enable_ss=False,
-        enable_json=True,
-        enable_links=True,
-        enable_seo=False,
+        enable_md=enable_md,
+        enable_html=enable_html,
+        enable_ss=enable_ss,
+        enable_json=enable_json,
+        enable_seo=enable_seo,
+        enable_structured=enable_structured,
+        batch_id=batch_id,
     )
 
 @celery_app.task(
     name='celery_tasks.crawl_links',
     bind=True,
+    Request='web_crawler.scheduler:ScheduledRequest',  # frees scheduler slots on hard kills
     max_retries=2,
     time_limit=300,  # 5 minutes max
 )
-def crawl_links(self, url: str, config_dict: Dict) -> Dict:
+def crawl_links(
+    self,
+    url: str,
+    config_dict: Dict,
+    enable_md: bool = True,
+    enable_html: bool = False,
+    enable_ss: bool = False,
+    enable_json: bool = True,
+    enable_seo: bool = False,
+    enable_structured: bool = False,
+    batch_id: Optional[str] = None,
+) -> Dict:
     """
-    Celery task to crawl a single page (faster, for single-page mode)
+    Celery task to crawl a page and collect its links (links mode)
     """
-    return crawl_website(
+    return _run_crawl(
         self,
         start_url=url,
         config_dict=config_dict,
         crawl_mode="links",
-        enable_md=True,
-        enable_html=False,
-        enable_ss=False,
-        enable_json=True,
-        enable_links=True,
-        enable_seo=False,
+        enable_md=enable_md,
+        enable_html=enable_html,
+        enable_ss=enable_ss,
+        enable_json=enable_json,
+        enable_seo=enable_seo,
+        enable_structured=enable_structured,
+        batch_id=batch_id,
     )
 
 
+@celery_app.task(
+    name='celery_tasks.scrape_search_results',
+    time_limit=300,  # 5 minutes max
+    soft_time_limit=240,
+)
+def scrape_search_results(results: List[Dict], top_n: int, proxy_type: str = "auto") -> List[Dict]:
+    """
+    Crawl the top search results for POST /search (page_queue), so the API
+    process never launches a browser. Pages are scraped into a temporary
+    directory; only their markdown is returned.
+    """
+    from web_crawler.search_scraper import scrape_search_results as scrape
+
+    return scrape(results, top_n, proxy_type=proxy_type)
+
+
 @celery_app.task(name='celery_tasks.cleanup_old_results')
 def cleanup_old_results(days_old: int = 7):
     """
@@ -3,7 +3,8 @@ Module for cleaning and minimizing HTML before markdown conversion.
 
 Key steps (mirrors Firecrawl's onlyMainContent pipeline):
   1. Remove boilerplate structural tags (nav, header, footer, aside …)
-  2. Remove elements matched by common noise class/id patterns
+  2. Keep only the scored main content (see main_content.py), falling back
+     to removing elements matched by common noise class/id patterns
   3. Strip class, id, data-* attributes (cuts markdown noise)
   4. Strip remaining unwanted tags (style, script, svg, form …)
   5. Minify the body HTML
@@ -11,11 +12,15 @@ Key steps (mirrors Firecrawl's onlyMainContent pipeline):
 
 import json
 import re
+from typing import Optional
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup, Comment
+from bs4 import BeautifulSoup, Comment, Tag
 from minify_html import minify
 
+from web_crawler.main_content import extract_main_content
+from web_crawler.structured_data import ROOT_CONTEXT, StructuredDataCollector
+
 # ── Constants ─────────────────────────────────────────────────────────────────
 
 # HTML tags that are structural boilerplate — never useful in markdown
@@ -52,168 +57,210 @@ _FORCE_INCLUDE_PATTERNS = (
 _KEEP_ATTRS = {"href", "src", "alt", "title", "colspan", "rowspan"}
 
 
-def extract_from_script_tags(soup):
-    script_content = []
+def _compile_substring_matcher(patterns):
+    """One alternation regex == `any(p in text for p in patterns)` in a single scan."""
+    ordered = sorted(set(patterns), key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in ordered))
 
-    for script in soup.find_all("script"):
-        content = script.string
-        if content:
-            try:
-                json_pattern = r"(?:const|let|var)?\s*\w+\s*=\s*({[\s\S]*?});?$"
-                json_matches = re.findall(json_pattern, content)
-
-                for potential_json in json_matches:
-                    try:
-                        parsed = json.loads(potential_json)
-                        if parsed:
-                            script_content.append(
-                                f"JSON data from script: {json.dumps(parsed, indent=2)}"
-                            )
-                    except json.JSONDecodeError:
-                        pass
-
-                if "window." in content or "document." in content:
-                    data_pattern = r"(?:window|document)\.(\w+)\s*=\s*([^;]+);"
-                    data_matches = re.findall(data_pattern, content)
-
-                    for var_name, var_value in data_matches:
-                        script_content.append(
-                            f"Dynamic data - {var_name}: {var_value.strip()}"
-                        )
-            except Exception:
-                if len(content) < 1000:
-                    script_content.append(f"Script content: {content.strip()}")
 
-    return "\n\n".join(script_content)
+def _compile_token_matcher(patterns):
+    """Like _compile_substring_matcher, but only on token boundaries ("ad" ≠ "header")."""
+    ordered = sorted(set(patterns), key=len, reverse=True)
+    alternation = "|".join(re.escape(p) for p in ordered)
+    return re.compile(rf"(?<![a-z0-9])(?:{alternation})(?![a-z0-9])")
+
 
+_NOISE_RE = _compile_token_matcher(_NOISE_PATTERNS)
+_FORCE_INCLUDE_RE = _compile_substring_matcher(_FORCE_INCLUDE_PATTERNS)
+_BOILERPLATE_TAG_SET = frozenset(_BOILERPLATE_TAGS)
 
-def _remove_noise_by_class_id(soup: BeautifulSoup) -> None:
+
+_MAX_SCRIPT_OUTPUT_CHARS = 200_000  # total budget for extracted script data
+_JSON_SCRIPT_TYPES = {"application/ld+json", "application/json"}
+# `window.X =`, `var X =` … up to the first char of a JSON object / array
+_JS_ASSIGNMENT_RE = re.compile(r"(?:\bwindow\.|\b(?:var|let|const)\s+)([A-Za-z_$][\w$]*)\s*=\s*(?=[\[{])")
+_json_decoder = json.JSONDecoder()
+
+
+def extract_from_script_tags(soup):
     """
-    Remove elements whose class or id contains any of the noise pattern keywords.
+    Collect structured data embedded in <script> tags:
+      - JSON-LD and other JSON script blocks (incl. Next.js __NEXT_DATA__)
+      - `window.X = {...}` / `var X = {...}` JSON assignments in inline JS
 
-    Two-pass approach:
-      1. Collect all matching tags into a list (snapshot of the tree)
-      2. Decompose them — safe because children of already-decomposed
-         parents are skipped via the `tag.parent` check.
+    Assignments are located with a non-backtracking regex and the value is
+    parsed in place with JSONDecoder.raw_decode, so each script is scanned
+    once. Scripts that cannot fit the remaining output budget are skipped.
     """
-    to_remove = []
-    for tag in soup.find_all(True):
-        # Skip tags that were already decomposed by a parent in this loop
-        if tag.parent is None:
-            continue
-        try:
-            cls_str  = " ".join(tag.get("class") or []).lower()
-            id_str   = (tag.get("id") or "").lower()
-        except AttributeError:
-            # Tag is in a partially decomposed state — skip it
+    script_content = []
+    budget = _MAX_SCRIPT_OUTPUT_CHARS
+
+    def add(entry: str) -> None:
+        nonlocal budget
+        if len(entry) <= budget:
+            script_content.append(entry)
+            budget -= len(entry)
+
+    for script in soup.find_all("script"):
+        content = script.string
+        # Serialised output is about as long as the source — skip what cannot fit
+        if not content or len(content) > budget:
             continue
-        combined = f"{cls_str} {id_str}"
-        
-        # Check if it should be forced-included
-        if any(pat in combined for pat in _FORCE_INCLUDE_PATTERNS):
+
+        script_type = (script.get("type") or "").lower()
+        if script_type in _JSON_SCRIPT_TYPES:
+            try:
+                parsed = json.loads(content)
+            except json.JSONDecodeError:
+                continue
+            label = script.get("id") or script_type
+            if parsed:
+                add(f"JSON data from script ({label}): {json.dumps(parsed, ensure_ascii=False)}")
             continue
 
-        if any(pat in combined for pat in _NOISE_PATTERNS):
-            to_remove.append(tag)
+        if script_type and "javascript" not in script_type and script_type != "module":
+            continue
 
-    for tag in to_remove:
-        # Guard: parent may have already been decomposed
-        if tag.parent is not None:
-            tag.decompose()
+        for match in _JS_ASSIGNMENT_RE.finditer(content):
+            try:
+                parsed, _ = _json_decoder.raw_decode(content, match.end())
+            except json.JSONDecodeError:
+                # JS object literal, not JSON — skip
+                continue
+            if parsed:
+                add(f"Dynamic data - {match.group(1)}: {json.dumps(parsed, ensure_ascii=False)}")
 
+    return "\n\n".join(script_content)
 
-def _absolutize_urls(soup: BeautifulSoup, base_url: str) -> None:
-    """
-    Resolve all relative href and src attributes to absolute URLs.
-    Must run BEFORE attribute stripping so links survive into markdown.
 
-    Without this, html2text produces broken links like:
-      [View More](</web-application-development/>)
-    Instead of:
-      [View More](https://gramosoft.tech/web-application-development/)
-    """
-    for tag in soup.find_all(True):
-        if tag.parent is None:
-            continue
-        try:
-            if tag.get("href"):
-                tag["href"] = urljoin(base_url, tag["href"])
-            if tag.get("src"):
-                tag["src"] = urljoin(base_url, tag["src"])
-        except (AttributeError, TypeError):
-            continue
+def _is_noise(tag) -> bool:
+    """True if the tag's class/id matches a noise pattern and no force-include pattern."""
+    cls = tag.get("class") or []
+    combined = f"{' '.join(cls) if isinstance(cls, list) else cls} {tag.get('id') or ''}".lower()
+    if combined == " ":
+        return False
+    if _FORCE_INCLUDE_RE.search(combined):
+        return False
+    return _NOISE_RE.search(combined) is not None
 
 
-def _strip_noisy_attributes(soup: BeautifulSoup) -> None:
+def _largest_srcset_candidate(srcset: str):
     """
-    Strip every HTML attribute except those in _KEEP_ATTRS.
-    Removes class, id, data-*, aria-*, style, on* handlers, etc.
-    This prevents class/id names from leaking into markdown output.
+    Firecrawl logic: pick the largest image from srcset.
+    Returns None if srcset has no usable candidate.
     """
-    for tag in soup.find_all(True):
-        if tag.parent is None:
-            continue  # skip already-decomposed orphans
-        try:
-            for attr in list(tag.attrs):
-                if attr not in _KEEP_ATTRS:
-                    del tag[attr]
-        except (AttributeError, TypeError):
+    # Parse srcset: "url size, url size, ..."
+    # size can be "1200w" or "2x"
+    best_url, best_size = None, None
+    for item in srcset.split(","):
+        parts = item.strip().split()
+        if not parts:
             continue
-
-
-def _process_srcset(soup: BeautifulSoup) -> None:
+        url = parts[0]
+        size_str = parts[1] if len(parts) > 1 else "1x"
+
+        # Extract numeric value from size_str (e.g., "1200w" -> 1200, "2x" -> 2)
+        size_val = 1
+        if size_str.lower().endswith(("w", "x")) and size_str[:-1].isdigit():
+            size_val = int(size_str[:-1])
+
+        # Strictly greater keeps the first of equal-sized candidates
+        if best_size is None or size_val > best_size:
+            best_url, best_size = url, size_val
+    return best_url
+
+
+def _clean_tree(
+    soup: BeautifulSoup,
+    base_url: str,
+    only_main_content: bool,
+    collector: Optional[StructuredDataCollector] = None,
+):
     """
-    Firecrawl logic: pick the largest image from srcset and set it as src.
+    Single pre-order traversal that does every per-node cleanup step:
+    boilerplate-tag and noise removal, comment removal, srcset resolution,
+    href/src absolutization, attribute stripping, and link/image collection.
+
+    Removed subtrees are never descended into, so nothing is visited twice.
+    With a `collector`, structured data is recorded in the same walk: each
+    element before its attributes are stripped, removed subtrees (<head>,
+    JSON-LD <script> …) just before they are dropped.
+    Returns (link_urls, image_urls) in document order.
     """
-    for img in soup.find_all("img", srcset=True):
-        try:
-            srcset = img.get("srcset", "")
-            if not srcset:
-                continue
+    link_urls = []
+    image_urls = []
+    context = ROOT_CONTEXT
+    stack = [(child, context) for child in reversed(list(soup.children))]
+
+    while stack:
+        node, context = stack.pop()
+        if not isinstance(node, Tag):
+            if isinstance(node, Comment):
+                node.extract()
+            continue
 
-            # Parse srcset: "url size, url size, ..."
-            # size can be "1200w" or "2x"
-            candidates = []
-            for item in srcset.split(","):
-                parts = item.strip().split()
-                if not parts:
-                    continue
-                url = parts[0]
-                size_str = parts[1] if len(parts) > 1 else "1x"
-                
-                # Extract numeric value from size_str (e.g., "1200w" -> 1200, "2x" -> 2)
-                size_val = 1
-                try:
-                    if size_str.lower().endswith(("w", "x")):
-                        size_val = int(size_str[:-1]) if size_str[:-1].isdigit() else 1
-                except ValueError:
-                    size_val = 1
-                
-                candidates.append({"url": url, "size": size_val})
-
-            if candidates:
-                # Sort by size descending
-                candidates.sort(key=lambda x: x["size"], reverse=True)
-                img["src"] = candidates[0]["url"]
-        except Exception:
+        if node.name in _BOILERPLATE_TAG_SET or (only_main_content and _is_noise(node)):
+            if collector is not None:
+                collector.visit_subtree(node, context)
+            node.decompose()
             continue
 
+        if collector is not None:
+            context = collector.visit(node, context)
+
+        attrs = node.attrs
+        if node.name == "img" and attrs.get("srcset"):
+            url = _largest_srcset_candidate(attrs["srcset"])
+            if url:
+                attrs["src"] = url
+
+        # Absolutize BEFORE stripping so links survive into markdown
+        if attrs.get("href"):
+            attrs["href"] = urljoin(base_url, attrs["href"])
+        if attrs.get("src"):
+            attrs["src"] = urljoin(base_url, attrs["src"])
+
+        for attr in [a for a in attrs if a not in _KEEP_ATTRS]:
+            del attrs[attr]
+
+        # Pop order is document order — record this node's link / image now
+        if node.name == "a" and "href" in attrs:
+            link_urls.append(attrs["href"])
+        elif node.name == "img" and "src" in attrs:
+            image_urls.append(attrs["src"])
 
-def cleanup_html(html_content: str, base_url: str, only_main_content: bool = False) -> str:
+        # Reverse so popping yields document order
+        for child in reversed(list(node.children)):
+            stack.append((child, context))
+
+    return link_urls, image_urls
+
+
+def cleanup_soup(
+    html_content: str,
+    base_url: str,
+    only_main_content: bool = False,
+    collector: Optional[StructuredDataCollector] = None,
+):
     """
     Cleans HTML before markdown conversion using a Firecrawl-style pipeline:
 
       1. Parse with BeautifulSoup
-      2. Extract script-tag JSON data (kept for context)
-      3. Remove boilerplate structural tags (nav, header, footer …)
-      4. Remove elements matched by noise class/id patterns (if only_main_content=True)
-      5. Remove HTML comments
-      6. Strip noisy attributes (class, id, data-*, aria-*, on* …)
-      7. Collect links and image URLs
-      8. Minify the body HTML
+      2. Single tree pass:
+           - remove boilerplate structural tags (style, script, svg, form …)
+           - remove elements matched by noise class/id patterns (if only_main_content=True
+             and main_content.extract_main_content found no clear content block)
+           - remove HTML comments
+           - resolve srcset and absolutize href/src
+           - strip noisy attributes (class, id, data-*, aria-*, on* …)
+           - collect links and image URLs
 
     Returns:
-        (title, minimized_body_html, link_urls, image_urls, script_content)
+        (title, body_tag, link_urls, image_urls)
+
+    Script-tag data is not part of the markdown; callers that want it run
+    extract_from_script_tags on their own soup. A `collector` is fed the
+    page's structured data (JSON-LD, microdata, RDFa, OG) during step 2.
     """
     soup = BeautifulSoup(html_content, "html.parser")
 
@@ -221,49 +268,24 @@ def cleanup_html(html_content: str, base_url: str, only_main_content: bool = Fal
     title_tag = soup.find("title")
     title = title_tag.get_text(strip=True) if title_tag else ""
 
-    # ── Script-tag data extraction (before scripts are removed) ───────────────
-    script_content = extract_from_script_tags(soup)
-
-    # ── Step 1: Remove completely unneeded tags ───────────────────────────────
-    for tag_name in _BOILERPLATE_TAGS:
-        for tag in soup.find_all(tag_name):
-            tag.decompose()
-
-    # Step 2: Remove noise (only if only_main_content is enabled)
-    if only_main_content:
-        _remove_noise_by_class_id(soup)
-    else:
-        # Even in non-main-content mode, we still remove the absolute unneeded tags
-        # passed in _BOILERPLATE_TAGS already (script, style, etc.)
-        pass
-
-    # ── Step 3: Remove HTML comments ─────────────────────────────────────────
-    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-        comment.extract()
-
-    # ── Step 3b: Process srcset images ───────────────────────────────────────
-    _process_srcset(soup)
-
-    # ── Step 4: Absolutize href/src BEFORE stripping attributes ──────────────
-    # This ensures html2text always sees full absolute URLs in links/images.
-    _absolutize_urls(soup, base_url)
-
-    # ── Step 5: Strip noisy attributes ──────────────────────────────────────────
-    _strip_noisy_attributes(soup)
-
-    # ── Collect links and images (after absolutizing, before minify) ──────────
-    link_urls = [
-        link["href"] for link in soup.find_all("a", href=True)
-    ]
-
-    image_urls = [
-        img["src"] for img in soup.find_all("img", src=True)
-    ]
+    # ── Steps 1–5 in one traversal: boilerplate tags, noise (if
+    #    only_main_content), comments, srcset, absolutize, strip attributes,
+    #    and link / image collection
+    #    Main-content mode first scores the page and keeps the best block;
+    #    class/id noise removal is the fallback when no block stands out.
+    if collector is not None and only_main_content:
+        # Main-content extraction drops whole regions before the walk;
+        # their structured data still belongs to the page
+        for child in soup.find_all(True, recursive=False):
+            collector.visit_subtree(child, ROOT_CONTEXT)
+        collector = None
+    main_extracted = only_main_content and extract_main_content(soup)
+    link_urls, image_urls = _clean_tree(soup, base_url, only_main_content and not main_extracted, collector)
 
     # ── return body ────────────────────────────────────────────────
     body_content = soup.find("body")
     if body_content:
-        return title, str(body_content), link_urls, image_urls, script_content
+        return title, body_content, link_urls, image_urls
     else:
         raise ValueError(
             "No HTML body content found. "
@@ -271,6 +293,22 @@ def cleanup_html(html_content: str, base_url: str, only_main_content: bool = Fal
         )
 
 
+def cleanup_html(
+    html_content: str,
+    base_url: str,
+    only_main_content: bool = False,
+    collector: Optional[StructuredDataCollector] = None,
+) -> str:
+    """
+    cleanup_soup, serialised.
+
+    Returns:
+        (title, minimized_body_html, link_urls, image_urls)
+    """
+    title, body, link_urls, image_urls = cleanup_soup(html_content, base_url, only_main_content, collector)
+    return title, str(body), link_urls, image_urls
+
+
 def minify_html(html):
     """
     minify_html function
@@ -43,6 +43,30 @@ class CrawlConfig:
     enhanced_proxies: Optional[Union[str, list]] = None
     proxy_mode: str = "auto"  # "auto", "basic", "stealth", "enhanced"
 
+    # robots.txt compliance for full-site crawls (Allow/Disallow + Crawl-delay)
+    respect_robots_txt: Optional[bool] = None
+    max_crawl_delay: float = 10.0  # cap on honoured Crawl-delay, in seconds
+
+    # Search-URL crawls: also scrape the top-N result pages (0 = titles/snippets only)
+    search_scrape_results: Optional[int] = None
+
+    # Markdown converter: "native" (single-pass DOM emitter) or "html2text" (legacy)
+    markdown_engine: Optional[str] = None
+
+    # Screenshots (enable_ss): full page vs viewport, png/jpeg/webp, quality for
+    # lossy formats, height clip (0 = none), device scale, thumbnail width (0 = none)
+    screenshot_full_page: Optional[bool] = None
+    screenshot_format: Optional[str] = None
+    screenshot_quality: Optional[int] = None
+    screenshot_max_height: Optional[int] = None
+    screenshot_scale: Optional[float] = None
+    screenshot_thumbnail_width: Optional[int] = None
+
+    # Crawl-scoped cache for static sub-resources (JS/CSS/images) shared across
+    # pages: memory budget in MB (0 = off), optional disk tier under output_dir
+    response_cache_mb: Optional[int] = None
+    response_cache_disk: Optional[bool] = None
+
     def __post_init__(self):
         self.proxy_server = self._clean_env(self.proxy_server or os.getenv("PROXY_SERVER"))
         self.proxy_username = self._clean_env(self.proxy_username or os.getenv("PROXY_USERNAME"))
@@ -71,6 +95,36 @@ class CrawlConfig:
             raw_proxy_mode = os.getenv("PROXY_MODE", raw_proxy_mode)
         self.proxy_mode = self._normalize_proxy_mode(raw_proxy_mode)
 
+        if self.respect_robots_txt is None:
+            self.respect_robots_txt = self._env_flag("RESPECT_ROBOTS_TXT", True)
+
+        if self.search_scrape_results is None:
+            self.search_scrape_results = int(os.getenv("SEARCH_SCRAPE_RESULTS", "0") or 0)
+
+        if self.markdown_engine is None:
+            self.markdown_engine = os.getenv("MARKDOWN_ENGINE", "native")
+        self.markdown_engine = "html2text" if str(self.markdown_engine).strip().lower() == "html2text" else "native"
+
+        if self.screenshot_full_page is None:
+            self.screenshot_full_page = self._env_flag("SCREENSHOT_FULL_PAGE", True)
+        if self.screenshot_format is None:
+            self.screenshot_format = os.getenv("SCREENSHOT_FORMAT", "png")
+        self.screenshot_format = self._normalize_screenshot_format(self.screenshot_format)
+        if self.screenshot_quality is None:
+            self.screenshot_quality = int(os.getenv("SCREENSHOT_QUALITY", "80") or 80)
+        self.screenshot_quality = max(1, min(100, int(self.screenshot_quality)))
+        if self.screenshot_max_height is None:
+            self.screenshot_max_height = int(os.getenv("SCREENSHOT_MAX_HEIGHT", "0") or 0)
+        if self.screenshot_scale is None:
+            self.screenshot_scale = float(os.getenv("SCREENSHOT_SCALE", "1") or 1)
+        if self.screenshot_thumbnail_width is None:
+            self.screenshot_thumbnail_width = int(os.getenv("SCREENSHOT_THUMBNAIL_WIDTH", "0") or 0)
+
+        if self.response_cache_mb is None:
+            self.response_cache_mb = int(os.getenv("RESPONSE_CACHE_MB", "128") or 0)
+        if self.response_cache_disk is None:
+            self.response_cache_disk = self._env_flag("RESPONSE_CACHE_DISK", False)
+
         # If legacy CRAWL_PROXY is not set, derive requests-compatible proxy from BYOP env.
         if self.proxy is None and self.proxy_server:
             self.proxy = self._compose_proxy_url(
@@ -88,6 +142,13 @@ class CrawlConfig:
         trimmed = value.strip()
         return trimmed if trimmed else None
 
+    @staticmethod
+    def _env_flag(name: str, default: bool) -> bool:
+        value = os.getenv(name)
+        if value is None or not value.strip():
+            return default
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+
     @staticmethod
     def _compose_proxy_url(
         server: str,
@@ -121,6 +182,13 @@ class CrawlConfig:
         mode = (value or "auto").strip().lower()
         return mode if mode in allowed else "auto"
 
+    @staticmethod
+    def _normalize_screenshot_format(value: Optional[str]) -> str:
+        fmt = (value or "png").strip().lower()
+        if fmt == "jpg":
+            fmt = "jpeg"
+        return fmt if fmt in {"png", "jpeg", "webp"} else "png"
+
     def get_playwright_proxy(self) -> Optional[dict]:
         """
         Return a Playwright-compatible proxy block from Firecrawl-style env vars.
@@ -145,3 +213,6 @@ class CrawlConfig:
         self.json_file = base / "pages.json"
         self.summary_file = base / "summary.json"
         self.seo_dir = base / "seo"
+        self.structured_dir = base / "structured"
+        self.structured_file = base / "structured.jsonl"
+        self.response_cache_dir = base / ".response_cache"
@@ -0,0 +1,196 @@
+"""
+Content fingerprinting — skip near-identical pages during a crawl.
+
+URL / canonical dedup misses sites where tracking params, session IDs or
+faceted navigation produce many URLs that render the same content. Every
+rendered page is fingerprinted BEFORE output generation, over its main
+content (main_content.extract_main_content) so that shared navigation,
+headers and footers do not make different short pages look alike:
+
+  1. Exact hash   → SHA-1 of the normalised main-content text
+  2. SimHash      → 64-bit fingerprint over 3-word shingles; pages within
+                    a Hamming distance of 3 are near-duplicates
+                    (4 × 16-bit band index → candidate lookup is O(1))
+
+Duplicates skip markdown/HTML/screenshot generation entirely; their links
+still feed the frontier.
+
+Each duplicate is also charged to its URL *pattern* (path with numeric /
+hex / UUID segments collapsed, query keys without values). Patterns that
+keep producing duplicates are reported as noisy so the frontier can push
+their URLs to the back of the queue.
+"""
+
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from bs4 import BeautifulSoup
+
+from web_crawler.main_content import extract_main_content
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ID_SEGMENT_RE = re.compile(
+    r"^(?:\d+|[0-9a-f]{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$",
+    re.IGNORECASE,
+)
+_TEXT_SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+_TEMPLATE_TAGS = ["nav", "header", "footer", "aside"]
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SIMHASH_MAX_DISTANCE = 3        # must stay < SIMHASH_BANDS for the band index to be exact
+_SHINGLE_SIZE = 3
+_MAX_TOKENS = 20_000            # fingerprint the first N tokens of very long pages
+_MIN_NEAR_DUP_TOKENS = 50       # thin pages only use the exact hash
+
+_NOISY_MIN_DUPLICATES = 3       # pattern needs this many duplicates ...
+_NOISY_MIN_RATIO = 0.5          # ... and this share of its pages duplicated
+
+
+# ── Fingerprinting ───────────────────────────────────────────────────────────
+
+def page_text(html: str) -> str:
+    """
+    Visible text of the page's main content (scripts, styles and templates
+    excluded). Parses its own copy: extraction rewrites the tree in place.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    # Site chrome goes first, so extraction can never keep it as a sibling block
+    for tag in soup.find_all(_TEMPLATE_TAGS):
+        tag.decompose()
+    extract_main_content(soup)
+    root = soup.body or soup
+    parts = []
+    for text in root.find_all(string=True):
+        if text.parent is not None and text.parent.name in _TEXT_SKIP_TAGS:
+            continue
+        stripped = text.strip()
+        if stripped:
+            parts.append(stripped)
+    return " ".join(parts)
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())[:_MAX_TOKENS]
+
+
+def exact_fingerprint(tokens: List[str]) -> str:
+    return hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash over word shingles."""
+    if len(tokens) < _SHINGLE_SIZE:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [
+            " ".join(tokens[i:i + _SHINGLE_SIZE])
+            for i in range(len(tokens) - _SHINGLE_SIZE + 1)
+        ]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _bands(fingerprint: int) -> List[Tuple[int, int]]:
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << width) - 1
+    return [(i, (fingerprint >> (i * width)) & mask) for i in range(SIMHASH_BANDS)]
+
+
+def url_pattern(url: str) -> str:
+    """
+    Collapse a URL into the pattern it was generated from:
+      /product/12345?color=red&sid=abc → host/product/{id}?color&sid
+    """
+    parsed = urlparse(url)
+    segments = [
+        "{id}" if _ID_SEGMENT_RE.match(seg) else seg
+        for seg in parsed.path.split("/")
+        if seg
+    ]
+    keys = sorted({k for k, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    pattern = f"{parsed.netloc.lower()}/{'/'.join(segments)}"
+    if keys:
+        pattern += "?" + "&".join(keys)
+    return pattern
+
+
+# ── Crawl-scoped deduplicator ────────────────────────────────────────────────
+
+class ContentDeduplicator:
+    """Thread-safe exact + near-duplicate detector shared by all crawl workers."""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._exact: Dict[str, str] = {}
+        self._band_index: Dict[Tuple[int, int], List[Tuple[int, str]]] = defaultdict(list)
+        self._pattern_pages: Dict[str, int] = defaultdict(int)
+        self._pattern_dups: Dict[str, int] = defaultdict(int)
+
+    def check(self, url: str, text: str) -> Optional[str]:
+        """
+        Register a rendered page. Returns the URL of the earlier page it
+        duplicates, or None if its content is new. A page never duplicates
+        itself: a retry of the same URL (e.g. through Camoufox after
+        process_page failed) matches its own earlier registration.
+        """
+        tokens = _tokens(text)
+        exact = exact_fingerprint(tokens)
+        fingerprint = simhash(tokens) if len(tokens) >= _MIN_NEAR_DUP_TOKENS else None
+        pattern = url_pattern(url)
+
+        with self._lock:
+            self._pattern_pages[pattern] += 1
+
+            duplicate_of = self._exact.get(exact)
+            if duplicate_of == url:
+                duplicate_of = None
+            if duplicate_of is None and fingerprint is not None:
+                duplicate_of = self._find_near_duplicate(fingerprint, url)
+
+            if duplicate_of is not None:
+                self._pattern_dups[pattern] += 1
+                return duplicate_of
+
+            self._exact.setdefault(exact, url)
+            if fingerprint is not None:
+                for band in _bands(fingerprint):
+                    self._band_index[band].append((fingerprint, url))
+            return None
+
+    def _find_near_duplicate(self, fingerprint: int, url: str) -> Optional[str]:
+        for band in _bands(fingerprint):
+            for candidate, candidate_url in self._band_index.get(band, ()):
+                if candidate_url == url:
+                    continue
+                if bin(candidate ^ fingerprint).count("1") <= self.max_distance:
+                    return candidate_url
+        return None
+
+    def is_noisy(self, url: str) -> bool:
+        """True if URLs of this pattern have mostly rendered duplicate content."""
+        pattern = url_pattern(url)
+        with self._lock:
+            dups = self._pattern_dups.get(pattern, 0)
+            if dups < _NOISY_MIN_DUPLICATES:
+                return False
+            return dups / self._pattern_pages[pattern] >= _NOISY_MIN_RATIO
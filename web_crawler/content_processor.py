@@ -2,12 +2,15 @@
 Content processing and extraction utilities
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from bs4 import BeautifulSoup
 import html2text
 from urllib.parse import urlparse, urljoin
 from web_crawler.utils import absolutize_url
-from web_crawler.cleanup_html import cleanup_html
+from web_crawler.url_normalizer import canonicalize_url
+from web_crawler.cleanup_html import cleanup_html, cleanup_soup
+from web_crawler.markdown_emitter import emit_markdown, to_markdown
+from web_crawler.structured_data import StructuredDataCollector
 
 
 def _post_process_markdown(md: str) -> str:
@@ -81,7 +84,7 @@ class ContentProcessor:
         base_parsed = urlparse(base_url)
         base_host = base_parsed.netloc.lower()  # e.g. "gramosoft.tech"
 
-        seen_paths = set()
+        seen_urls = set()
         links = []
 
         for anchor in soup.find_all("a", href=True):
@@ -104,19 +107,12 @@ class ContentProcessor:
                 continue
 
             # Normalize: strip query string and fragment, normalize trailing slash
-            path = parsed.path
-            if path != "/" and path.endswith("/"):
-                path = path.rstrip("/")  # /about/ → /about
+            clean_url = canonicalize_url(url, keep_query=False)
 
-            # Rebuild clean URL: scheme + host + path only
-            clean_url = f"{parsed.scheme}://{parsed.netloc}{path}"
-            if path == "":
-                clean_url = f"{parsed.scheme}://{parsed.netloc}/"
-
-            # Deduplicate by normalized path
-            if path in seen_paths:
+            # Deduplicate by normalized URL
+            if clean_url in seen_urls:
                 continue
-            seen_paths.add(path)
+            seen_urls.add(clean_url)
 
             links.append(clean_url)
 
@@ -175,9 +171,46 @@ class ContentProcessor:
         }
     
     @staticmethod
-    def convert_to_markdown(html: str, url: str, only_main_content: bool = False) -> str:
+    def convert_to_markdown(html: str, url: str, only_main_content: bool = False, engine: str = "native") -> str:
         """Convert HTML to clean, LLM-ready markdown (Firecrawl-style)"""
-        title, clean_body, links, images, script_data = cleanup_html(html, url, only_main_content)
+        if engine == "html2text":
+            return ContentProcessor._convert_with_html2text(html, url, only_main_content)
+
+        title, body, links, images = cleanup_soup(html, url, only_main_content)
+        return to_markdown(body)
+
+    @staticmethod
+    def write_markdown(
+        html: str,
+        url: str,
+        path,
+        only_main_content: bool = False,
+        engine: str = "native",
+        collector: Optional[StructuredDataCollector] = None,
+    ) -> None:
+        """
+        Convert HTML to markdown and stream it straight into `path`.
+        A `collector` picks up the page's structured data in the same cleanup walk.
+        """
+        if engine == "html2text":
+            markdown = ContentProcessor._convert_with_html2text(html, url, only_main_content, collector)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(markdown)
+            return
+
+        title, body, links, images = cleanup_soup(html, url, only_main_content, collector)
+        with open(path, "w", encoding="utf-8") as f:
+            emit_markdown(body, f.write)
+
+    @staticmethod
+    def _convert_with_html2text(
+        html: str,
+        url: str,
+        only_main_content: bool = False,
+        collector: Optional[StructuredDataCollector] = None,
+    ) -> str:
+        """Legacy html2text conversion (MARKDOWN_ENGINE=html2text)"""
+        title, clean_body, links, images = cleanup_html(html, url, only_main_content, collector)
 
         converter = html2text.HTML2Text()
         converter.ignore_links      = False
@@ -26,10 +26,12 @@ def main(
     enable_json: bool = False,
     enable_links: bool = True,
     enable_seo: bool = False,
+    enable_structured: bool = False,
     client_id: Optional[str] = None,
     websocket_manager = None,
     crawl_mode: str = "all",
-    config: Optional[CrawlConfig] = None
+    config: Optional[CrawlConfig] = None,
+    progress=None
 ) -> Dict:
     """Main entry point for the crawler"""
     
@@ -59,9 +61,12 @@ def main(
     (Path(config.output_dir) / "screenshots").mkdir(parents=True, exist_ok=True)
     (Path(config.output_dir) / "markdown").mkdir(parents=True, exist_ok=True)
     (Path(config.output_dir) / "seo").mkdir(parents=True, exist_ok=True)
+    if enable_structured:
+        config.structured_dir.mkdir(parents=True, exist_ok=True)
     
     # Initialize and run crawler
     crawler = WebCrawler(config)
+    crawler.progress = progress  # ProgressReporter (Celery tasks) or None
     
     summary = crawler.crawl(
         start_url=start_url,
@@ -71,6 +76,7 @@ def main(
         enable_json=enable_json,
         enable_links=enable_links,
         enable_seo=enable_seo,
+        enable_structured=enable_structured,
         client_id=client_id,
         websocket_manager=websocket_manager,
         crawl_mode=crawl_mode
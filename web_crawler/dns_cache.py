@@ -0,0 +1,230 @@
+"""
+Shared DNS cache — positive / negative TTL cache of hostname lookups used
+by the /crawler endpoint, the map crawler's HTTP client and the Chromium
+launches.
+
+  - positive hits are kept DNS_CACHE_TTL seconds, definitive failures
+    (NXDOMAIN, no address) DNS_NEGATIVE_TTL seconds
+  - tier 1 is an in-process dict, tier 2 Redis ("dns:{host}"), so the API
+    and the Celery workers reuse each other's lookups; Redis failures are
+    ignored
+  - resolve_async() runs the lookup off the event loop and coalesces
+    concurrent lookups of the same host into one, so a burst of
+    submissions for one domain costs a single query
+  - host_resolver_rules() turns cached answers into Chromium's
+    --host-resolver-rules so the browser does not look the host up again
+
+Timeouts and transient resolver errors (EAI_AGAIN, SERVFAIL, ...) are
+not cached: a slow or failing resolver says nothing about the domain.
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_POSITIVE_TTL = int(os.getenv("DNS_CACHE_TTL", "300") or 0)
+_NEGATIVE_TTL = int(os.getenv("DNS_NEGATIVE_TTL", "30") or 0)
+_TIMEOUT = float(os.getenv("DNS_TIMEOUT", "5") or 5)
+_MAX_ENTRIES = 10_000
+
+# getaddrinfo errors that mean "this name has no address"; anything else is the resolver's fault
+_NEGATIVE_ERRNOS = {
+    code for code in (
+        getattr(socket, "EAI_NONAME", None),
+        getattr(socket, "EAI_NODATA", None),
+    ) if code is not None
+}
+
+
+class DnsResolutionError(Exception):
+    """The hostname does not resolve (possibly answered from the negative cache)."""
+
+
+class DnsTemporaryError(Exception):
+    """The resolver failed without an answer; like a timeout, nothing is known about the host."""
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _getaddrinfo(host: str) -> List[str]:
+    infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    addresses = list(dict.fromkeys(sockaddr[0] for *_, sockaddr in infos))
+    # IPv4 first: it is what most origins are reachable on
+    addresses.sort(key=lambda address: ":" in address)
+    return addresses
+
+
+class DnsCache:
+    """Two-tier (dict + Redis) cache of hostname → addresses, with negative entries."""
+
+    def __init__(self, positive_ttl: int = _POSITIVE_TTL, negative_ttl: int = _NEGATIVE_TTL):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        # host → (addresses, expires); an empty list is a negative entry
+        self._entries: Dict[str, Tuple[List[str], float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+
+    # ── Redis (best effort) ──────────────────────────────────────────────────
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                decode_responses=True,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._redis
+
+    def _redis_get(self, host: str) -> Optional[List[str]]:
+        try:
+            raw = self._redis_client().get(f"dns:{host}")
+        except Exception as e:
+            logger.debug(f"DNS cache Redis read failed: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _redis_set(self, host: str, addresses: List[str], ttl: int) -> None:
+        try:
+            self._redis_client().setex(f"dns:{host}", ttl, json.dumps(addresses))
+        except Exception as e:
+            logger.debug(f"DNS cache Redis write failed: {e}")
+
+    # ── Cache ────────────────────────────────────────────────────────────────
+
+    def peek(self, host: str) -> Optional[List[str]]:
+        """Cached addresses for `host` (empty list = known bad), None if unknown."""
+        host = host.lower().rstrip(".")
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[host]
+                return None
+            return entry[0]
+
+    def _store(self, host: str, addresses: List[str], share: bool = True) -> None:
+        ttl = self.positive_ttl if addresses else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= _MAX_ENTRIES:
+                now = time.monotonic()
+                self._entries = {h: e for h, e in self._entries.items() if e[1] > now}
+                if len(self._entries) >= _MAX_ENTRIES:
+                    self._entries.clear()
+            self._entries[host] = (addresses, time.monotonic() + ttl)
+        if share:
+            self._redis_set(host, addresses, ttl)
+
+    def _lookup(self, host: str) -> List[str]:
+        """Redis, then the system resolver; stores the outcome. Blocking."""
+        shared = self._redis_get(host)
+        if shared is not None:
+            self._store(host, shared, share=False)
+            return shared
+        try:
+            addresses = _getaddrinfo(host)
+        except socket.gaierror as e:
+            if e.errno not in _NEGATIVE_ERRNOS:
+                logger.debug(f"DNS lookup for {host} failed temporarily: {e}")
+                raise DnsTemporaryError(host) from e
+            logger.debug(f"DNS lookup failed for {host}: {e}")
+            addresses = []
+        except UnicodeError as e:
+            logger.debug(f"DNS lookup failed for {host}: {e}")
+            addresses = []
+        self._store(host, addresses)
+        return addresses
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def resolve(self, host: str) -> List[str]:
+        """
+        Addresses of `host`; raises DnsResolutionError when it does not resolve
+        and DnsTemporaryError when the resolver could not say.
+        """
+        host = host.lower().rstrip(".")
+        if _is_ip(host):
+            return [host]
+        addresses = self.peek(host)
+        if addresses is None:
+            addresses = self._lookup(host)
+        if not addresses:
+            raise DnsResolutionError(host)
+        return addresses
+
+    async def resolve_async(self, host: str, timeout: float = _TIMEOUT) -> List[str]:
+        """
+        resolve() for async code: the lookup runs in the default executor and
+        concurrent calls for the same host share it. Raises asyncio.TimeoutError
+        when the resolver is slower than `timeout`, DnsTemporaryError when it fails.
+        """
+        host = host.lower().rstrip(".")
+        if _is_ip(host):
+            return [host]
+        addresses = self.peek(host)
+        if addresses is None:
+            future = self._inflight.get(host)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(None, self._lookup, host)
+                self._inflight[host] = future
+                future.add_done_callback(lambda _f: self._inflight.pop(host, None))
+            addresses = await asyncio.wait_for(asyncio.shield(future), timeout)
+        if not addresses:
+            raise DnsResolutionError(host)
+        return addresses
+
+    def is_known_bad(self, url_or_host: str) -> bool:
+        """True when the host is negatively cached — callers can skip the request."""
+        host = urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host
+        return bool(host) and self.peek(host) == []
+
+    def host_resolver_rules(self, urls: Iterable[str]) -> Optional[str]:
+        """
+        Chromium --host-resolver-rules value pinning each URL's host to its
+        (cached) address, e.g. "MAP example.com 93.184.216.34". Hosts that do
+        not resolve are left to the browser; None when there is nothing to map.
+        """
+        rules = []
+        for url in urls:
+            host = (urlsplit(url).hostname or "").lower()
+            if not host or _is_ip(host):
+                continue
+            try:
+                address = self.resolve(host)[0]
+            except (DnsResolutionError, DnsTemporaryError):
+                continue
+            rules.append(f"MAP {host} {f'[{address}]' if ':' in address else address}")
+        return ", ".join(dict.fromkeys(rules)) or None
+
+    def chromium_args(self, url: str) -> List[str]:
+        """Extra launch args for a direct (unproxied) browser visit to `url`."""
+        rules = self.host_resolver_rules([url])
+        return [f"--host-resolver-rules={rules}"] if rules else []
+
+
+# One cache per process, shared with other processes through Redis
+dns_cache = DnsCache()
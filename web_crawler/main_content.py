@@ -0,0 +1,350 @@
+"""
+Readability-style main-content extraction.
+
+Used by cleanup_html when only_main_content=True, BEFORE attributes are
+stripped. Instead of deleting everything whose class contains "top" or
+"ad", the document is scored and the best content block is kept:
+
+  1. Preferred roots   → a single <main> / [role=main] / <article> that
+                         holds most of the page text is used as-is
+  2. Block scoring     → every paragraph-like block scores
+                         1 + commas + min(chars / 100, 3) and passes that
+                         to its parent (full) and grandparent (half)
+  3. Candidate weight  → tag weight + class/id token hints, scaled by
+                         (1 - link density); JSON-LD Article hints
+                         (headline / articleBody) boost the containing block
+  4. Siblings          → siblings of the winner that score well (or are
+                         dense paragraphs) are kept alongside it
+  5. Conditional clean → link farms, nav/aside/footer and noise-classed
+                         elements inside the kept content are dropped
+
+Class/id hints are matched on token boundaries, so "ad" matches
+"ad-slot" but not "header" or "download".
+
+All passes are linear in the number of nodes: one pre-order walk, one
+post-order accumulation, one pruning walk over the kept subtree.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "head", "iframe"})
+_SCORE_TAGS = frozenset({"p", "pre", "td", "blockquote"})
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "dl", "div", "figure", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "main", "nav", "ol",
+    "p", "pre", "section", "table", "ul",
+})
+_ALWAYS_DROP_TAGS = frozenset({"nav", "aside", "footer"})
+_CONDITIONAL_TAGS = frozenset({"div", "section", "ul", "ol", "table", "form", "header"})
+
+_TAG_WEIGHTS = {
+    "main": 10, "article": 10, "div": 5, "section": 3,
+    "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+    "nav": -25, "aside": -25, "footer": -25,
+}
+
+
+def _token_regex(words) -> "re.Pattern[str]":
+    alternation = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(rf"(?<![a-z0-9])(?:{alternation})(?![a-z0-9])")
+
+
+_POSITIVE_RE = _token_regex((
+    "article", "body", "content", "entry", "hentry", "h-entry", "main", "page",
+    "post", "text", "blog", "story", "prose", "markdown-body",
+))
+_NEGATIVE_RE = _token_regex((
+    "ad", "ads", "advert", "advertisement", "banner", "breadcrumb", "breadcrumbs",
+    "combx", "comment", "comments", "community", "cookie", "disqus", "extra",
+    "footer", "footnote", "gdpr", "header", "masthead", "menu", "modal", "nav",
+    "navbar", "newsletter", "outbrain", "pager", "pagination", "popup", "promo",
+    "related", "remark", "rss", "share", "shoutbox", "sidebar", "skyscraper",
+    "social", "sponsor", "subscribe", "taboola", "tags", "tool", "widget",
+))
+
+_ARTICLE_TYPES = frozenset({
+    "article", "newsarticle", "blogposting", "techarticle", "scholarlyarticle",
+    "report", "reportagenewsarticle", "analysisnewsarticle", "webpage",
+})
+
+_PREFERRED_MIN_SHARE = 0.4      # <main>/<article> must hold this share of body text
+_SIBLING_MIN_RATIO = 0.2        # sibling score / top score to be kept
+_LINK_FARM_DENSITY = 0.5        # conditional clean: drop link-heavy blocks ...
+_LINK_FARM_MAX_CHARS = 1000     # ... that do not carry much text
+_HINT_BOOST = 1.5
+_HINT_PREFIX_CHARS = 80
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def _class_id(tag: Tag) -> str:
+    cls = tag.get("class") or []
+    if isinstance(cls, list):
+        cls = " ".join(cls)
+    return f"{cls} {tag.get('id') or ''}".lower()
+
+
+def _class_weight(tag: Tag) -> int:
+    hints = _class_id(tag)
+    if hints == " ":
+        return 0
+    weight = 0
+    if _NEGATIVE_RE.search(hints):
+        weight -= 25
+    if _POSITIVE_RE.search(hints):
+        weight += 25
+    return weight
+
+
+def has_noise_hint(tag: Tag) -> bool:
+    """Token-boundary noise match on class/id (no positive hint present)."""
+    hints = _class_id(tag)
+    return hints != " " and bool(_NEGATIVE_RE.search(hints)) and not _POSITIVE_RE.search(hints)
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _iter_jsonld_items(data):
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_jsonld_items(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _iter_jsonld_items(data["@graph"])
+
+
+def article_hints(soup: BeautifulSoup) -> List[str]:
+    """Normalised headline / articleBody prefixes from JSON-LD Article blocks."""
+    hints = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except (json.JSONDecodeError, TypeError):
+            continue
+        for item in _iter_jsonld_items(data):
+            types = item.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if not any(isinstance(t, str) and t.lower() in _ARTICLE_TYPES for t in types):
+                continue
+            for key in ("articleBody", "headline"):
+                value = item.get(key)
+                if isinstance(value, str) and value.strip():
+                    hints.append(_normalize_text(value)[:_HINT_PREFIX_CHARS])
+    return hints
+
+
+# ── Extractor ────────────────────────────────────────────────────────────────
+
+class _Stats:
+    __slots__ = ("text", "links", "commas", "score", "scored")
+
+    def __init__(self):
+        self.text = 0
+        self.links = 0
+        self.commas = 0
+        self.score = 0.0
+        self.scored = False
+
+    @property
+    def link_density(self) -> float:
+        return self.links / self.text if self.text else 0.0
+
+
+def _collect(body: Tag):
+    """Pre-order list of element nodes under body (skip tags not descended)."""
+    order: List[Tag] = []
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        for child in reversed(node.contents):
+            if isinstance(child, Tag) and child.name not in _SKIP_TAGS:
+                stack.append(child)
+    return order
+
+
+def _accumulate(order: List[Tag]) -> Dict[int, _Stats]:
+    """Post-order text / link / comma totals for every element."""
+    stats: Dict[int, _Stats] = {}
+    for node in reversed(order):
+        s = _Stats()
+        for child in node.contents:
+            if isinstance(child, Tag):
+                cs = stats.get(id(child))
+                if cs is not None:
+                    s.text += cs.text
+                    s.links += cs.links
+                    s.commas += cs.commas
+            elif type(child) is NavigableString:
+                text = child.strip()
+                s.text += len(text)
+                s.commas += text.count(",")
+        if node.name == "a":
+            s.links = s.text
+        stats[id(node)] = s
+    return stats
+
+
+def _hint_ancestors(body: Tag, order: List[Tag], hints: List[str]) -> set:
+    """ids of elements that contain a JSON-LD hint string in their own text."""
+    if not hints:
+        return set()
+    marked = set()
+    for node in order:
+        own = _normalize_text(" ".join(
+            c for c in node.contents if type(c) is NavigableString
+        ))
+        if len(own) < 20:
+            continue
+        if any(h.startswith(own[:_HINT_PREFIX_CHARS]) or own.startswith(h) for h in hints):
+            parent = node
+            while parent is not None and parent is not body:
+                marked.add(id(parent))
+                parent = parent.parent
+    return marked
+
+
+def _preferred_root(body: Tag, order: List[Tag], stats: Dict[int, _Stats], hinted: bool) -> Optional[Tag]:
+    total = stats[id(body)].text
+    if not total:
+        return None
+    candidates = [n for n in order if n.name == "main" or n.get("role") == "main"]
+    if len(candidates) != 1:
+        candidates = [n for n in order if n.name == "article"]
+    if len(candidates) != 1:
+        return None
+    root = candidates[0]
+    s = stats.get(id(root))
+    if s is None or s.link_density > _LINK_FARM_DENSITY:
+        return None
+    # JSON-LD says this is an article — trust <article>/<main> with less text
+    min_share = _PREFERRED_MIN_SHARE / 2 if hinted else _PREFERRED_MIN_SHARE
+    return root if s.text >= total * min_share else None
+
+
+def _score_candidates(order: List[Tag], stats: Dict[int, _Stats]) -> None:
+    def init(tag: Tag) -> _Stats:
+        s = stats[id(tag)]
+        if not s.scored:
+            s.scored = True
+            s.score = _TAG_WEIGHTS.get(tag.name, 0) + _class_weight(tag)
+        return s
+
+    for node in order:
+        name = node.name
+        if name not in _SCORE_TAGS:
+            # divs / sections with no block children act as paragraphs
+            if name not in ("div", "section") or any(
+                isinstance(c, Tag) and c.name in _BLOCK_TAGS for c in node.contents
+            ):
+                continue
+        s = stats[id(node)]
+        if s.text < 25:
+            continue
+        block_score = 1 + s.commas + min(s.text // 100, 3)
+
+        parent = node.parent
+        if isinstance(parent, Tag) and id(parent) in stats:
+            init(parent).score += block_score
+            grand = parent.parent
+            if isinstance(grand, Tag) and id(grand) in stats:
+                init(grand).score += block_score / 2
+
+
+def _select(body: Tag, order: List[Tag], stats: Dict[int, _Stats], marked: set) -> List[Tag]:
+    best, best_score = None, 0.0
+    for node in order:
+        s = stats[id(node)]
+        if not s.scored or node is body:
+            continue
+        final = s.score * (1 - s.link_density)
+        if id(node) in marked:
+            final *= _HINT_BOOST
+        s.score = final
+        if final > best_score:
+            best, best_score = node, final
+
+    if best is None:
+        return []
+
+    parent = best.parent
+    if parent is None:
+        return [best]
+
+    threshold = max(10.0, best_score * _SIBLING_MIN_RATIO)
+    keep = []
+    for sibling in parent.contents:
+        if not isinstance(sibling, Tag):
+            continue
+        if sibling is best:
+            keep.append(sibling)
+            continue
+        s = stats.get(id(sibling))
+        if s is None:
+            continue
+        if s.scored and s.score >= threshold:
+            keep.append(sibling)
+        elif sibling.name == "p" and s.text > 80 and s.link_density < 0.25:
+            keep.append(sibling)
+    return keep
+
+
+def _clean_conditionally(roots: List[Tag], stats: Dict[int, _Stats]) -> None:
+    """Drop nav/aside/footer, noise-classed and link-heavy blocks under the kept roots."""
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        for child in list(node.contents):
+            if not isinstance(child, Tag):
+                continue
+            s = stats.get(id(child))
+            drop = child.name in _ALWAYS_DROP_TAGS or has_noise_hint(child)
+            if not drop and s is not None and child.name in _CONDITIONAL_TAGS:
+                drop = s.link_density > _LINK_FARM_DENSITY and s.text < _LINK_FARM_MAX_CHARS
+            if drop:
+                child.decompose()
+            else:
+                stack.append(child)
+
+
+def extract_main_content(soup: BeautifulSoup) -> bool:
+    """
+    Replace the contents of <body> with the page's main content, in place.
+    Returns False (document untouched) when no confident choice is found.
+    """
+    body = soup.body
+    if body is None:
+        return False
+
+    hints = article_hints(soup)
+    order = _collect(body)
+    stats = _accumulate(order)
+
+    root = _preferred_root(body, order, stats, hinted=bool(hints))
+    if root is not None:
+        keep = [root]
+    else:
+        _score_candidates(order, stats)
+        keep = _select(body, order, stats, _hint_ancestors(body, order, hints))
+
+    if not keep or keep == [body]:
+        return False
+
+    _clean_conditionally(keep, stats)
+    for node in keep:
+        node.extract()
+    body.clear()
+    for node in keep:
+        body.append(node)
+    return True
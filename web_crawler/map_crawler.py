@@ -26,12 +26,18 @@ import threading
 import time
 import xml.etree.ElementTree as ET
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Optional, Set, Tuple
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
 
+from web_crawler.bandwidth import BandwidthMeter
+from web_crawler.dns_cache import DnsResolutionError, DnsTemporaryError, dns_cache
+from web_crawler.robots import RobotsRules
+from web_crawler.url_normalizer import canonicalize_url
+
 logger = logging.getLogger(__name__)
 
 # ── Constants ────────────────────────────────────────────────────────────────
@@ -69,9 +75,14 @@ _SITEMAP_XML_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
 def _get(
     url: str, 
     timeout: Tuple[int, int] = _SITEMAP_TIMEOUT,
-    proxy_dict: Optional[dict] = None
+    proxy_dict: Optional[dict] = None,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
 ) -> Optional[requests.Response]:
-    """Safe HTTP GET; returns None on any error."""
+    """Safe HTTP GET; returns None on any error. `on_response` sees every response (bandwidth)."""
+    if not proxy_dict and dns_cache.is_known_bad(url):
+        # Direct requests to a host that recently failed to resolve would only time out
+        logger.debug(f"Skipping {url}: host does not resolve (cached)")
+        return None
     try:
         resp = requests.get(
             url, 
@@ -80,6 +91,9 @@ def _get(
             allow_redirects=True,
             proxies=proxy_dict
         )
+        if on_response is not None:
+            for r in (*resp.history, resp):
+                on_response(r)
         if resp.status_code == 200:
             return resp
         logger.debug(f"HTTP {resp.status_code} for {url}")
@@ -107,16 +121,8 @@ def _same_host(url: str, base_url: str) -> bool:
 
 def _clean_url(url: str) -> str:
     """Strip query string, fragment, .html extension and normalise trailing slash."""
-    p = urlparse(url)
-    path = p.path
-    # Strip .html extension (Firecrawl normalises these away)
-    if path.endswith(".html"):
-        path = path[:-5]  # "/about/about.html" → "/about/about"
-    if path != "/" and path.endswith("/"):
-        path = path.rstrip("/")
-    if not path:
-        path = "/"
-    return f"{p.scheme}://{p.netloc}{path}".lower()
+    # Firecrawl parity: .html stripped and the whole URL lower-cased
+    return canonicalize_url(url, keep_query=False, strip_html_ext=True, lowercase_path=True)
 
 
 def _is_page_url(url: str) -> bool:
@@ -166,14 +172,15 @@ def _fetch_and_extract_urls(
     sitemap_url: str,
     base_url: str,
     homepage_text: str = "",
-    proxy_dict: Optional[dict] = None
+    proxy_dict: Optional[dict] = None,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
 ) -> Tuple[str, List[str], List[str], bool]:
     """
     Fetch one sitemap URL and return:
       (sitemap_url, child_sitemap_urls, page_urls, success)
     child_sitemap_urls are only returned for same-host sitemaps.
     """
-    resp = _get(sitemap_url, timeout=_SITEMAP_TIMEOUT, proxy_dict=proxy_dict)
+    resp = _get(sitemap_url, timeout=_SITEMAP_TIMEOUT, proxy_dict=proxy_dict, on_response=on_response)
     if not resp:
         return sitemap_url, [], [], False
 
@@ -241,7 +248,8 @@ def _collect_sitemap_urls(
     collected: Set[str],
     lock: threading.Lock,
     homepage_text: str = "",
-    proxy_dict: Optional[dict] = None
+    proxy_dict: Optional[dict] = None,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
 ) -> None:
     """
     Discover URLs from all sitemaps using a BFS queue + thread pool.
@@ -299,7 +307,9 @@ def _collect_sitemap_urls(
 
         with ThreadPoolExecutor(max_workers=len(batch)) as executor:
             futures = {
-                executor.submit(_fetch_and_extract_urls, url, base_url, homepage_text, proxy_dict): url
+                executor.submit(
+                    _fetch_and_extract_urls, url, base_url, homepage_text, proxy_dict, on_response
+                ): url
                 for url in batch
             }
             for future in as_completed(futures):
@@ -425,7 +435,8 @@ def _collect_homepage_links(
     base_url: str, 
     collected: Set[str], 
     lock: threading.Lock,
-    proxy_dict: Optional[dict] = None
+    proxy_dict: Optional[dict] = None,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
 ) -> int:
     """
     Fetch the homepage and extract internal links.
@@ -437,7 +448,7 @@ def _collect_homepage_links(
             return 0
 
     logger.info(f"🔗 Fetching homepage links: {base_url}")
-    resp = _get(base_url, timeout=_PAGE_TIMEOUT, proxy_dict=proxy_dict)
+    resp = _get(base_url, timeout=_PAGE_TIMEOUT, proxy_dict=proxy_dict, on_response=on_response)
     if not resp:
         logger.warning("Homepage fetch failed — skipping link extraction")
         return 0
@@ -455,6 +466,7 @@ def _browser_extract_links(
     start_url: str,
     collected: Set[str],
     lock: threading.Lock,
+    bandwidth: Optional[BandwidthMeter] = None,
 ) -> int:
     """
     Render the homepage with Playwright/Chromium and extract internal links
@@ -466,11 +478,11 @@ def _browser_extract_links(
     logger.info("🌐 Browser fallback — rendering homepage with Chromium...")
     added = 0
     try:
-        from playwright.sync_api import sync_playwright
+        from web_crawler.browser_pool import playwright_driver
 
         base_host = urlparse(start_url).netloc.lower()
 
-        with sync_playwright() as pw:
+        with playwright_driver() as pw:
             browser = pw.chromium.launch(
                 headless=True,
                 args=[
@@ -478,6 +490,7 @@ def _browser_extract_links(
                     '--disable-setuid-sandbox',
                     '--disable-dev-shm-usage',
                     '--disable-gpu',
+                    *dns_cache.chromium_args(start_url),
                 ]
             )
             context = browser.new_context(
@@ -487,6 +500,8 @@ def _browser_extract_links(
                 ignore_https_errors=True,
             )
             page = context.new_page()
+            if bandwidth is not None:
+                bandwidth.attach(page, start_url, "none")
 
             try:
                 page.goto(start_url, wait_until="networkidle", timeout=30_000)
@@ -538,7 +553,12 @@ def _browser_extract_links(
 
 # ── Public API ───────────────────────────────────────────────────────────────
 
-def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
+def map_website(
+    start_url: str,
+    proxy_dict: Optional[dict] = None,
+    bandwidth: Optional[BandwidthMeter] = None,
+    proxy_tier: str = "none",
+) -> dict:
     """
     Firecrawl-style map mode: discover page URLs on a site.
 
@@ -559,10 +579,27 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
             "from_sitemap":  int,        # URLs from XML sitemaps
             "from_homepage": int,        # URLs added from homepage <a> scan
             "sitemaps_used": List[str],  # Sitemap: directives from robots.txt
+            "homepage_status": Optional[int],  # final HTTP status of the start URL,
+                                               # None if it was never reached
         }
     """
     logger.info(f"🗺️  Map mode started for: {start_url} (limit: {MAX_URLS} URLs)")
 
+    # Every HTTP response is charged to the start URL on the proxy tier in use
+    on_response = None
+    if bandwidth is not None:
+        on_response = partial(bandwidth.record_http, page_url=start_url, tier=proxy_tier if proxy_dict else "none")
+
+    # Warm the shared DNS cache (usually a hit from the /crawler pre-check);
+    # a host that does not resolve makes every direct _get below return at once
+    if not proxy_dict:
+        try:
+            dns_cache.resolve(urlparse(start_url).hostname or "")
+        except DnsResolutionError:
+            logger.warning(f"DNS resolution failed for {start_url}")
+        except DnsTemporaryError:
+            logger.warning(f"DNS lookup for {start_url} failed temporarily")
+
     # Shared mutable state — all steps write into this single set
     collected: Set[str] = set()
     lock = threading.Lock()
@@ -574,9 +611,17 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
     # Both are independent; fetching them concurrently saves 1 full round-trip.
     t_total = time.perf_counter()
 
+    # The homepage's status tells a proxied caller whether the proxy got through
+    homepage_status: Dict[str, int] = {}
+
+    def on_homepage_response(resp: requests.Response) -> None:
+        homepage_status["code"] = resp.status_code
+        if on_response is not None:
+            on_response(resp)
+
     with ThreadPoolExecutor(max_workers=2) as pre_exec:
-        fut_robots   = pre_exec.submit(_get, f"{_origin(start_url)}/robots.txt", _ROBOTS_TIMEOUT, proxy_dict)
-        fut_homepage = pre_exec.submit(_get, start_url, _PAGE_TIMEOUT, proxy_dict)
+        fut_robots   = pre_exec.submit(_get, f"{_origin(start_url)}/robots.txt", _ROBOTS_TIMEOUT, proxy_dict, on_response)
+        fut_homepage = pre_exec.submit(_get, start_url, _PAGE_TIMEOUT, proxy_dict, on_homepage_response)
 
     robots_resp   = fut_robots.result()
     homepage_resp = fut_homepage.result()
@@ -585,13 +630,9 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
     t0 = time.perf_counter()
     sitemap_hints = []
     if robots_resp:
-        for line in robots_resp.text.splitlines():
-            stripped = line.strip()
-            if stripped.lower().startswith("sitemap:"):
-                sitemap_url = stripped.split(":", 1)[1].strip()
-                if sitemap_url.startswith("http"):
-                    sitemap_hints.append(sitemap_url)
-                    logger.info(f"  📄 Found sitemap directive: {sitemap_url}")
+        sitemap_hints = RobotsRules.parse(robots_resp.text).sitemaps
+        for sitemap_url in sitemap_hints:
+            logger.info(f"  📄 Found sitemap directive: {sitemap_url}")
     else:
         logger.info("robots.txt not found or inaccessible")
     logger.info(f"⏱  robots.txt parsed: {time.perf_counter()-t0:.2f}s ({len(sitemap_hints)} sitemap(s))")
@@ -600,7 +641,7 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
     before_sitemap = len(collected)
     t0 = time.perf_counter()
     homepage_text = homepage_resp.text if homepage_resp else ""
-    _collect_sitemap_urls(start_url, sitemap_hints, collected, lock, homepage_text, proxy_dict)
+    _collect_sitemap_urls(start_url, sitemap_hints, collected, lock, homepage_text, proxy_dict, on_response)
     from_sitemap = len(collected) - before_sitemap
     logger.info(f"⏱  sitemaps: {time.perf_counter()-t0:.2f}s → {from_sitemap} URLs (pool: {len(collected)})")
 
@@ -617,7 +658,7 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
             f"(threshold={_BROWSER_FALLBACK_THRESHOLD}) — trying browser fallback"
         )
         t0 = time.perf_counter()
-        from_browser = _browser_extract_links(start_url, collected, lock)
+        from_browser = _browser_extract_links(start_url, collected, lock, bandwidth)
         logger.info(f"⏱  browser: {time.perf_counter()-t0:.2f}s → {from_browser} new URLs (pool: {len(collected)})")
 
     # ── Build result ─────────────────────────────────────────────────────────
@@ -637,4 +678,5 @@ def map_website(start_url: str, proxy_dict: Optional[dict] = None) -> dict:
         "from_sitemap":  from_sitemap,
         "from_homepage": from_homepage,
         "sitemaps_used": sitemap_hints,
+        "homepage_status": homepage_status.get("code"),
     }
@@ -0,0 +1,325 @@
+"""
+Single-pass DOM → markdown emitter (Firecrawl-style output).
+
+Replaces the html2text + regex post-processing pipeline. The cleaned
+<body> from cleanup_soup is walked once and markdown is produced
+directly in its final form:
+
+  - "- " bullet markers, compact lists (no blank lines between items)
+  - multi-line link text joined with "\\" line breaks
+  - "[Skip to Content](#...)" links dropped
+  - no trailing whitespace, at most one blank line between blocks,
+    no leading / trailing blank lines
+  - GFM tables and fenced code blocks
+
+Output is written block by block to a `write(str)` callable (buffered),
+so a page can be streamed straight into its .md file without building
+the whole document in memory.
+"""
+
+import os
+import re
+from typing import Callable, List, Optional
+
+from bs4 import Comment, NavigableString, Tag
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "body", "center", "dd", "details",
+    "dialog", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr", "li", "main",
+    "menu", "nav", "ol", "p", "pre", "section", "summary", "table", "tbody",
+    "td", "tfoot", "th", "thead", "tr", "ul",
+})
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "head", "title", "meta", "link"})
+
+_WS_RE = re.compile(r"\s+")
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+_BACKTICK_RUN_RE = re.compile(r"`+")
+_LINK_TEXT_ESCAPE_RE = re.compile(r"([\[\]])")
+_BARE_DESTINATION_RE = re.compile(r"[\s()<>]")
+
+LINK_LINE_BREAK = "\\\n"
+_FLUSH_BYTES = 64 * 1024
+
+
+class MarkdownEmitter:
+    """Walks a cleaned DOM once and writes markdown blocks to `write`."""
+
+    def __init__(self, write: Callable[[str], None]):
+        self._write = write
+        self._buf: List[str] = []
+        self._buf_len = 0
+        self._started = False
+        self._sep = 2               # 1 = next block on the next line, 2 = after a blank line
+        self._prefix = ""           # continuation-line prefix (lists, quotes)
+        self._marker: Optional[str] = None   # first-line prefix (list marker)
+        self._list_depth = 0
+        self._list_opening = False  # next block is the first item of a top-level list
+        self._last_prefix = ""
+        self._link_depth = 0        # inside <a>: brackets in text are escaped
+
+    # ── Output ───────────────────────────────────────────────────────────────
+
+    def _out(self, text: str) -> None:
+        self._buf.append(text)
+        self._buf_len += len(text)
+        if self._buf_len >= _FLUSH_BYTES:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            self._write("".join(self._buf))
+            self._buf.clear()
+            self._buf_len = 0
+
+    def _emit_block(self, text: str) -> None:
+        lines = text.split("\n")
+        if self._started:
+            tight = self._list_depth and not self._list_opening
+            if tight or self._sep == 1:
+                self._out("\n")
+            else:
+                # Blank separator keeps a quote prefix ("> ") shared with the previous block
+                shared = os.path.commonprefix([self._last_prefix, self._prefix])
+                self._out(f"\n{shared.rstrip()}\n")
+        self._started = True
+        self._sep = 2
+        self._list_opening = False
+        self._last_prefix = self._prefix
+
+        first = self._marker if self._marker is not None else self._prefix
+        self._marker = None
+        rendered = []
+        for i, line in enumerate(lines):
+            line = line.rstrip()
+            prefix = first if i == 0 else self._prefix
+            rendered.append((prefix + line).rstrip() if line else prefix.rstrip())
+        self._out("\n".join(rendered))
+
+    def emit(self, root: Tag) -> None:
+        self._container(root)
+        if self._started:
+            self._out("\n")
+        self.flush()
+
+    # ── Blocks ───────────────────────────────────────────────────────────────
+
+    def _container(self, node: Tag) -> None:
+        run: List = []
+        for child in node.children:
+            if isinstance(child, Tag) and child.name in _BLOCK_TAGS:
+                self._paragraph(run)
+                run = []
+                self._block(child)
+            else:
+                run.append(child)
+        self._paragraph(run)
+
+    def _paragraph(self, run: List) -> None:
+        if not run:
+            return
+        text = _tidy("".join(self._inline(n) for n in run))
+        if text:
+            self._emit_block(text)
+
+    def _block(self, node: Tag) -> None:
+        name = node.name
+        if name in _HEADINGS:
+            text = _tidy(self._inline_children(node)).replace("\n", " ")
+            if text:
+                self._emit_block(f"{'#' * _HEADINGS[name]} {text}")
+        elif name in ("ul", "ol", "menu"):
+            self._list(node, ordered=name == "ol")
+        elif name == "li":
+            # Stray <li> outside a list
+            self._list_item(node, "- ")
+        elif name == "blockquote":
+            saved = self._prefix
+            self._prefix += "> "
+            if self._marker is not None:
+                self._marker += "> "
+            self._container(node)
+            self._prefix = saved
+        elif name == "pre":
+            self._code_block(node)
+        elif name == "hr":
+            self._emit_block("* * *")
+        elif name == "table":
+            self._table(node)
+        else:
+            self._container(node)
+
+    def _list(self, node: Tag, ordered: bool) -> None:
+        if not self._list_depth:
+            self._list_opening = True
+        self._list_depth += 1
+        start = node.get("start")
+        number = int(start) if ordered and str(start or "").isdigit() else 1
+        for child in node.children:
+            if not isinstance(child, Tag):
+                continue
+            if child.name != "li":
+                if child.name in _BLOCK_TAGS:
+                    self._block(child)
+                else:
+                    self._paragraph([child])
+                continue
+            marker = f"{number}. " if ordered else "- "
+            number += 1
+            self._list_item(child, marker)
+        self._list_depth -= 1
+        self._sep = 2
+
+    def _list_item(self, node: Tag, marker: str) -> None:
+        saved = self._prefix
+        self._marker = saved + marker
+        self._prefix = saved + " " * len(marker)
+        self._container(node)
+        self._marker = None   # empty <li> emits nothing
+        self._prefix = saved
+
+    def _code_block(self, node: Tag) -> None:
+        text = node.get_text().strip("\n")
+        if text.strip():
+            # The fence must outrun every backtick run inside the code
+            fence = "`" * max(3, _longest_backtick_run(text) + 1)
+            self._emit_block(f"{fence}\n{text}\n{fence}")
+
+    def _table(self, node: Tag) -> None:
+        # Own rows only: rows of a nested table belong to that table's cell
+        trs = []
+        for child in node.find_all(("tr", "thead", "tbody", "tfoot"), recursive=False):
+            trs.extend([child] if child.name == "tr" else child.find_all("tr", recursive=False))
+        rows = []
+        for tr in trs:
+            cells = [
+                _MULTI_SPACE_RE.sub(" ", _tidy(self._inline_children(cell)).replace("\n", " "))
+                .replace("|", "\\|")
+                for cell in tr.find_all(("th", "td"), recursive=False)
+            ]
+            if cells:
+                rows.append(cells)
+        if not rows:
+            return
+        width = max(len(r) for r in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            row = row + [""] * (width - len(row))
+            lines.append("| " + " | ".join(row) + " |")
+            if i == 0:
+                lines.append("| " + " | ".join(["---"] * width) + " |")
+        self._emit_block("\n".join(lines))
+
+    # ── Inline ───────────────────────────────────────────────────────────────
+
+    def _inline_children(self, node: Tag) -> str:
+        return "".join(self._inline(c) for c in node.children)
+
+    def _inline(self, node) -> str:
+        if isinstance(node, Comment):
+            return ""
+        if isinstance(node, NavigableString):
+            text = _WS_RE.sub(" ", str(node))
+            return _LINK_TEXT_ESCAPE_RE.sub(r"\\\1", text) if self._link_depth else text
+        if not isinstance(node, Tag) or node.name in _SKIP_TAGS:
+            return ""
+
+        name = node.name
+        if name == "br":
+            return "\n"
+        if name == "img":
+            src = node.get("src")
+            if not src:
+                return ""
+            alt = _LINK_TEXT_ESCAPE_RE.sub(r"\\\1", _WS_RE.sub(" ", node.get("alt") or "").strip())
+            return f"![{alt}]({_destination(src)})"
+        if name == "a":
+            return self._link(node)
+        if name in ("strong", "b"):
+            return _wrap(self._inline_children(node), "**")
+        if name in ("em", "i"):
+            return _wrap(self._inline_children(node), "_")
+        if name == "code":
+            text = node.get_text()
+            if not text.strip():
+                return text
+            ticks = "`" * (_longest_backtick_run(text) + 1)
+            pad = " " if text.startswith("`") or text.endswith("`") else ""
+            return f"{ticks}{pad}{text}{pad}{ticks}"
+        if name in _BLOCK_TAGS:
+            # Block element in inline context (e.g. <div> inside <a>)
+            return f"\n{self._inline_children(node)}\n"
+        return self._inline_children(node)
+
+    def _link(self, node: Tag) -> str:
+        parts: List[str] = []
+        self._link_depth += 1
+        for child in node.children:
+            piece = self._inline(child)
+            # Firecrawl breaks before images / bold that follow other link text
+            if (
+                isinstance(child, Tag)
+                and child.name in ("img", "strong", "b")
+                and "".join(parts).strip()
+            ):
+                parts.append("\n")
+            parts.append(piece)
+        self._link_depth -= 1
+
+        lines = [_MULTI_SPACE_RE.sub(" ", line).strip() for line in "".join(parts).split("\n")]
+        text = LINK_LINE_BREAK.join(line for line in lines if line)
+
+        href = node.get("href")
+        if not href:
+            return text
+        if "#" in href and text.lower() == "skip to content":
+            return ""
+        title = node.get("title")
+        if title:
+            return f'[{text}]({_destination(href)} "{title}")'
+        return f"[{text}]({_destination(href)})"
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def _wrap(text: str, marker: str) -> str:
+    """Wrap in emphasis markers, keeping surrounding whitespace outside them."""
+    stripped = text.strip()
+    if not stripped:
+        return text
+    lead = " " if text[:1].isspace() else ""
+    trail = " " if text[-1:].isspace() else ""
+    return f"{lead}{marker}{stripped}{marker}{trail}"
+
+
+def _destination(url: str) -> str:
+    """Link / image target; wrapped in <...> when spaces or parens would end it early."""
+    if _BARE_DESTINATION_RE.search(url):
+        return "<" + url.replace("<", "%3C").replace(">", "%3E") + ">"
+    return url
+
+
+def _longest_backtick_run(text: str) -> int:
+    return max((len(run) for run in _BACKTICK_RUN_RE.findall(text)), default=0)
+
+
+def _tidy(text: str) -> str:
+    """Collapse runs of spaces and strip each line; drop blank edge lines."""
+    lines = [_MULTI_SPACE_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_RUN_RE.sub("\n\n", "\n".join(lines)).strip("\n")
+
+
+def emit_markdown(root: Tag, write: Callable[[str], None]) -> None:
+    """Stream markdown for `root` to `write`."""
+    MarkdownEmitter(write).emit(root)
+
+
+def to_markdown(root: Tag) -> str:
+    """Markdown for `root` as one string."""
+    chunks: List[str] = []
+    emit_markdown(root, chunks.append)
+    return "".join(chunks)
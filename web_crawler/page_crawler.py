@@ -8,10 +8,14 @@ import sys
 import json
 import os
 import re
+import threading
+import time
+from datetime import datetime
 import yaml
 from typing import Optional, Dict
 from pathlib import Path
-from playwright.sync_api import sync_playwright, Page
+from urllib.parse import urlparse
+from playwright.sync_api import Page
 from bs4 import BeautifulSoup
 from web_crawler.seo_report import CrawlReportWriter
 import platform
@@ -27,6 +31,15 @@ from web_crawler.websocket_manager import WebSocketManager
 from web_crawler.utils import normalize_url
 from web_crawler.redis_events import publish_event
 from web_crawler.proxy_manager import ProxyManager
+from web_crawler.content_dedup import ContentDeduplicator, page_text
+from web_crawler.structured_data import (
+    StructuredDataCollector, dumps, extract_structured_data, has_structured_data,
+)
+from web_crawler.screenshot import capture as capture_screenshot
+from web_crawler.response_cache import ResponseCache
+from web_crawler.bandwidth import BandwidthMeter, PageMeter
+from web_crawler.dns_cache import dns_cache
+from web_crawler.browser_pool import STEALTH_CHROMIUM_ARGS, get_stealth_chromium, has_pool, playwright_driver
 
 
 logger = logging.getLogger(__name__)
@@ -176,6 +189,88 @@ def _persist_crawl_event(
             except Exception:
                 pass
 
+def persist_bandwidth(crawl_id: Optional[str], rows) -> None:
+    """
+    Insert a crawl's bandwidth counters into crawl_bandwidth in one round trip.
+    Errors are logged and ignored so crawl output is never affected.
+    """
+    if not crawl_id or not rows:
+        return
+    conn = None
+    try:
+        from psycopg2.extras import execute_values
+        conn = _get_db_conn()
+        cur = conn.cursor()
+        execute_values(
+            cur,
+            """
+            INSERT INTO crawl_bandwidth (crawl_id, scope, name, proxy_tier, bytes, requests)
+            VALUES %s
+            """,
+            [(crawl_id, *row) for row in rows],
+        )
+        conn.commit()
+        cur.close()
+        logger.info(f"✓ Bandwidth persisted: {len(rows)} rows (crawl_id={crawl_id})")
+    except Exception as db_err:
+        logger.warning(f"⚠ Could not persist bandwidth for crawl {crawl_id}: {db_err}")
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def persist_crawl_completion(crawl_id: Optional[str], summary: Dict) -> None:
+    """
+    Mark a single / links crawl finished: crawl_jobs paths + updated_at, the
+    page's page_processed row and a crawl_completed row, in one transaction.
+
+    Written by the worker so a WebSocket that connects after a short crawl
+    has already finished can replay it from the DB.
+    Errors are logged and ignored so crawl output is never affected.
+    """
+    if not crawl_id:
+        return
+    conn = None
+    try:
+        conn = _get_db_conn()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE crawl_jobs SET updated_at = %s, links_file_path = %s, summary_file_path = %s WHERE crawl_id = %s",
+            (datetime.now(), summary.get("links_file_path"), summary.get("summary_file_path"), crawl_id)
+        )
+        cur.execute(
+            """
+            INSERT INTO crawl_events (crawl_id, event_type, url, title, markdown_file, html_file, screenshot, seo_json, seo_md, seo_xlsx)
+            VALUES (%s, 'page_processed', %s, 'Scraped Page', %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (crawl_id, url) DO NOTHING
+            """,
+            (crawl_id, summary.get("start_url", ""), summary.get("markdown_file"), summary.get("html_file"),
+             summary.get("screenshot"), summary.get("seo_json"), summary.get("seo_md"), summary.get("seo_xlsx"))
+        )
+        cur.execute(
+            """
+            INSERT INTO crawl_events (crawl_id, event_type, url, title, markdown_file)
+            VALUES (%s, 'crawl_completed', '', 'Crawl Completed', %s)
+            ON CONFLICT (crawl_id, url) DO NOTHING
+            """,
+            (crawl_id, summary.get("markdown_file"))
+        )
+        conn.commit()
+        cur.close()
+        logger.info(f"✓ Crawl completion persisted (crawl_id={crawl_id})")
+    except Exception as db_err:
+        logger.warning(f"⚠ Could not persist crawl completion for {crawl_id}: {db_err}")
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
 class PageCrawler:
     """Handle individual page crawling"""
     
@@ -190,6 +285,14 @@ class PageCrawler:
             stealth_proxies=config.stealth_proxies,
             enhanced_proxies=config.enhanced_proxies,
         )
+        # Set by WebCrawler for full-site crawls; None disables content dedup
+        self.content_dedup: Optional[ContentDeduplicator] = None
+        # Set by WebCrawler for full-site crawls; None sends every request to the network
+        self.response_cache: Optional[ResponseCache] = None
+        # Set by WebCrawler; counts bytes per page / host / proxy tier
+        self.bandwidth: Optional[BandwidthMeter] = None
+        # Pool proxy chosen for the current thread's attempt, reported back to ProxyManager
+        self._proxy_attempt = threading.local()
 
     @staticmethod
     def _is_likely_proxy_failure(result: Optional[Dict]) -> bool:
@@ -215,13 +318,28 @@ class PageCrawler:
         ]
         return any(marker in err for marker in proxy_markers)
 
-    def _resolve_playwright_proxy(self, proxy_type: str = "basic") -> Optional[Dict]:
+    def _attach_bandwidth(self, page: Page, url: str, proxy_type: str, proxy_settings) -> Optional[PageMeter]:
+        if self.bandwidth is None:
+            return None
+        return self.bandwidth.attach(page, url, proxy_type if proxy_settings else "none")
+
+    def _resource_blocker(self, url: str, enable_ss: bool, page_meter: Optional[PageMeter]):
+        return self.browser_utils.make_resource_blocker(
+            first_party_url=url,
+            response_cache=self.response_cache,
+            on_cache_hit=page_meter.mark_cached if page_meter else None,
+            **self.browser_utils.blocking_profile(enable_ss),
+        )
+
+    def _resolve_playwright_proxy(self, proxy_type: str = "basic", url: Optional[str] = None) -> Optional[Dict]:
         """
         Resolve proxy settings for Playwright contexts.
         Priority:
         1) Firecrawl-style BYOP env proxy (PROXY_SERVER/USERNAME/PASSWORD)
-        2) Requested proxy type from rotating manager
+        2) Requested proxy type from rotating manager (health-weighted, sticky per host)
         """
+        self._proxy_attempt.proxy = None
+        self._proxy_attempt.host = None
         if proxy_type == "none":
             return None
 
@@ -229,7 +347,30 @@ class PageCrawler:
         if byop_proxy:
             return byop_proxy
 
-        return self.proxy_manager.get_playwright_proxy(proxy_type)
+        host = urlparse(url).hostname if url else None
+        proxy = self.proxy_manager.get_proxy(proxy_type, host=host)
+        if not proxy:
+            return None
+        self._proxy_attempt.proxy = proxy
+        self._proxy_attempt.host = host
+        return self.proxy_manager.to_playwright_proxy(proxy)
+
+    def _report_proxy_outcome(self, result: Optional[Dict], started: float) -> None:
+        """Feed the last attempt's outcome into the health of the pool proxy it used."""
+        proxy = getattr(self._proxy_attempt, "proxy", None)
+        host = getattr(self._proxy_attempt, "host", None)
+        self._proxy_attempt.proxy = None
+        if not proxy:
+            return
+        latency = time.monotonic() - started
+        if (result and "error" not in result) or not self._is_likely_proxy_failure(result):
+            # Page-side errors (404, thin content) still mean the proxy delivered
+            self.proxy_manager.report(proxy, success=True, latency=latency, host=host)
+            return
+        status_code = result.get("status_code") if result else None
+        err = str(result.get("error", "")).lower() if result else ""
+        ban = status_code in {403, 429} or "captcha" in err
+        self.proxy_manager.report(proxy, success=False, ban=ban, host=host)
     
     def process_page(
         self,
@@ -240,7 +381,8 @@ class PageCrawler:
         enable_html: bool,
         enable_ss: bool,
         enable_seo: bool,
-        client_id: Optional[str]
+        client_id: Optional[str],
+        enable_structured: bool = False,
     ) -> Optional[Dict]:
         """Process loaded page and extract data"""
         md_path = None
@@ -249,6 +391,7 @@ class PageCrawler:
         seo_json_path = None
         seo_md_path = None
         seo_xlsx_path = None
+        structured_path = None
         
         try:
             # Scroll to load dynamic content
@@ -260,11 +403,34 @@ class PageCrawler:
             
             canonical_url = seo.get("canonical")
             canonical = normalize_url(canonical_url if canonical_url else url)
+
+            # Near-identical content already rendered under another URL —
+            # skip output generation entirely, but keep its links for the frontier
+            if self.content_dedup is not None:
+                duplicate_of = self.content_dedup.check(url, page_text(html))
+                if duplicate_of:
+                    logger.info(f"♻️  Duplicate content: {url} matches {duplicate_of} — skipping outputs")
+                    return {
+                        "url": url,
+                        "canonical": canonical,
+                        "duplicate_of": duplicate_of,
+                        "seo": seo,
+                        "links": self.content_processor.extract_links(soup, url),
+                        "status_code": 200,
+                    }
             
             title = seo.get("title")
             title_safe = self.file_manager.safe_filename(title if title else "page")
             prefix = f"{count}_{title_safe}"
 
+            # Capture screenshot first; encoding / writing happens off this thread
+            pending_screenshot = None
+            if enable_ss:
+                try:
+                    pending_screenshot = capture_screenshot(page, self.config, prefix)
+                except Exception as e:
+                    logger.error(f"Failed to save screenshot for {url}: {e}")
+
             if enable_seo:
                 try:
                     writer = CrawlReportWriter(self.config.output_dir)
@@ -284,29 +450,38 @@ class PageCrawler:
                     logger.error(f"Failed to save HTML for {url}: {e}")
             
             # Save markdown (per page file)
+            structured = StructuredDataCollector(url) if enable_structured else None
+            structured_collected = False
             if enable_md:
                 try:
-                    markdown = self.content_processor.convert_to_markdown(html, url)
                     # md_filename = f"{count}_{title_safe}.md"
                     # md_path = Path(self.config.output_dir) / md_filename
                     md_path = str(self.config.md_dir / f"{prefix}.md")
-                    
-                    with open(md_path, "w", encoding="utf-8") as f:
-                        f.write(markdown)
+                    self.content_processor.write_markdown(
+                        html, url, md_path, engine=self.config.markdown_engine, collector=structured
+                    )
+                    structured_collected = structured is not None
                 except Exception as e:
                     logger.error(f"Failed to save markdown for {url}: {e}")
 
-            # Save screenshot
-            if enable_ss:
-                screenshot_path = str(self.config.screenshot_dir / f"{prefix}.png")
+            # Save structured data (JSON-LD, microdata, RDFa, OpenGraph) —
+            # collected by the markdown cleanup walk, or by its own walk
+            if enable_structured:
                 try:
-                    # Scroll back to top before capturing full page screenshot
-                    # to ensure fixed headers/elements render in their correct initial positions.
-                    page.evaluate("window.scrollTo(0, 0)")
-                    page.wait_for_timeout(1000) # Give UI elements a moment to settle
-                    page.screenshot(path=screenshot_path, full_page=True)
+                    data = structured.result() if structured_collected else extract_structured_data(soup, url)
+                    if has_structured_data(data):
+                        line = dumps(data)
+                        structured_path = str(self.config.structured_dir / f"{prefix}.json")
+                        with open(structured_path, "w", encoding="utf-8") as f:
+                            f.write(line)
+                        self.file_manager.append_to_file(self.config.structured_file, line + "\n")
                 except Exception as e:
-                    logger.error(f"Failed to save screenshot for {url}: {e}")
+                    logger.error(f"Failed to save structured data for {url}: {e}")
+
+            # Screenshot file is written by the encoder pool while the
+            # remaining outputs are generated
+            if pending_screenshot is not None:
+                screenshot_path = pending_screenshot.result()
 
             if client_id:
                 publish_event(
@@ -322,6 +497,7 @@ class PageCrawler:
                         "seo_json": seo_json_path,
                         "seo_md": seo_md_path,
                         "seo_xlsx": seo_xlsx_path,
+                        "structured_data": structured_path,
                     }
                 )
                 # Also persist directly to DB so /crawler/paths/ works even
@@ -353,6 +529,7 @@ class PageCrawler:
                 "seo_json": seo_json_path,
                 "seo_md": seo_md_path,
                 "seo_xlsx": seo_xlsx_path,
+                "structured_data": structured_path,
                 "links": links,
                 "status_code": page.evaluate("() => window.performance.getEntries()[0].responseStatus") or 200,
             }
@@ -397,30 +574,27 @@ class PageCrawler:
         enable_ss: bool,
         enable_seo: bool,
         client_id: Optional[str],
-        proxy_type: str = "basic"
+        proxy_type: str = "basic",
+        enable_structured: bool = False,
     ) -> Optional[Dict]:
         """Crawl page using Chromium with stealth"""
         try:
-            proxy_settings = self._resolve_playwright_proxy(proxy_type)
-            with sync_playwright() as p:
-                browser = p.chromium.launch(
-                    headless=self.config.headless,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-infobars',
-                        '--ignore-certificate-errors',
-                        '--window-position=0,0',
-                        '--window-size=1920,1080',
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-web-security',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-extensions',
-                        '--disable-background-networking'
-                    ]
-                )
+            proxy_settings = self._resolve_playwright_proxy(proxy_type, url)
+            with playwright_driver() as p:
+                # Pre-warmed workers reuse the thread's stealth Chromium (a fresh
+                # context per page keeps crawls isolated); elsewhere launch cold
+                pooled = has_pool() and self.config.headless
+                if pooled:
+                    browser = get_stealth_chromium(headless=True)
+                else:
+                    browser = p.chromium.launch(
+                        headless=self.config.headless,
+                        args=[
+                            *STEALTH_CHROMIUM_ARGS,
+                            # Direct visits reuse the shared DNS cache; proxies resolve on their side
+                            *([] if proxy_settings else dns_cache.chromium_args(url)),
+                        ]
+                    )
                 
                 context_kwargs = dict(
                     viewport={"width": 1920, "height": 1080},
@@ -438,6 +612,8 @@ class PageCrawler:
                 )
                 if proxy_settings:
                     context_kwargs["proxy"] = proxy_settings
+                if enable_ss and self.config.screenshot_scale != 1:
+                    context_kwargs["device_scale_factor"] = self.config.screenshot_scale
 
                 # Define nav_timeout and search mobile persona
                 nav_timeout = 90_000 if proxy_type in {"stealth", "enhanced"} else 60_000
@@ -460,10 +636,12 @@ class PageCrawler:
 
                 if self.config.use_custom_headers:
                     self.browser_utils.set_custom_headers(page)
+
+                page_meter = self._attach_bandwidth(page, url, proxy_type, proxy_settings)
                 
                 # Fix 2: Skip resource-blocking on protected domains (Google uses resources to fingerprint)
                 if not self.browser_utils.is_protected_domain(url):
-                    page.route("**/*", self.browser_utils.block_resources)
+                    page.route("**/*", self._resource_blocker(url, enable_ss, page_meter))
                 
                 try:
                     logger.info(f"Navigating to {url} (Chromium)...")
@@ -489,7 +667,7 @@ class PageCrawler:
                     if len(text_content.strip()) < 200:
                         return {"url": url, "error": f"Content too short ({len(text_content.strip())} chars)", "status_code": 422}
                     
-                    result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id)
+                    result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, enable_structured)
                     return result
                 
                 finally:
@@ -515,10 +693,11 @@ class PageCrawler:
                     except Exception:
                         pass
                     
-                    try:
-                        browser.close()
-                    except Exception:
-                        pass
+                    if not pooled:
+                        try:
+                            browser.close()
+                        except Exception:
+                            pass
                 
         except Exception as e:
             logger.warning(f"Chromium failed for {url}: {e}")
@@ -533,7 +712,8 @@ class PageCrawler:
         enable_ss: bool,
         enable_seo: bool,
         client_id: Optional[str],
-        proxy_type: str = "basic"
+        proxy_type: str = "basic",
+        enable_structured: bool = False,
     ) -> Optional[Dict]:
         """Fallback crawl using Camoufox"""
         if not self.config.camoufox_path:
@@ -541,8 +721,8 @@ class PageCrawler:
             return None
         
         try:
-            proxy_settings = self._resolve_playwright_proxy(proxy_type)
-            with sync_playwright() as p:
+            proxy_settings = self._resolve_playwright_proxy(proxy_type, url)
+            with playwright_driver() as p:
                 if platform.system() == "Windows":
                     browser = p.firefox.launch(
                         executable_path=self.config.camoufox_path,
@@ -565,6 +745,8 @@ class PageCrawler:
                     )
                     if proxy_settings:
                         context_kwargs["proxy"] = proxy_settings
+                    if enable_ss and self.config.screenshot_scale != 1:
+                        context_kwargs["device_scale_factor"] = self.config.screenshot_scale
 
                     context = browser.new_context(**context_kwargs)
                     
@@ -578,10 +760,12 @@ class PageCrawler:
 
                     if self.config.use_custom_headers:
                         self.browser_utils.set_custom_headers(page)
+
+                    page_meter = self._attach_bandwidth(page, url, proxy_type, proxy_settings)
                     
                     # Fix 2: Skip resource-blocking on protected domains (Google uses resources to fingerprint)
                     if not self.browser_utils.is_protected_domain(url):
-                        page.route("**/*", self.browser_utils.block_resources)
+                        page.route("**/*", self._resource_blocker(url, enable_ss, page_meter))
                     
                     logger.info(f"Navigating to {url} (Camoufox)...")
                     nav_timeout = 90_000 if proxy_type in {"stealth", "enhanced"} else 60_000
@@ -613,12 +797,12 @@ class PageCrawler:
                         # Re-check
                         text_content = page.evaluate("document.body.innerText")
                         if not self.is_captcha_page(text_content):
-                             result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id)
+                             result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, enable_structured)
                              return result
                         
                         return {"url": url, "error": "CAPTCHA detected", "status_code": 403}
                     
-                    result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id)
+                    result = self.process_page(page, url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, enable_structured)
                     return result
                 finally:
                     try:
@@ -662,6 +846,7 @@ class PageCrawler:
         websocket_manager,
         crawl_mode: str = "all",
         proxy_type: str = "basic",
+        enable_structured: bool = False,
     ) -> Optional[Dict]:
         """Crawl a single page with fallback browsers"""
         logger.info(f"Crawling [{count}]: {url}")
@@ -679,7 +864,10 @@ class PageCrawler:
 
         
         # Try Chromium first (ALWAYS without proxy as per requirements)
-        result = self.crawl_with_chromium(url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, proxy_type="none")
+        result = self.crawl_with_chromium(
+            url, count, enable_md, enable_html, enable_ss, enable_seo, client_id,
+            proxy_type="none", enable_structured=enable_structured,
+        )
         
         if result and "error" not in result:
             logger.info(f"Chromium (no proxy) success: {url}")
@@ -693,9 +881,12 @@ class PageCrawler:
 
         # Fallback to Camoufox (WITH proxy as per requirements)
         logger.info(f"Chromium failed, trying Camoufox fallback with {first_proxy_type} proxy for: {url}")
+        started = time.monotonic()
         result = self.crawl_with_camoufox(
-            url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, first_proxy_type
+            url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, first_proxy_type,
+            enable_structured=enable_structured,
         )
+        self._report_proxy_outcome(result, started)
         
         if result and "error" not in result:
             logger.info(f"Camoufox success: {url}")
@@ -707,9 +898,12 @@ class PageCrawler:
         # if basic likely failed due to proxy inadequacy, retry with enhanced.
         if requested_proxy_type == "auto" and self._is_likely_proxy_failure(result):
             logger.info(f"Auto proxy escalation: retrying Camoufox with enhanced proxy for: {url}")
+            started = time.monotonic()
             retry = self.crawl_with_camoufox(
-                url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, "enhanced"
+                url, count, enable_md, enable_html, enable_ss, enable_seo, client_id, "enhanced",
+                enable_structured=enable_structured,
             )
+            self._report_proxy_outcome(retry, started)
             if retry and "error" not in retry:
                 logger.info(f"Camoufox enhanced success: {url}")
                 return retry
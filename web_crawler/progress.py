@@ -0,0 +1,213 @@
+"""
+Crawl progress — a compact, throttled Redis hash per crawl that
+/crawler/status reads directly instead of the Celery result backend.
+
+Key "progress:{crawl_id}" (PROGRESS_TTL seconds) holds:
+
+  state            queued → running → (retrying →) completed / failed
+  crawl_mode, url
+  pages_done       pages saved
+  pages_failed     pages that errored
+  pages_skipped    duplicates, robots.txt disallows and crawler traps
+  pages_queued     frontier URLs waiting for a worker thread
+  pages_in_flight  pages being rendered right now
+  pages_max        page budget (max_pages, 1 for single / links)
+  bytes            bytes transferred so far (BandwidthMeter)
+  percent, eta_s   finished / expected pages, and the time left at the
+                   current page rate ("" while unknown)
+  attempt          Celery retry number (0 on the first run)
+  started_at, updated_at, error
+  version          bumped on every write
+
+Writes from the crawl loop are throttled to one per PROGRESS_INTERVAL
+seconds; state changes are always written. Each write also publishes on
+"progress:{crawl_id}", so long-polling status requests wake up on the
+next change, and is mirrored into the task's Celery PROGRESS state
+(through `on_flush`) so result-backend clients see the same numbers.
+
+Crawls that end outside the task body (hard time limit, lost worker,
+revoke) never reach finish(); the worker's ScheduledRequest hooks call
+mark_failed() for them, and /crawler/status falls back to the result
+backend when a running hash has not moved for longer than the task's
+time limit.
+
+Progress is best-effort: a Redis failure is logged and never fails the
+crawl.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "1.0"))
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", str(24 * 3600)))
+
+TERMINAL_STATES = ("completed", "failed")
+
+# progress state → Celery state, for clients written against AsyncResult
+CELERY_STATES = {
+    "queued": "PENDING",
+    "running": "PROGRESS",
+    "retrying": "RETRY",
+    "completed": "SUCCESS",
+    "failed": "FAILURE",
+}
+
+_INT_FIELDS = ("pages_done", "pages_failed", "pages_skipped", "pages_queued",
+               "pages_in_flight", "pages_max", "bytes", "attempt", "version")
+
+_redis = None
+
+
+def progress_key(crawl_id: str) -> str:
+    return f"progress:{crawl_id}"
+
+
+def _client():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            decode_responses=True,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+        )
+    return _redis
+
+
+def _write(client, crawl_id: str, fields: Dict) -> None:
+    key = progress_key(crawl_id)
+    pipe = client.pipeline()
+    pipe.hset(key, mapping={k: ("" if v is None else v) for k, v in fields.items()})
+    pipe.hincrby(key, "version", 1)
+    pipe.expire(key, PROGRESS_TTL)
+    pipe.publish(key, fields.get("state", ""))
+    pipe.execute()
+
+
+def mark_queued(crawls: Iterable[Tuple[str, str]], crawl_mode: str, pages_max: int) -> None:
+    """Seed the hash for freshly submitted crawls ((crawl_id, url) pairs), one round trip."""
+    now = time.time()
+    try:
+        client = _client()
+        pipe = client.pipeline(transaction=False)
+        for crawl_id, url in crawls:
+            key = progress_key(crawl_id)
+            pipe.hset(key, mapping={
+                "state": "queued", "crawl_mode": crawl_mode, "url": url,
+                "pages_max": pages_max, "updated_at": now, "version": 1,
+            })
+            pipe.expire(key, PROGRESS_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not record queued progress: {e}")
+
+
+def mark_failed(crawl_id: str, error: str) -> None:
+    """Terminal "failed" for a crawl that ended outside its task body; no-op once terminal or untracked."""
+    try:
+        client = _client()
+        state = client.hget(progress_key(crawl_id), "state")
+        if state is None or state in TERMINAL_STATES:
+            return
+        _write(client, crawl_id, {
+            "state": "failed", "error": error, "pages_queued": 0, "pages_in_flight": 0,
+            "percent": 100.0, "eta_s": 0, "updated_at": time.time(),
+        })
+    except Exception as e:
+        logger.warning(f"Could not record failure of {crawl_id}: {e}")
+
+
+def parse_progress(raw: Dict[str, str]) -> Dict:
+    """Hash fields (all strings) → typed dict for the API."""
+    out: Dict = {}
+    for k, v in raw.items():
+        if k in _INT_FIELDS:
+            out[k] = int(float(v)) if v else 0
+        elif k in ("percent", "eta_s", "started_at", "updated_at"):
+            out[k] = float(v) if v else None
+        else:
+            out[k] = v or None
+    return out
+
+
+class ProgressReporter:
+    """Throttled progress writer for one crawl; safe to call from crawl worker threads."""
+
+    def __init__(
+        self,
+        crawl_id: str,
+        crawl_mode: str,
+        url: str,
+        pages_max: int,
+        on_flush: Optional[Callable[[Dict], None]] = None,
+        interval: float = PROGRESS_INTERVAL,
+    ):
+        self.crawl_id = crawl_id
+        self.interval = interval
+        self.on_flush = on_flush
+        self._fields: Dict = {"crawl_mode": crawl_mode, "url": url, "pages_max": pages_max}
+        self._started = time.time()
+        self._last = 0.0
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def due(self) -> bool:
+        """True when a throttled update() would be written now."""
+        return time.monotonic() - self._last >= self.interval
+
+    def start(self, attempt: int = 0) -> None:
+        self._started = time.time()
+        self.update(state="running", attempt=attempt, started_at=self._started, error="", force=True)
+
+    def update(self, force: bool = False, **fields) -> bool:
+        """Merge `fields` and write them if the interval has passed (or `force`). Returns True if written."""
+        with self._lock:
+            self._fields.update(fields)
+            if not force and not self.due():
+                return False
+            self._last = time.monotonic()
+            snapshot = self._snapshot()
+        self._flush(snapshot)
+        return True
+
+    def finish(self, state: str, error: str = "", **fields) -> None:
+        self.update(state=state, error=error, pages_queued=0, pages_in_flight=0, force=True, **fields)
+
+    def _snapshot(self) -> Dict:
+        f = dict(self._fields)
+        now = time.time()
+        finished = int(f.get("pages_done") or 0) + int(f.get("pages_failed") or 0)
+        expected = min(
+            int(f.get("pages_max") or 0) or finished,
+            finished + int(f.get("pages_queued") or 0) + int(f.get("pages_in_flight") or 0),
+        )
+        if f.get("state") in TERMINAL_STATES:
+            f["percent"], f["eta_s"] = 100.0, 0
+        else:
+            f["percent"] = round(100.0 * finished / expected, 1) if expected else 0.0
+            elapsed = now - self._started
+            rate = finished / elapsed if elapsed > 0 else 0
+            f["eta_s"] = round((expected - finished) / rate, 1) if rate > 0 else None
+        f["updated_at"] = now
+        return f
+
+    def _flush(self, snapshot: Dict) -> None:
+        try:
+            _write(_client(), self.crawl_id, snapshot)
+        except Exception as e:
+            if not self._warned:
+                logger.warning(f"Progress for {self.crawl_id} not published: {e}")
+                self._warned = True
+        if self.on_flush:
+            try:
+                self.on_flush(snapshot)
+            except Exception as e:
+                logger.debug(f"Progress callback failed for {self.crawl_id}: {e}")
@@ -0,0 +1,326 @@
+"""
+Proxy health tracking — weighted selection, circuit breakers and sticky
+sessions for ProxyManager.
+
+Every proxied page attempt is reported back with its outcome:
+
+  - success → latency folded into an EWMA, success rate EWMA moves up,
+              breaker closes and the cool-down level resets
+  - failure → connection error / timeout: success rate EWMA moves down;
+              after _FAILURES_TO_TRIP consecutive failures the breaker opens
+  - ban     → 403 / 429 / CAPTCHA from one target host: only that
+              (proxy, host) pair is benched, the proxy keeps serving the
+              other hosts and its global breaker is left alone
+
+An open breaker keeps the proxy out of rotation for
+_BASE_COOLDOWN * 2^level seconds (capped at _MAX_COOLDOWN). When it
+expires the proxy is half-open: it can be picked again and one success
+closes it, one failure re-opens it with the next cool-down level. Host
+bans follow the same cool-down ladder, per (proxy, host).
+
+Selection is weighted random over the closed / half-open proxies with
+weight = success_rate² / latency, so fast healthy proxies take most of
+the traffic while slow ones still get probed. A host keeps its proxy for
+_STICKY_TTL seconds (sticky session) while that proxy stays usable.
+
+State is shared across Celery workers through Redis (one hash per proxy,
+keyed by a digest so credentials never reach Redis, plus one per banned
+(proxy, host) pair). Reads are refreshed
+at most every _REDIS_REFRESH seconds; Redis failures fall back to the
+local state silently.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_EWMA_ALPHA = 0.3
+_DEFAULT_LATENCY = 5.0          # seconds, for proxies without samples yet
+_MIN_LATENCY = 0.1
+_FAILURES_TO_TRIP = 3
+_BASE_COOLDOWN = 30.0           # seconds
+_MAX_COOLDOWN = 1800.0
+_STICKY_TTL = 600               # seconds a host keeps its proxy
+_MAX_STICKY = 10_000            # prune expired sticky entries beyond this
+_REDIS_REFRESH = 2.0            # seconds between Redis state reads
+_REDIS_TTL = 24 * 3600          # idle proxy state expires from Redis
+
+_FIELDS = ("latency", "success", "failures", "open_until", "level", "updated")
+
+
+def proxy_key(proxy: str) -> str:
+    """Stable, credential-free identifier for a proxy URL."""
+    return hashlib.sha1(proxy.encode("utf-8")).hexdigest()[:16]
+
+
+def _ban_redis_key(ban_id: str) -> str:
+    key, host = ban_id.split("|", 1)
+    return f"proxy:ban:{key}:{host}"
+
+
+class _State:
+    __slots__ = _FIELDS
+
+    def __init__(self):
+        self.latency = _DEFAULT_LATENCY
+        self.success = 1.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.level = 0
+        self.updated = 0.0
+
+    def weight(self, now: float) -> float:
+        if self.open_until > now:
+            return 0.0
+        return (self.success ** 2) / max(self.latency, _MIN_LATENCY) + 1e-6
+
+    def to_redis(self) -> Dict[str, str]:
+        return {f: repr(getattr(self, f)) for f in _FIELDS}
+
+    @classmethod
+    def from_redis(cls, data: Dict[str, str]) -> "_State":
+        state = cls()
+        for f in _FIELDS:
+            if f in data:
+                value = float(data[f])
+                setattr(state, f, int(value) if f in ("failures", "level") else value)
+        return state
+
+
+class ProxyHealth:
+    """Per-proxy health shared by every ProxyManager in the process (and via Redis)."""
+
+    def __init__(self, use_redis: bool = True):
+        self._states: Dict[str, _State] = {}
+        self._sticky: Dict[str, tuple] = {}     # "tier|host" → (proxy key, expires)
+        self._bans: Dict[str, tuple] = {}       # "key|host" → (open_until, level, updated)
+        self._refreshed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._use_redis = use_redis
+        self._redis = None
+
+    # ── Redis (best effort) ──────────────────────────────────────────────────
+
+    def _redis_client(self):
+        if not self._use_redis:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                decode_responses=True,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._redis
+
+    def _pull(self, keys: List[str], now: float, host: Optional[str] = None) -> None:
+        stale = [k for k in keys if now - self._refreshed.get(k, 0.0) >= _REDIS_REFRESH]
+        bans = [f"{k}|{host}" for k in keys if host] if host else []
+        stale_bans = [b for b in bans if now - self._refreshed.get(b, 0.0) >= _REDIS_REFRESH]
+        if not stale and not stale_bans:
+            return
+        try:
+            client = self._redis_client()
+            if client is None:
+                return
+            pipe = client.pipeline(transaction=False)
+            for key in stale:
+                pipe.hgetall(f"proxy:health:{key}")
+            for ban_id in stale_bans:
+                pipe.hgetall(_ban_redis_key(ban_id))
+            remote = pipe.execute()
+        except Exception as e:
+            logger.debug(f"Proxy health Redis read failed: {e}")
+            return
+        with self._lock:
+            for key, data in zip(stale, remote):
+                self._refreshed[key] = now
+                if not data:
+                    continue
+                state = _State.from_redis(data)
+                local = self._states.get(key)
+                if local is None or state.updated > local.updated:
+                    self._states[key] = state
+            for ban_id, data in zip(stale_bans, remote[len(stale):]):
+                self._refreshed[ban_id] = now
+                if not data:
+                    continue
+                ban = (float(data["open_until"]), int(float(data["level"])), float(data["updated"]))
+                local = self._bans.get(ban_id)
+                if local is None or ban[2] > local[2]:
+                    self._bans[ban_id] = ban
+
+    def _push(self, key: str, state: _State) -> None:
+        try:
+            client = self._redis_client()
+            if client is None:
+                return
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(f"proxy:health:{key}", mapping=state.to_redis())
+            pipe.expire(f"proxy:health:{key}", _REDIS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Proxy health Redis write failed: {e}")
+
+    def _push_ban(self, ban_id: str, ban: Optional[tuple]) -> None:
+        try:
+            client = self._redis_client()
+            if client is None:
+                return
+            if ban is None:
+                client.delete(_ban_redis_key(ban_id))
+                return
+            open_until, level, updated = ban
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(_ban_redis_key(ban_id), mapping={
+                "open_until": repr(open_until), "level": repr(level), "updated": repr(updated),
+            })
+            pipe.expire(_ban_redis_key(ban_id), _REDIS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Proxy health Redis write failed: {e}")
+
+    # ── Selection ────────────────────────────────────────────────────────────
+
+    def select(self, proxies: List[str], tier: str = "basic", host: Optional[str] = None) -> str:
+        """Pick a proxy from `proxies`: sticky for `host` if healthy, else weighted random."""
+        now = time.time()
+        keys = {proxy_key(p): p for p in proxies}
+        host = host.lower() if host else None
+        self._pull(list(keys), now, host)
+
+        sticky_id = f"{tier}|{host}" if host else None
+        with self._lock:
+            if sticky_id:
+                sticky = self._sticky.get(sticky_id)
+                if sticky and sticky[1] > now and sticky[0] in keys:
+                    if self._weight(sticky[0], host, now) > 0:
+                        return keys[sticky[0]]
+
+            candidates = list(keys)
+            weights = [self._weight(k, host, now) for k in candidates]
+            if any(weights):
+                key = random.choices(candidates, weights=weights)[0]
+            else:
+                # Every breaker is open — use the one that re-opens first
+                key = min(candidates, key=lambda k: self._reopens_at(k, host))
+
+            if sticky_id:
+                if len(self._sticky) >= _MAX_STICKY:
+                    self._sticky = {h: v for h, v in self._sticky.items() if v[1] > now}
+                self._sticky[sticky_id] = (key, now + _STICKY_TTL)
+        return keys[key]
+
+    def _weight(self, key: str, host: Optional[str], now: float) -> float:
+        # Caller holds self._lock
+        if host and self._bans.get(f"{key}|{host}", (0.0,))[0] > now:
+            return 0.0
+        return (self._states.get(key) or _State()).weight(now)
+
+    def _reopens_at(self, key: str, host: Optional[str]) -> float:
+        # Caller holds self._lock
+        state = self._states.get(key)
+        ban = self._bans.get(f"{key}|{host}") if host else None
+        return max(state.open_until if state else 0.0, ban[0] if ban else 0.0)
+
+    # ── Outcomes ─────────────────────────────────────────────────────────────
+
+    def record_success(self, proxy: str, latency: float, host: Optional[str] = None) -> None:
+        key = proxy_key(proxy)
+        ban_id = f"{key}|{host.lower()}" if host else None
+        with self._lock:
+            # A half-open host ban closes on the first page that gets through
+            lifted = ban_id is not None and self._bans.pop(ban_id, None) is not None
+            state = self._states.setdefault(key, _State())
+            latency = max(latency, _MIN_LATENCY)
+            if state.updated:
+                state.latency += _EWMA_ALPHA * (latency - state.latency)
+            else:
+                state.latency = latency     # first sample replaces the default
+            state.success += _EWMA_ALPHA * (1.0 - state.success)
+            state.failures = 0
+            state.open_until = 0.0
+            state.level = 0
+            state.updated = time.time()
+        self._push(key, state)
+        if lifted:
+            self._push_ban(ban_id, None)
+
+    def record_failure(self, proxy: str, ban: bool = False, host: Optional[str] = None) -> None:
+        """
+        Connection / timeout failures count against the proxy everywhere. A ban
+        signal is about one target host, so with `host` it benches only that
+        (proxy, host) pair; without one it counts as an ordinary failure.
+        """
+        key = proxy_key(proxy)
+        now = time.time()
+        if ban and host:
+            self._record_ban(key, host.lower(), now)
+            return
+        with self._lock:
+            state = self._states.setdefault(key, _State())
+            state.success -= _EWMA_ALPHA * state.success
+            state.failures += 1
+            half_open = state.open_until and state.open_until <= now
+            if half_open or state.failures >= _FAILURES_TO_TRIP:
+                cooldown = min(_BASE_COOLDOWN * (2 ** state.level), _MAX_COOLDOWN)
+                state.open_until = now + cooldown
+                state.level += 1
+                # Hosts pinned to this proxy move on
+                self._sticky = {h: s for h, s in self._sticky.items() if s[0] != key}
+                logger.info(f"Proxy {key} circuit open for {cooldown:.0f}s ({state.failures} failures)")
+            state.updated = now
+        self._push(key, state)
+
+    def _record_ban(self, key: str, host: str, now: float) -> None:
+        ban_id = f"{key}|{host}"
+        with self._lock:
+            level = self._bans.get(ban_id, (0.0, 0, 0.0))[1]
+            cooldown = min(_BASE_COOLDOWN * (2 ** level), _MAX_COOLDOWN)
+            ban = (now + cooldown, level + 1, now)
+            if len(self._bans) >= _MAX_STICKY:
+                # Keep the cool-down level of recent bans, forget old ones
+                self._bans = {b: v for b, v in self._bans.items() if v[0] + _MAX_COOLDOWN > now}
+            self._bans[ban_id] = ban
+            # Only this host moves off the proxy
+            self._sticky = {
+                h: s for h, s in self._sticky.items()
+                if not (s[0] == key and h.endswith(f"|{host}"))
+            }
+        logger.info(f"Proxy {key} banned by {host} for {cooldown:.0f}s")
+        self._push_ban(ban_id, ban)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current local state per proxy key (for logs / debugging)."""
+        now = time.time()
+        with self._lock:
+            banned: Dict[str, List[str]] = {}
+            for ban_id, ban in self._bans.items():
+                if ban[0] > now:
+                    key, host = ban_id.split("|", 1)
+                    banned.setdefault(key, []).append(host)
+            return {
+                key: {
+                    "latency": round(s.latency, 3),
+                    "success": round(s.success, 3),
+                    "open": s.open_until > now,
+                    "level": s.level,
+                    "banned_hosts": sorted(banned.get(key, [])),
+                }
+                for key, s in {**{k: _State() for k in banned}, **self._states}.items()
+            }
+
+
+# One tracker per process: every crawl in a worker learns from the others
+proxy_health = ProxyHealth(
+    use_redis=os.getenv("PROXY_HEALTH_REDIS", "true").strip().lower() in {"1", "true", "yes", "on"}
+)
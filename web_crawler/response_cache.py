@@ -0,0 +1,243 @@
+"""
+Crawl-scoped HTTP response cache served through Playwright route interception.
+
+Every page gets a fresh browser context, so without help each page
+re-downloads the site's shared JS bundles, stylesheets and images. The
+route handler built by BrowserUtils.make_resource_blocker consults this
+cache before letting a static sub-resource go to the network:
+
+  - hit   → route.fulfill() from memory (or disk), no network / proxy bytes
+  - miss  → route.fetch() through the context (same proxy), store, fulfill;
+            a failed fetch falls back to route.continue_() (abort if that
+            is no longer possible), so the request never hangs
+
+Only GET requests for static resource types are cached, and only 200
+responses without no-store / Set-Cookie / Vary: *. Documents, XHR and
+fetch calls always go to the network.
+
+The memory tier is an LRU bounded by total body bytes. With a disk
+directory configured, entries evicted from memory are kept on disk (also
+LRU-bounded) and promoted back on the next hit. The cache lives for one
+crawl; close() drops both tiers.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+# Fonts are always blocked by the route handler, so they never reach the cache
+CACHEABLE_TYPES = frozenset({"script", "stylesheet", "image"})
+
+# Hop-by-hop / encoding headers: the cached body is already decoded
+_DROP_HEADERS = frozenset({
+    "content-encoding", "content-length", "transfer-encoding", "connection",
+    "keep-alive", "set-cookie", "date", "age",
+})
+
+# Headers describing the wire encoding, not the decoded body we fulfill with
+_ENCODING_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+_MAX_ENTRY_BYTES = 10 * 1024 * 1024
+
+Entry = Tuple[int, Dict[str, str], bytes]
+
+
+def is_cacheable_response(status: int, headers: Dict[str, str]) -> bool:
+    if status != 200:
+        return False
+    cache_control = (headers.get("cache-control") or "").lower()
+    if "no-store" in cache_control:
+        return False
+    if "set-cookie" in headers:
+        return False
+    return (headers.get("vary") or "").strip() != "*"
+
+
+class ResponseCache:
+    """Thread-safe, byte-bounded LRU of decoded responses keyed by URL."""
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[Path] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(_MAX_ENTRY_BYTES, max(max_bytes // 8, 1))
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes or max_bytes * 4
+
+        self._memory: "OrderedDict[str, Entry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()   # key → body size
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def get(self, url: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is not None:
+                self._memory.move_to_end(url)
+            elif url in self._disk:
+                entry = self._read_disk(url)
+                if entry is not None:
+                    self._store_memory(url, entry)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_saved += len(entry[2])
+            return entry
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        if len(body) > self.max_entry_bytes or not is_cacheable_response(status, headers):
+            return False
+        kept = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        with self._lock:
+            if url in self._memory:
+                return True
+            self._store_memory(url, (status, kept, body))
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "entries": len(self._memory.keys() | self._disk.keys()),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def close(self) -> None:
+        """Drop both tiers; the cache does not outlive the crawl."""
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_bytes = self._disk_bytes = 0
+            if self.disk_dir:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    # ── Tiers (lock held) ────────────────────────────────────────────────────
+
+    def _store_memory(self, url: str, entry: Entry) -> None:
+        self._memory[url] = entry
+        self._memory_bytes += len(entry[2])
+        while self._memory_bytes > self.max_bytes and self._memory:
+            old_url, old_entry = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_entry[2])
+            if self.disk_dir and old_url not in self._disk:
+                self._write_disk(old_url, old_entry)
+
+    def _disk_path(self, url: str) -> Path:
+        return self.disk_dir / hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _write_disk(self, url: str, entry: Entry) -> None:
+        status, headers, body = entry
+        path = self._disk_path(url)
+        try:
+            path.with_suffix(".json").write_text(
+                json.dumps({"url": url, "status": status, "headers": headers}), encoding="utf-8"
+            )
+            path.write_bytes(body)
+        except OSError as e:
+            logger.debug(f"Response cache disk write failed for {url}: {e}")
+            return
+        self._disk[url] = len(body)
+        self._disk_bytes += len(body)
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            old_url, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._remove_disk(old_url)
+
+    def _read_disk(self, url: str) -> Optional[Entry]:
+        path = self._disk_path(url)
+        try:
+            meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+            body = path.read_bytes()
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk.pop(url, 0)
+            return None
+        self._disk.move_to_end(url)
+        return meta["status"], meta["headers"], body
+
+    def _remove_disk(self, url: str) -> None:
+        path = self._disk_path(url)
+        for p in (path, path.with_suffix(".json")):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+
+def serve_from_cache(route, cache: ResponseCache, on_hit: Optional[Callable] = None) -> bool:
+    """
+    Handle `route` through the cache if it is a cacheable static GET.
+    Returns False when the request should take the normal path.
+    `on_hit(request)` is called for requests answered without the network.
+    """
+    request = route.request
+    if request.method != "GET" or request.resource_type not in CACHEABLE_TYPES:
+        return False
+
+    url = request.url
+    entry = cache.get(url)
+    if entry is not None:
+        status, headers, body = entry
+        if on_hit is not None:
+            on_hit(request)
+        route.fulfill(status=status, headers=headers, body=body)
+        return True
+
+    try:
+        response = route.fetch()
+        body = response.body()
+    except Exception as e:
+        # Timeout, DNS error, reset, closed target — never leave the route
+        # pending, or a blocking script holds domcontentloaded until the
+        # navigation timeout
+        logger.debug(f"Response cache fetch failed for {url}: {e}")
+        _settle(route, fulfilled=False)
+        return True
+
+    headers = response.headers
+    cache.put(url, response.status, headers, body)
+    try:
+        route.fulfill(
+            status=response.status,
+            headers={k: v for k, v in headers.items() if k.lower() not in _ENCODING_HEADERS},
+            body=body,
+        )
+    except Exception as e:
+        logger.debug(f"Response cache fulfill failed for {url}: {e}")
+        _settle(route, fulfilled=True)
+    return True
+
+
+def _settle(route, fulfilled: bool) -> None:
+    """Let a failed cache miss go to the network, or abort it if it can no longer continue."""
+    if not fulfilled:
+        try:
+            route.continue_()
+            return
+        except Exception:
+            pass
+    try:
+        route.abort()
+    except Exception:
+        pass
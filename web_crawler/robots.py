@@ -0,0 +1,278 @@
+"""
+robots.txt compliance — compiled per-host rule matching + crawl-delay scheduling.
+
+robots.txt is fetched once per host and compiled into a single matcher:
+  - Allow / Disallow rules for the group naming our product token
+    (case-insensitive, RFC 9309 §2.2.1), else the "*" group
+  - Each rule becomes an anchored regex ("*" wildcard, "$" end anchor)
+  - Longest matching rule wins; Allow wins a length tie (RFC 9309)
+  - Plain prefix rules (the vast majority) skip regex entirely
+
+The compiled matcher is consulted BEFORE a URL is handed to a browser, so
+disallowed pages (which usually end in 403s and proxy escalations) never
+cost a render.
+
+Crawl-delay is fed into HostThrottle, which spaces out request start
+times per host for the frontier loop in WebCrawler.crawl.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_ROBOTS_TIMEOUT: Tuple[int, int] = (5, 5)   # robots.txt is tiny
+_USER_AGENT_TOKEN = "gcrawl"                # product token matched against User-agent groups
+# RFC 9309 product token: letters, "_" and "-" (a trailing "/1.0" etc. is not part of it)
+_PRODUCT_TOKEN_RE = re.compile(r"[a-z_-]+")
+
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/133.0.0.0 Safari/537.36"
+    ),
+}
+
+
+# ── Rule compilation ─────────────────────────────────────────────────────────
+
+@dataclass
+class _Rule:
+    allow: bool
+    length: int                                  # specificity = raw pattern length
+    prefix: Optional[str] = None                 # fast path for wildcard-free rules
+    regex: Optional["re.Pattern[str]"] = None    # compiled for "*" / "$" rules
+
+    def matches(self, path: str) -> bool:
+        if self.prefix is not None:
+            return path.startswith(self.prefix)
+        return self.regex.match(path) is not None
+
+
+def _product_token(value: str) -> str:
+    """Lower-cased product token of a User-agent value ("*" for the wildcard)."""
+    value = value.strip().lower()
+    if value.startswith("*"):
+        return "*"
+    match = _PRODUCT_TOKEN_RE.match(value)
+    return match.group(0) if match else ""
+
+
+def _compile_rule(pattern: str, allow: bool) -> _Rule:
+    if "*" not in pattern and not pattern.endswith("$"):
+        return _Rule(allow=allow, length=len(pattern), prefix=pattern)
+
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(part) for part in body.split("*"))
+    if anchored:
+        regex += "$"
+    return _Rule(allow=allow, length=len(pattern), regex=re.compile(regex))
+
+
+@dataclass
+class RobotsRules:
+    """Compiled robots.txt rules for a single host."""
+
+    rules: List[_Rule] = field(default_factory=list)
+    crawl_delay: Optional[float] = None
+    sitemaps: List[str] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str = _USER_AGENT_TOKEN) -> "RobotsRules":
+        """
+        Parse robots.txt text and keep only the group whose User-agent product
+        token equals ours, compared case-insensitively (falls back to the "*"
+        group). Groups naming the same token are merged. Sitemap directives
+        are global.
+        """
+        token = _product_token(user_agent)
+        groups: Dict[str, Dict] = {}
+        sitemaps: List[str] = []
+
+        current_agents: List[str] = []
+        in_rules = False  # a rule line ends the current User-agent run
+
+        for raw in text.splitlines():
+            line = raw.split("#", 1)[0].strip()
+            if not line or ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            key = key.strip().lower()
+            value = value.strip()
+
+            if key == "sitemap":
+                if value.startswith("http"):
+                    sitemaps.append(value)
+                continue
+
+            if key == "user-agent":
+                if in_rules:
+                    current_agents = []
+                    in_rules = False
+                agent = _product_token(value)
+                current_agents.append(agent)
+                groups.setdefault(agent, {"rules": [], "delay": None})
+                continue
+
+            if not current_agents:
+                continue
+            in_rules = True
+
+            if key in ("allow", "disallow"):
+                if not value:
+                    continue  # "Disallow:" with no path allows everything
+                for agent in current_agents:
+                    groups[agent]["rules"].append(_compile_rule(value, key == "allow"))
+            elif key == "crawl-delay":
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in current_agents:
+                    groups[agent]["delay"] = delay
+
+        # Our own group wins, then "*" ("gcrawler" or "notgcrawl" are other crawlers)
+        chosen = groups.get(token) if token and token != "*" else None
+        if chosen is None:
+            chosen = groups.get("*", {"rules": [], "delay": None})
+
+        # Longest pattern first so the first hit is the winning rule;
+        # Allow sorts ahead of Disallow on equal length.
+        rules = sorted(chosen["rules"], key=lambda r: (r.length, r.allow), reverse=True)
+        return cls(rules=rules, crawl_delay=chosen["delay"], sitemaps=sitemaps)
+
+    def is_allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        if path == "/robots.txt":
+            return True
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule.allow
+        return True
+
+
+# ── Per-host cache ───────────────────────────────────────────────────────────
+
+def _origin(url: str) -> str:
+    p = urlparse(url)
+    return f"{p.scheme}://{p.netloc}"
+
+
+class RobotsCache:
+    """
+    Thread-safe, crawl-scoped cache of compiled RobotsRules keyed by origin.
+    robots.txt is fetched at most once per origin; unreachable or non-200
+    robots.txt files are treated as "allow everything" (RFC 9309 §2.3.1.3).
+
+    robots.txt goes out through the crawl's proxy: `proxy_dict` for a fixed
+    one, or `proxy_for(host)` to pick one per host (requests-style dicts).
+    """
+
+    def __init__(
+        self,
+        proxy_dict: Optional[dict] = None,
+        user_agent: str = _USER_AGENT_TOKEN,
+        proxy_for: Optional[Callable[[str], Optional[dict]]] = None,
+    ):
+        self.proxy_dict = proxy_dict
+        self.proxy_for = proxy_for
+        self.user_agent = user_agent
+        self._rules: Dict[str, RobotsRules] = {}
+        self._lock = threading.Lock()
+
+    def prime(self, origin: str, text: str) -> RobotsRules:
+        """Compile an already-fetched robots.txt body (e.g. from map mode)."""
+        rules = RobotsRules.parse(text, self.user_agent)
+        with self._lock:
+            self._rules[origin] = rules
+        return rules
+
+    def get(self, url: str) -> RobotsRules:
+        origin = _origin(url)
+        with self._lock:
+            rules = self._rules.get(origin)
+        if rules is not None:
+            return rules
+
+        text = ""
+        robots_url = f"{origin}/robots.txt"
+        try:
+            proxies = self.proxy_for(urlparse(url).hostname or "") if self.proxy_for else self.proxy_dict
+            resp = requests.get(
+                robots_url,
+                headers=_HEADERS,
+                timeout=_ROBOTS_TIMEOUT,
+                allow_redirects=True,
+                proxies=proxies,
+            )
+            if resp.status_code == 200:
+                text = resp.text
+            else:
+                logger.debug(f"robots.txt HTTP {resp.status_code} for {origin} — allowing all")
+        except Exception as e:
+            logger.debug(f"robots.txt fetch failed for {origin}: {e} — allowing all")
+
+        rules = RobotsRules.parse(text, self.user_agent)
+        with self._lock:
+            # Another thread may have compiled it meanwhile — keep the first one
+            rules = self._rules.setdefault(origin, rules)
+
+        logger.info(
+            f"🤖 robots.txt compiled for {origin}: {len(rules.rules)} rule(s)"
+            + (f", crawl-delay {rules.crawl_delay}s" if rules.crawl_delay else "")
+        )
+        return rules
+
+    def is_allowed(self, url: str) -> bool:
+        return self.get(url).is_allowed(url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        return self.get(url).crawl_delay
+
+
+# ── Crawl-delay scheduler ────────────────────────────────────────────────────
+
+class HostThrottle:
+    """
+    Per-host request spacing. `wait_time(url)` returns how long the caller
+    must sleep before it may start the next request to that host, and
+    reserves the slot so concurrent callers are spaced out as well.
+    """
+
+    def __init__(self, max_delay: float = 10.0):
+        self.max_delay = max_delay
+        self._delays: Dict[str, float] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def set_delay(self, url: str, delay: Optional[float]) -> None:
+        if not delay or delay <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            self._delays[host] = min(delay, self.max_delay)
+
+    def reserve(self, url: str) -> float:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            delay = self._delays.get(host)
+            if not delay:
+                return 0.0
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + delay
+            return slot - now
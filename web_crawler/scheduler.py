@@ -0,0 +1,474 @@
+"""
+Crawl admission scheduler — per-tenant quotas, priorities and weighted
+fair queuing in front of the Celery queues.
+
+Crawl submissions no longer go straight to the broker. They wait in a
+per-tenant pending set in Redis and are released to Celery (send_task,
+so task_routes still picks crawl_queue / page_queue / map_queue) only
+when the job is admitted:
+
+  - capacity  → counted per target queue (resolved from task_routes): the
+                crawls in flight on a queue stay below the warm worker
+                children consuming it, from their worker_bootstrap
+                heartbeats (SCHED_CAPACITY overrides, per queue;
+                SCHED_DEFAULT_CAPACITY when no worker has registered for
+                it). Hour-long crawl_queue jobs therefore never hold the
+                slots of a dedicated page_queue worker
+  - quota     → crawls in flight per tenant (user) stay below
+                SCHED_TENANT_QUOTA, or the tenant's entry in sched:quota
+  - priority  → high / normal / low; the highest pending priority across
+                tenants goes first, and the level is also passed to the
+                broker as the message priority
+  - fairness  → among tenants at that priority (per queue), the one with
+                the lowest virtual time goes first; each dispatch advances it by
+                1 / weight (sched:weight, default 1). A tenant that comes
+                back from idle starts at the current virtual clock, so
+                one user's 200 crawls interleave with everyone else's
+
+Admission and release are Lua scripts, so API processes and workers can
+dispatch concurrently without double-booking a slot. Slots are freed:
+
+  - in the worker's task_postrun (not on RETRY — the job is still in flight)
+  - by ScheduledRequest in the worker's main process, when a task is killed
+    at its hard time limit or fails outside the task body (a child lost to
+    OOM / SIGKILL keeps its slot only when Celery re-queues the message)
+  - on task_revoked
+  - when the slot's lease runs out. Each job's lease covers its task's
+    time_limit × (max_retries + 1) plus backoff and SCHED_LEASE_MARGIN
+    (SCHED_LEASE_SECONDS for tasks without a time limit); every worker
+    pumps on a SCHED_PUMP_INTERVAL timer, so expired leases are reaped
+    even when nothing is submitted or finishing
+
+SCHEDULER_ENABLED=false sends every job to the broker immediately (one
+Celery group per submission), as before.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from billiard.exceptions import WorkerLostError
+from celery.signals import task_postrun, task_revoked, worker_ready, worker_shutdown
+from celery.worker.request import Request
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+ENABLED = os.getenv("SCHEDULER_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+TENANT_QUOTA = int(os.getenv("SCHED_TENANT_QUOTA", "4"))
+CAPACITY = int(os.getenv("SCHED_CAPACITY", "0"))             # per queue; 0 = its ready worker children
+DEFAULT_CAPACITY = int(os.getenv("SCHED_DEFAULT_CAPACITY", "8"))
+LEASE_SECONDS = int(os.getenv("SCHED_LEASE_SECONDS", "7200"))     # tasks without time_limit
+LEASE_MARGIN = int(os.getenv("SCHED_LEASE_MARGIN", "300"))
+PUMP_INTERVAL = float(os.getenv("SCHED_PUMP_INTERVAL", "15"))
+_MAX_DISPATCH = 500         # jobs released per pump() call
+
+# Celery priority per level (Redis transport: lower runs first, see priority_steps)
+PRIORITIES = {"high": 0, "normal": 3, "low": 6}
+
+# Live warm children per consumed queue (worker_bootstrap heartbeats; same env as the workers)
+_HEARTBEAT_KEY = "celery:workers:heartbeat:{queue}"
+_READY_TTL = float(os.getenv("WORKER_READY_TTL", "60"))
+
+# Shared by dispatch (lease reaping) and release
+_LUA_RELEASE_FN = """
+local function release(id)
+    local t = redis.call('HGET', 'sched:running', id)
+    if not t then return 0 end
+    local q = redis.call('HGET', 'sched:running_queue', id)
+    redis.call('HDEL', 'sched:running', id)
+    redis.call('HDEL', 'sched:running_queue', id)
+    redis.call('ZREM', 'sched:leases', id)
+    if tonumber(redis.call('HINCRBY', 'sched:tenant_running', t, -1)) <= 0 then
+        redis.call('HDEL', 'sched:tenant_running', t)
+    end
+    if q and tonumber(redis.call('DECR', 'sched:used:' .. q)) < 0 then
+        redis.call('SET', 'sched:used:' .. q, 0)
+    end
+    return 1
+end
+"""
+
+# ARGV: tenant, n, then (job id, priority, queue, payload) * n
+_LUA_ENQUEUE = """
+local t, n = ARGV[1], tonumber(ARGV[2])
+local seq = tonumber(redis.call('INCRBY', 'sched:seq', n)) - n
+for i = 0, n - 1 do
+    local id, prio = ARGV[3 + i * 4], tonumber(ARGV[4 + i * 4])
+    local q, payload = ARGV[5 + i * 4], ARGV[6 + i * 4]
+    local vclock = tonumber(redis.call('GET', 'sched:vclock:' .. q) or '0')
+    redis.call('SADD', 'sched:queues', q)
+    redis.call('ZADD', 'sched:tenants:' .. q, 'NX', vclock, t)
+    redis.call('ZADD', 'sched:pending:' .. t .. ':' .. q, prio * 1e12 + seq + i, id)
+    redis.call('HSET', 'sched:jobs', id, payload)
+end
+return n
+"""
+
+# ARGV: now, default quota, lease seconds, then (queue, capacity) pairs
+# → payload of the admitted job or false
+_LUA_DISPATCH = _LUA_RELEASE_FN + """
+local now, default_quota, lease = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', 'sched:leases', '-inf', now)) do
+    release(id)
+end
+
+-- Only queues with a free slot compete. Within a queue, tenants come back
+-- ordered by virtual time: the first one holding the best pending priority
+-- wins; across queues the better priority wins
+local best_q, best_t, best_id, best_prio, best_v
+for j = 4, #ARGV, 2 do
+    local q, capacity = ARGV[j], tonumber(ARGV[j + 1])
+    if tonumber(redis.call('GET', 'sched:used:' .. q) or '0') < capacity then
+        local tenants = redis.call('ZRANGE', 'sched:tenants:' .. q, 0, -1, 'WITHSCORES')
+        for i = 1, #tenants, 2 do
+            local t, v = tenants[i], tonumber(tenants[i + 1])
+            local head = redis.call('ZRANGE', 'sched:pending:' .. t .. ':' .. q, 0, 0, 'WITHSCORES')
+            if #head == 0 then
+                redis.call('ZREM', 'sched:tenants:' .. q, t)
+            else
+                local quota = tonumber(redis.call('HGET', 'sched:quota', t) or default_quota)
+                local running = tonumber(redis.call('HGET', 'sched:tenant_running', t) or '0')
+                local prio = math.floor(tonumber(head[2]) / 1e12)
+                if running < quota and (best_t == nil or prio < best_prio) then
+                    best_q, best_t, best_id, best_prio, best_v = q, t, head[1], prio, v
+                end
+            end
+        end
+    end
+end
+if best_t == nil then return false end
+
+local pending = 'sched:pending:' .. best_t .. ':' .. best_q
+redis.call('ZREM', pending, best_id)
+local payload = redis.call('HGET', 'sched:jobs', best_id)
+redis.call('HDEL', 'sched:jobs', best_id)
+
+-- Per-job lease (derived from the task's time limits at submission)
+if payload then
+    local ok, job = pcall(cjson.decode, payload)
+    if ok and tonumber(job.lease) and tonumber(job.lease) > 0 then lease = tonumber(job.lease) end
+end
+
+redis.call('HINCRBY', 'sched:tenant_running', best_t, 1)
+redis.call('INCR', 'sched:used:' .. best_q)
+redis.call('HSET', 'sched:running', best_id, best_t)
+redis.call('HSET', 'sched:running_queue', best_id, best_q)
+redis.call('ZADD', 'sched:leases', now + lease, best_id)
+
+local weight = tonumber(redis.call('HGET', 'sched:weight', best_t) or '1')
+redis.call('SET', 'sched:vclock:' .. best_q, best_v)
+if redis.call('ZCARD', pending) == 0 then
+    redis.call('ZREM', 'sched:tenants:' .. best_q, best_t)
+else
+    redis.call('ZADD', 'sched:tenants:' .. best_q, best_v + 1 / weight, best_t)
+end
+return payload or '{}'
+"""
+
+_LUA_RELEASE = _LUA_RELEASE_FN + "return release(ARGV[1])"
+
+# ARGV: tenant, job id, priority, queue, payload — give the slot back and put
+# the job at the head of its priority level (a send that failed)
+_LUA_REQUEUE = _LUA_RELEASE_FN + """
+local t, id, q = ARGV[1], ARGV[2], ARGV[4]
+release(id)
+local vclock = tonumber(redis.call('GET', 'sched:vclock:' .. q) or '0')
+redis.call('SADD', 'sched:queues', q)
+redis.call('ZADD', 'sched:tenants:' .. q, 'NX', vclock, t)
+redis.call('ZADD', 'sched:pending:' .. t .. ':' .. q, tonumber(ARGV[3]) * 1e12, id)
+redis.call('HSET', 'sched:jobs', id, ARGV[5])
+return 1
+"""
+
+
+@dataclass
+class CrawlJob:
+    """One crawl waiting for admission; `id` becomes the Celery task id (= crawl_id)."""
+    id: str
+    task: str
+    kwargs: Dict = field(default_factory=dict)
+    priority: str = "normal"
+    tenant: str = ""
+    queue: str = ""         # filled in from task_routes on submit
+    lease: int = 0          # seconds; filled in from the task's limits on submit
+
+
+def tenant_of(user_id: Optional[int]) -> str:
+    return str(user_id) if user_id is not None else "anonymous"
+
+
+class CrawlScheduler:
+    """Redis-backed admission control in front of celery_app.send_task."""
+
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self._redis = None
+        self._scripts = {}
+
+    def _client(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                decode_responses=True,
+            )
+            self._scripts = {
+                "enqueue": self._redis.register_script(_LUA_ENQUEUE),
+                "dispatch": self._redis.register_script(_LUA_DISPATCH),
+                "release": self._redis.register_script(_LUA_RELEASE),
+                "requeue": self._redis.register_script(_LUA_REQUEUE),
+            }
+        return self._redis
+
+    @staticmethod
+    def _celery():
+        from web_crawler.celery_config import celery_app
+        return celery_app
+
+    def _lease_for(self, task_name: str) -> int:
+        """Longest the task can legitimately hold a slot: every attempt at its hard limit."""
+        app = self._celery()
+        task = app.tasks.get(task_name)
+        time_limit = getattr(task, "time_limit", None) or app.conf.task_time_limit
+        if not time_limit:
+            return LEASE_SECONDS
+        retries = max(getattr(task, "max_retries", 0) or 0, 0)
+        backoff = sum(2 ** i for i in range(retries))   # _run_crawl retry countdowns
+        return int(time_limit * (retries + 1) + backoff + LEASE_MARGIN)
+
+    def _queue_for(self, task_name: str) -> str:
+        """The queue task_routes sends `task_name` to."""
+        conf = self._celery().conf
+        route = (conf.task_routes or {}).get(task_name) or {}
+        return route.get("queue") or conf.task_default_queue
+
+    def _send(self, job: CrawlJob) -> None:
+        self._celery().send_task(
+            job.task,
+            kwargs=job.kwargs,
+            task_id=job.id,
+            priority=PRIORITIES.get(job.priority, PRIORITIES["normal"]),
+        )
+
+    # ── Submission ───────────────────────────────────────────────────────────
+
+    def submit(self, tenant: str, jobs: List[CrawlJob]) -> int:
+        """Queue `jobs` for `tenant` and release whatever can run now. Returns jobs dispatched."""
+        if not jobs:
+            return 0
+        if not self.enabled:
+            from celery import group
+            group(
+                self._celery().signature(job.task, kwargs=job.kwargs).set(
+                    task_id=job.id, priority=PRIORITIES.get(job.priority, PRIORITIES["normal"])
+                )
+                for job in jobs
+            ).apply_async()
+            return len(jobs)
+
+        self._client()
+        leases: Dict[str, int] = {}
+        args = [tenant, len(jobs)]
+        for job in jobs:
+            job.tenant = tenant
+            job.queue = job.queue or self._queue_for(job.task)
+            if not job.lease:
+                job.lease = leases.setdefault(job.task, self._lease_for(job.task))
+            args += [
+                job.id, PRIORITIES.get(job.priority, PRIORITIES["normal"]), job.queue, json.dumps(asdict(job)),
+            ]
+        self._scripts["enqueue"](args=args)
+        return self.pump()
+
+    # ── Dispatch ─────────────────────────────────────────────────────────────
+
+    def capacity(self, queue: str) -> int:
+        """Concurrent crawls `queue` admits: live worker children consuming it."""
+        if CAPACITY > 0:
+            return CAPACITY
+        try:
+            key = _HEARTBEAT_KEY.format(queue=queue)
+            ready = self._client().zcount(key, time.time() - _READY_TTL, "+inf")
+        except Exception:
+            ready = 0
+        return ready or DEFAULT_CAPACITY
+
+    def _queues(self) -> List[str]:
+        return sorted(self._client().smembers("sched:queues"))
+
+    def pump(self) -> int:
+        """Release admitted jobs to Celery until capacity, quotas or the queues run out."""
+        if not self.enabled:
+            return 0
+        self._client()
+        capacities = {queue: self.capacity(queue) for queue in self._queues()}
+        if not capacities:
+            return 0
+        args = [time.time(), TENANT_QUOTA, LEASE_SECONDS]
+        for queue, capacity in capacities.items():
+            args += [queue, capacity]
+        dispatched = 0
+        for _ in range(_MAX_DISPATCH):
+            args[0] = time.time()
+            payload = self._scripts["dispatch"](args=args)
+            if not payload:
+                break
+            job = CrawlJob(**json.loads(payload)) if payload != "{}" else None
+            if job is None:
+                continue
+            try:
+                self._send(job)
+                dispatched += 1
+            except Exception as e:
+                # Broker unreachable: the job goes back to the head of its tenant's
+                # queue and the next pump (timer, submission, completion) retries it
+                logger.error(f"Scheduler could not send {job.task} {job.id}, re-queued: {e}")
+                self._requeue(job)
+                break
+        if dispatched:
+            logger.info(f"Scheduler dispatched {dispatched} crawl(s) (capacity {capacities})")
+        return dispatched
+
+    def _requeue(self, job: CrawlJob) -> None:
+        try:
+            self._scripts["requeue"](args=[
+                job.tenant or "anonymous", job.id, PRIORITIES.get(job.priority, PRIORITIES["normal"]),
+                job.queue or self._queue_for(job.task), json.dumps(asdict(job)),
+            ])
+        except Exception as e:
+            logger.error(f"Scheduler could not re-queue {job.id}; its lease will free the slot: {e}")
+
+    def release(self, task_id: str) -> bool:
+        """Free the slot held by `task_id` (no-op for tasks the scheduler did not admit)."""
+        try:
+            self._client()
+            return bool(self._scripts["release"](args=[task_id]))
+        except Exception as e:
+            logger.warning(f"Scheduler release failed for {task_id}: {e}")
+            return False
+
+    def stats(self) -> Dict:
+        client = self._client()
+        queues: Dict[str, Dict] = {}
+        pending_by_tenant: Dict[str, int] = {}
+        for queue in self._queues():
+            tenants = client.zrange(f"sched:tenants:{queue}", 0, -1)
+            pipe = client.pipeline()
+            for tenant in tenants:
+                pipe.zcard(f"sched:pending:{tenant}:{queue}")
+            pending = pipe.execute()
+            for tenant, n in zip(tenants, pending):
+                pending_by_tenant[tenant] = pending_by_tenant.get(tenant, 0) + n
+            queues[queue] = {
+                "capacity": self.capacity(queue),
+                "in_flight": int(client.get(f"sched:used:{queue}") or 0),
+                "pending": sum(pending),
+            }
+        return {
+            "capacity": sum(q["capacity"] for q in queues.values()),
+            "in_flight": sum(q["in_flight"] for q in queues.values()),
+            "queues": queues,
+            "running_by_tenant": {k: int(v) for k, v in client.hgetall("sched:tenant_running").items()},
+            "pending_by_tenant": pending_by_tenant,
+        }
+
+
+scheduler = CrawlScheduler()
+
+
+# ── Worker hooks ─────────────────────────────────────────────────────────────
+
+def _release_and_pump(task_id: Optional[str]) -> None:
+    if not scheduler.enabled or not task_id:
+        return
+    if scheduler.release(task_id):
+        try:
+            scheduler.pump()
+        except Exception as e:
+            logger.warning(f"Scheduler pump after {task_id} failed: {e}")
+
+
+def _mark_failed(request, error: str) -> None:
+    # The task body never reached its own finish("failed") / batch count
+    task_id = getattr(request, "id", None)
+    if not task_id:
+        return
+    from web_crawler.progress import mark_failed
+    mark_failed(task_id, error)
+    kwargs = getattr(request, "kwargs", None) or {}
+    if kwargs.get("batch_id"):
+        from web_crawler.celery_tasks import record_batch_result
+        url = kwargs.get("start_url") or kwargs.get("url") or ""
+        record_batch_result(kwargs["batch_id"], task_id, url, "failed")
+
+
+class ScheduledRequest(Request):
+    """
+    Request class of the crawl tasks. Runs in the worker's main process, so
+    it sees the ends task_postrun never reports: a child killed at the hard
+    time limit, or lost to OOM / SIGKILL. Those crawls give back their slot,
+    their progress hash turns "failed" and they count as failed in their batch.
+    """
+
+    def on_timeout(self, soft, timeout):
+        super().on_timeout(soft, timeout)
+        if not soft:
+            _mark_failed(self, f"Hard time limit ({timeout}s) exceeded")
+            _release_and_pump(self.id)
+
+    def on_failure(self, exc_info, send_failed_event=True, return_ok=False):
+        super().on_failure(exc_info, send_failed_event=send_failed_event, return_ok=return_ok)
+        # A lost worker's message is re-queued under acks_late + reject_on_worker_lost;
+        # the re-run keeps the slot and frees it when it finishes
+        requeued = (
+            isinstance(exc_info.exception, WorkerLostError)
+            and self.task.acks_late
+            and self.task.reject_on_worker_lost
+        )
+        if not requeued:
+            _mark_failed(self, f"{type(exc_info.exception).__name__}: {exc_info.exception}")
+            _release_and_pump(self.id)
+
+
+@task_postrun.connect
+def _release_slot(task_id=None, state=None, **kwargs) -> None:
+    # A RETRY is re-queued by Celery directly and keeps its slot until it finishes
+    if state != "RETRY":
+        _release_and_pump(task_id)
+
+
+@task_revoked.connect
+def _release_revoked(request=None, **kwargs) -> None:
+    _mark_failed(request, "Revoked")
+    _release_and_pump(getattr(request, "id", None))
+
+
+_pump_stop = threading.Event()
+
+
+def _pump_forever() -> None:
+    # Reaps expired leases and retries re-queued sends when nothing else pumps
+    while not _pump_stop.wait(PUMP_INTERVAL):
+        try:
+            scheduler.pump()
+        except Exception as e:
+            logger.warning(f"Scheduler timer pump failed: {e}")
+
+
+@worker_ready.connect
+def _start_pump_timer(**kwargs) -> None:
+    if scheduler.enabled and PUMP_INTERVAL > 0:
+        _pump_stop.clear()
+        threading.Thread(target=_pump_forever, name="scheduler-pump", daemon=True).start()
+
+
+@worker_shutdown.connect
+def _stop_pump_timer(**kwargs) -> None:
+    _pump_stop.set()
@@ -0,0 +1,123 @@
+"""
+Screenshot capture with configurable format, clipping and off-thread encoding.
+
+Capture happens on the browser thread and is kept as short as possible:
+  - the page is settled with two animation frames (plus fonts) instead of
+    a fixed sleep
+  - full-page shots are clipped to screenshot_max_height
+  - PNG/JPEG are encoded by the browser; WebP is captured as PNG and
+    transcoded by Pillow
+
+Writing the file, WebP transcoding and thumbnailing run on a small shared
+executor, so the browser thread can move on to markdown / link extraction
+while the image is encoded. capture() returns a PendingScreenshot whose
+result() blocks until the file is on disk.
+"""
+
+import io
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+from playwright.sync_api import Page
+
+from web_crawler.config import CrawlConfig
+
+logger = logging.getLogger(__name__)
+
+_encoder = ThreadPoolExecutor(max_workers=2, thread_name_prefix="screenshot-encode")
+
+_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+_SETTLE_JS = """
+async () => {
+    window.scrollTo(0, 0);
+    if (document.fonts && document.fonts.ready) {
+        await Promise.race([document.fonts.ready, new Promise(r => setTimeout(r, 500))]);
+    }
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+}
+"""
+
+
+def settle_page(page: Page) -> None:
+    """Scroll to top and wait until layout / fonts have painted."""
+    try:
+        page.evaluate(_SETTLE_JS)
+    except Exception as e:
+        logger.debug(f"Screenshot settle failed: {e}")
+
+
+class PendingScreenshot:
+    """Handle for a screenshot whose file is still being written."""
+
+    def __init__(self, path: str, future: Future):
+        self.path = path
+        self._future = future
+
+    def result(self) -> Optional[str]:
+        """Path of the written screenshot, or None if encoding failed."""
+        try:
+            self._future.result()
+            return self.path
+        except Exception as e:
+            logger.error(f"Failed to write screenshot {self.path}: {e}")
+            return None
+
+
+def _write(path: Path, data: bytes, fmt: str, quality: int, thumb_width: int) -> None:
+    image = None
+    if fmt == "webp":
+        image = Image.open(io.BytesIO(data))
+        image.save(path, "WEBP", quality=quality, method=4)
+    else:
+        path.write_bytes(data)
+
+    if thumb_width:
+        image = image or Image.open(io.BytesIO(data))
+        if image.width > thumb_width:
+            height = max(1, round(image.height * thumb_width / image.width))
+            thumb = image.convert("RGB").resize((thumb_width, height), Image.LANCZOS)
+        else:
+            thumb = image.convert("RGB")
+        thumb.save(path.with_name(f"{path.stem}_thumb.jpg"), "JPEG", quality=quality)
+
+
+def screenshot_path(config: CrawlConfig, stem: str) -> Path:
+    return config.screenshot_dir / f"{stem}{_EXTENSIONS[config.screenshot_format]}"
+
+
+def capture(page: Page, config: CrawlConfig, stem: str) -> PendingScreenshot:
+    """
+    Take a screenshot of `page` according to the config's screenshot_* options
+    and hand encoding / writing off to the encoder pool.
+    """
+    fmt = config.screenshot_format
+    path = screenshot_path(config, stem)
+
+    settle_page(page)
+
+    options = {
+        "full_page": config.screenshot_full_page,
+        "type": "jpeg" if fmt == "jpeg" else "png",
+        "animations": "disabled",
+        "caret": "hide",
+    }
+    if fmt == "jpeg":
+        options["quality"] = config.screenshot_quality
+
+    if config.screenshot_full_page and config.screenshot_max_height:
+        height = page.evaluate(
+            "() => Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0)"
+        )
+        if height and height > config.screenshot_max_height:
+            width = page.evaluate("() => document.documentElement.clientWidth") or 1920
+            options["clip"] = {"x": 0, "y": 0, "width": width, "height": config.screenshot_max_height}
+
+    data = page.screenshot(**options)
+    future = _encoder.submit(
+        _write, path, data, fmt, config.screenshot_quality, config.screenshot_thumbnail_width
+    )
+    return PendingScreenshot(str(path), future)
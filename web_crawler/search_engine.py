@@ -1,11 +1,32 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
 import httpx
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from ddgs import DDGS
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Router mode: "parallel" (first good result set wins), "merge" (wait for all
+# backends within the budget and merge by priority) or "fallback" (legacy
+# sequential proprietary → SearXNG → DuckDuckGo chain).
+SEARCH_ROUTER_MODE = os.getenv("SEARCH_ROUTER_MODE", "parallel").strip().lower()
+SEARCH_LATENCY_BUDGET = float(os.getenv("SEARCH_LATENCY_BUDGET_MS", "3000")) / 1000
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+
+# Blocking backends (ddgs) run here rather than on the event loop's default
+# executor: asyncio.run() joins the default executor on exit, which would make
+# every search wait for the slowest blocking backend. Threads of abandoned
+# lookups finish in the background.
+_BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-backend")
+
 def proprietary_search(query: str, limit: int) -> List[Dict[str, str]]:
     url = os.getenv("FIRE_ENGINE_BETA_URL")
     if not url:
@@ -67,31 +88,220 @@ def ddg_search(query: str, limit: int) -> List[Dict[str, str]]:
         logger.warning(f"DuckDuckGo engine failed: {e}")
     return []
 
-def execute_search_router(query: str, limit: int) -> List[Dict[str, str]]:
+async def _proprietary_search_async(client: httpx.AsyncClient, query: str, limit: int) -> List[Dict[str, str]]:
+    url = os.getenv("FIRE_ENGINE_BETA_URL")
+    try:
+        response = await client.post(f"{url}/search", json={"query": query, "limit": limit})
+        if response.status_code == 200:
+            return response.json().get("results", [])
+    except Exception as e:
+        logger.warning(f"Proprietary engine failed: {e}")
+    return []
+
+async def _searxng_search_async(client: httpx.AsyncClient, query: str, limit: int) -> List[Dict[str, str]]:
+    url = os.getenv("SEARXNG_ENDPOINT")
+    try:
+        response = await client.get(url, params={"q": query, "format": "json"})
+        if response.status_code == 200:
+            return [
+                {
+                    "url": r.get("url"),
+                    "title": r.get("title"),
+                    "description": r.get("content", "")
+                }
+                for r in response.json().get("results", [])[:limit]
+            ]
+    except Exception as e:
+        logger.warning(f"SearXNG engine failed: {e}")
+    return []
+
+async def _fan_out_search(query: str, limit: int, budget: float, merge: bool) -> List[Dict[str, str]]:
+    """
+    Query every configured backend concurrently.
+    - merge=False: return the first non-empty result set to arrive
+    - merge=True:  wait for all backends (within budget) and merge them in
+                   priority order (proprietary → SearXNG → DuckDuckGo)
+    Backends still running when the budget expires are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    priority = ["proprietary", "searxng", "duckduckgo"]
+    collected: Dict[str, List[Dict[str, str]]] = {}
+
+    async with httpx.AsyncClient(timeout=budget) as client:
+        tasks: Dict[asyncio.Task, str] = {}
+        if os.getenv("FIRE_ENGINE_BETA_URL"):
+            tasks[asyncio.create_task(_proprietary_search_async(client, query, limit))] = "proprietary"
+        if os.getenv("SEARXNG_ENDPOINT"):
+            tasks[asyncio.create_task(_searxng_search_async(client, query, limit))] = "searxng"
+        # ddgs is a blocking client — run it on the module executor, which
+        # nobody waits for once the winner (or the budget) is in
+        ddg_future = loop.run_in_executor(_BLOCKING_EXECUTOR, ddg_search, query, limit)
+        tasks[asyncio.ensure_future(ddg_future)] = "duckduckgo"
+
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.warning(f"Search latency budget ({budget:.1f}s) exhausted for '{query}'")
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = tasks[task]
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        logger.warning(f"{name} engine failed: {e}")
+                        results = []
+                    collected[name] = results
+                    if results and not merge:
+                        logger.info(f"🔍 Search answered by {name} ({len(results)} results)")
+                        return results
+        finally:
+            for task in pending:
+                task.cancel()
+
+    merged: List[Dict[str, str]] = []
+    for name in priority:
+        merged.extend(collected.get(name, []))
+    return merged
+
+def _run_coroutine(coro):
+    """Run a coroutine from sync code, even when called from inside an event loop thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class _SearchCache:
+    """
+    Two-tier query → results cache:
+      1. In-process LRU with per-entry TTL
+      2. Redis (shared by API + workers), best-effort — failures are ignored
     """
-    Implements a fallback router for search engines.
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                decode_responses=True,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._redis
+
+    @staticmethod
+    def key(query: str, limit: int) -> str:
+        digest = hashlib.sha1(f"{query.strip().lower()}|{limit}".encode("utf-8")).hexdigest()
+        return f"search:{digest}"
+
+    def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires, results = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return results
+                del self._entries[key]
+
+        try:
+            raw = self._redis_client().get(key)
+        except Exception as e:
+            logger.debug(f"Search cache Redis read failed: {e}")
+            return None
+        if not raw:
+            return None
+        results = json.loads(raw)
+        self._store_local(key, results)
+        return results
+
+    def set(self, key: str, results: List[Dict[str, str]]) -> None:
+        if self.ttl <= 0:
+            return
+        self._store_local(key, results)
+        try:
+            self._redis_client().setex(key, self.ttl, json.dumps(results))
+        except Exception as e:
+            logger.debug(f"Search cache Redis write failed: {e}")
+
+    def _store_local(self, key: str, results: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+_search_cache = _SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+def _fallback_search(query: str, search_limit: int) -> List[Dict[str, str]]:
+    """
+    Legacy sequential router:
     1. Proprietary Search Engine
     2. SearXNG
     3. DuckDuckGo Fallback
     """
-    # Double the limit to allow for deduplication / filtering
-    search_limit = 10
-    
     # 1. First Priority: Proprietary Search Engine
     if os.getenv("FIRE_ENGINE_BETA_URL"):
         results = proprietary_search(query, search_limit)
         if results:
-            return filter_and_deduplicate(results, limit)
-            
+            return results
+
     # 2. Second Priority: SearXNG
     if os.getenv("SEARXNG_ENDPOINT"):
         results = searxng_search(query, search_limit)
         if results:
-            return filter_and_deduplicate(results, limit)
-            
+            return results
+
     # 3. Fallback: DuckDuckGo
-    results = ddg_search(query, search_limit)
-    return filter_and_deduplicate(results, limit)
+    return ddg_search(query, search_limit)
+
+def execute_search_router(query: str, limit: int) -> List[Dict[str, str]]:
+    """
+    Route a search query across the configured engines.
+
+    Results are served from the query cache when possible. On a miss the
+    backends are queried according to SEARCH_ROUTER_MODE ("parallel" by
+    default) within SEARCH_LATENCY_BUDGET_MS.
+    """
+    cache_key = _search_cache.key(query, limit)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"🔍 Search cache hit for '{query}'")
+        return cached
+
+    # Double the limit to allow for deduplication / filtering
+    search_limit = limit * 2
+
+    if SEARCH_ROUTER_MODE == "fallback":
+        results = _fallback_search(query, search_limit)
+    else:
+        results = _run_coroutine(
+            _fan_out_search(query, search_limit, SEARCH_LATENCY_BUDGET, merge=SEARCH_ROUTER_MODE == "merge")
+        )
+
+    results = filter_and_deduplicate(results, limit)
+    if results:
+        _search_cache.set(cache_key, results)
+    return results
 
 def filter_and_deduplicate(results: List[Dict[str, str]], limit: int) -> List[Dict[str, str]]:
     seen_urls = set()
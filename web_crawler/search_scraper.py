@@ -0,0 +1,129 @@
+"""
+Search-then-scrape — fetch the top-N search result pages concurrently.
+
+Given a result list from execute_search_router, every result page is
+crawled in parallel (bounded by config.max_workers) through the normal
+PageCrawler pipeline (Chromium → Camoufox fallback, proxy escalation)
+and converted to markdown. The per-result markdown is returned alongside
+the search metadata so callers can build one combined LLM-ready document
+instead of issuing N serial `single` crawls.
+
+Without a crawl config (POST /search, via the page_queue task) the pages
+are written to a temporary directory that is removed once their markdown
+has been read back.
+"""
+
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from web_crawler.config import CrawlConfig
+from web_crawler.file_manager import FileManager
+from web_crawler.page_crawler import PageCrawler
+
+logger = logging.getLogger(__name__)
+
+MAX_SCRAPE_RESULTS = 10
+
+
+def _default_config(output_dir: str) -> CrawlConfig:
+    """Standalone config for API-initiated scrapes (no crawl directory yet)."""
+    config = CrawlConfig(max_workers=4, headless=True, use_stealth=True, output_dir=output_dir)
+    config.md_dir.mkdir(parents=True, exist_ok=True)
+    return config
+
+
+def _scrape_one(page_crawler: PageCrawler, position: int, result: Dict, proxy_type: str) -> Dict:
+    url = result.get("url")
+    scraped = {
+        "position": position,
+        "url": url,
+        "title": result.get("title"),
+        "description": result.get("description"),
+        "markdown": None,
+        "markdown_file": None,
+        "error": None,
+    }
+    try:
+        page = page_crawler.crawl_page(
+            url,
+            position,
+            enable_md=True,
+            enable_html=False,
+            enable_ss=False,
+            enable_seo=False,
+            client_id=None,
+            websocket_manager=None,
+            crawl_mode="search",
+            proxy_type=proxy_type,
+        )
+        if not page or "error" in page:
+            scraped["error"] = page.get("error") if page else "Unknown error"
+            return scraped
+
+        md_file = page.get("markdown_file")
+        scraped["markdown_file"] = md_file
+        if md_file:
+            scraped["markdown"] = Path(md_file).read_text(encoding="utf-8")
+    except Exception as e:
+        scraped["error"] = str(e)
+    return scraped
+
+
+def scrape_search_results(
+    results: List[Dict],
+    top_n: int,
+    config: Optional[CrawlConfig] = None,
+    proxy_type: str = "auto",
+) -> List[Dict]:
+    """
+    Crawl the first `top_n` result URLs concurrently and return, in result
+    order, one dict per page with its markdown (or the error that stopped it).
+
+    Without `config` the pages go to a temporary directory that is deleted
+    before returning, so `markdown_file` is None and only `markdown` is kept.
+    """
+    targets = [r for r in results if r.get("url")][: min(top_n, MAX_SCRAPE_RESULTS)]
+    if not targets:
+        return []
+
+    if config is None:
+        with tempfile.TemporaryDirectory(prefix="search_") as tmp:
+            scraped = _scrape_all(targets, _default_config(tmp), proxy_type)
+        for s in scraped:
+            s["markdown_file"] = None
+        return scraped
+    return _scrape_all(targets, config, proxy_type)
+
+
+def _scrape_all(targets: List[Dict], config: CrawlConfig, proxy_type: str) -> List[Dict]:
+    page_crawler = PageCrawler(config, FileManager())
+    workers = max(1, min(config.max_workers, len(targets)))
+
+    logger.info(f"🔎 Scraping top {len(targets)} search results with {workers} worker(s)")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_scrape_one, page_crawler, position, result, proxy_type)
+            for position, result in enumerate(targets, 1)
+        ]
+        scraped = [f.result() for f in futures]
+
+    ok = sum(1 for s in scraped if s["markdown"])
+    logger.info(f"🔎 Scraped {ok}/{len(scraped)} search result pages")
+    return scraped
+
+
+def format_scraped_results_markdown(query: str, scraped: List[Dict]) -> str:
+    """Combine per-result markdown into one document, one section per result."""
+    lines = [f"# Search Results: {query}\n"]
+    for s in scraped:
+        title = s.get("title") or "Untitled"
+        lines.append(f"## {s['position']}. [{title}]({s.get('url', '')})\n")
+        if s.get("markdown"):
+            lines.append(s["markdown"].strip() + "\n")
+        elif s.get("description"):
+            lines.append(f"{s['description']}\n")
+        lines.append("---\n")
+    return "\n".join(lines)
@@ -0,0 +1,223 @@
+"""
+Structured data extraction — JSON-LD, microdata, RDFa and OpenGraph/Twitter.
+
+One pre-order walk over the rendered DOM collects (StructuredDataCollector
+rides along the markdown cleanup walk when markdown is produced too):
+
+  - JSON-LD        → <script type="application/ld+json"> (with @graph flattened)
+  - Microdata      → itemscope / itemtype / itemprop trees
+  - RDFa (Lite)    → vocab / typeof / property trees
+  - OpenGraph etc. → <meta property="og:*|article:*|product:*"> and
+                     <meta name="twitter:*">
+
+Per page the result is written as compact JSON to structured/{prefix}.json
+and appended as one line to the crawl-level structured.jsonl, so
+catalog jobs can consume it without re-crawling.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Tag
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+_MAX_JSONLD_CHARS = 1_000_000   # skip absurd JSON-LD blobs
+_MAX_TEXT_VALUE = 1_000         # cap for text-derived property values
+_OG_PREFIXES = ("og:", "article:", "product:", "book:", "profile:", "music:", "video:")
+
+# Property value comes from an attribute for these tags (microdata spec §5.4)
+_URL_VALUE_ATTRS = {
+    "a": "href", "area": "href", "link": "href",
+    "img": "src", "audio": "src", "video": "src", "source": "src",
+    "iframe": "src", "embed": "src", "track": "src",
+    "object": "data",
+}
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def _property_value(tag: Tag, base_url: str) -> str:
+    if tag.has_attr("content"):
+        return tag["content"]
+    attr = _URL_VALUE_ATTRS.get(tag.name)
+    if attr and tag.has_attr(attr):
+        return urljoin(base_url, tag[attr])
+    if tag.name in ("time", "data", "meter") and (tag.get("datetime") or tag.get("value")):
+        return tag.get("datetime") or tag.get("value")
+    return tag.get_text(" ", strip=True)[:_MAX_TEXT_VALUE]
+
+
+def _add_property(item: Dict, names: str, value) -> None:
+    props = item["properties"]
+    for name in names.split():
+        # RDFa CURIEs ("schema:name") → local name
+        name = name.rsplit(":", 1)[-1] if "://" not in name else name
+        existing = props.get(name)
+        if existing is None:
+            props[name] = value
+        elif isinstance(existing, list):
+            existing.append(value)
+        else:
+            props[name] = [existing, value]
+
+
+def _new_item(type_value: Optional[str], tag: Tag, vocab: Optional[str] = None) -> Dict:
+    item: Dict = {"type": (type_value or "").split() or None, "properties": {}}
+    if vocab:
+        item["vocab"] = vocab
+    item_id = tag.get("itemid") or tag.get("resource") or tag.get("about")
+    if item_id:
+        item["id"] = item_id
+    return item
+
+
+def _parse_jsonld(text: Optional[str]) -> List:
+    if not text or len(text) > _MAX_JSONLD_CHARS:
+        return []
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    items = data if isinstance(data, list) else [data]
+    flat = []
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("@graph"), list):
+            context = item.get("@context")
+            for node in item["@graph"]:
+                if isinstance(node, dict) and context and "@context" not in node:
+                    node = {"@context": context, **node}
+                flat.append(node)
+        elif item:
+            flat.append(item)
+    return flat
+
+
+# ── Extraction ───────────────────────────────────────────────────────────────
+
+# Walk context: (enclosing microdata item, enclosing RDFa item, RDFa vocab)
+ROOT_CONTEXT = (None, None, None)
+
+
+class StructuredDataCollector:
+    """
+    Accumulates structured data while a DOM walk visits elements in
+    document order. The walk is the caller's: extract_structured_data runs
+    its own, cleanup_html._clean_tree feeds its cleanup pass through here.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.json_ld: List = []
+        self.microdata: List[Dict] = []
+        self.rdfa: List[Dict] = []
+        self.opengraph: Dict[str, object] = {}
+        self.twitter: Dict[str, str] = {}
+
+    def visit(self, node: Tag, context: tuple) -> tuple:
+        """Record one element; returns the context for its children."""
+        md_item, rdfa_item, vocab = context
+        name = node.name
+        attrs = node.attrs
+
+        if name == "script":
+            if (attrs.get("type") or "").lower() == "application/ld+json":
+                self.json_ld.extend(_parse_jsonld(node.string))
+            return context
+        if name == "style":
+            return context
+
+        if name == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").strip().lower()
+            content = attrs.get("content")
+            if content is not None:
+                if key.startswith(_OG_PREFIXES):
+                    _merge_meta(self.opengraph, key, content)
+                elif key.startswith("twitter:"):
+                    self.twitter.setdefault(key, content)
+
+        # ── Microdata ──
+        if "itemscope" in attrs:
+            new = _new_item(attrs.get("itemtype"), node)
+            if "itemprop" in attrs and md_item is not None:
+                _add_property(md_item, attrs["itemprop"], new)
+            else:
+                self.microdata.append(new)
+            md_item = new
+        elif "itemprop" in attrs and md_item is not None:
+            _add_property(md_item, attrs["itemprop"], _property_value(node, self.url))
+
+        # ── RDFa Lite ──
+        vocab = attrs.get("vocab") or vocab
+        if "typeof" in attrs:
+            new = _new_item(attrs.get("typeof"), node, vocab)
+            if "property" in attrs and rdfa_item is not None:
+                _add_property(rdfa_item, attrs["property"], new)
+            else:
+                self.rdfa.append(new)
+            rdfa_item = new
+        elif "property" in attrs and rdfa_item is not None:
+            _add_property(rdfa_item, attrs["property"], _property_value(node, self.url))
+
+        return md_item, rdfa_item, vocab
+
+    def visit_subtree(self, node: Tag, context: tuple) -> None:
+        """Record `node` and everything below it, in document order."""
+        stack = [(node, context)]
+        while stack:
+            node, context = stack.pop()
+            if node.name in ("script", "style"):
+                self.visit(node, context)
+                continue
+            context = self.visit(node, context)
+            for child in reversed(node.contents):
+                if isinstance(child, Tag):
+                    stack.append((child, context))
+
+    def result(self) -> Dict:
+        """Everything collected so far; empty sections are omitted."""
+        result: Dict = {"url": self.url}
+        for key, value in (
+            ("json_ld", self.json_ld),
+            ("microdata", self.microdata),
+            ("rdfa", self.rdfa),
+            ("opengraph", self.opengraph),
+            ("twitter", self.twitter),
+        ):
+            if value:
+                result[key] = value
+        return result
+
+
+def extract_structured_data(soup: BeautifulSoup, url: str) -> Dict:
+    """
+    Extract every structured-data flavour from `soup` in one DOM walk.
+    Empty sections are omitted from the result.
+    """
+    collector = StructuredDataCollector(url)
+    for child in soup.contents:
+        if isinstance(child, Tag):
+            collector.visit_subtree(child, ROOT_CONTEXT)
+    return collector.result()
+
+
+def _merge_meta(target: Dict, key: str, value: str) -> None:
+    """Repeated OG tags (og:image …) become lists."""
+    existing = target.get(key)
+    if existing is None:
+        target[key] = value
+    elif isinstance(existing, list):
+        existing.append(value)
+    elif existing != value:
+        target[key] = [existing, value]
+
+
+def has_structured_data(data: Dict) -> bool:
+    return any(k in data for k in ("json_ld", "microdata", "rdfa", "opengraph", "twitter"))
+
+
+def dumps(data: Dict) -> str:
+    """Compact JSON used for both the per-page file and the JSONL line."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
@@ -0,0 +1,257 @@
+"""
+URL canonicalization and crawler-trap detection.
+
+Single source of truth for turning a raw href into the key used for
+dedup and frontier bookkeeping. Every caller (utils.normalize_url,
+map_crawler._clean_url, ContentProcessor.extract_links) goes through
+canonicalize_url and only differs in the policy flags it passes.
+
+Canonical form:
+  - scheme + host lower-cased, trailing host dot and default ports removed
+  - userinfo and fragment dropped
+  - percent-encoding normalised (unreserved chars decoded, hex upper-cased,
+    unsafe chars encoded) in path and query
+  - dot segments resolved, duplicate slashes collapsed, trailing slash removed
+  - query: tracking params removed, remaining "k=v" pairs sorted by key and
+    otherwise kept as written ("flag" stays valueless, "+" stays "+")
+  - optional: drop query entirely, strip "www.", strip ".html", lower-case path
+
+is_crawler_trap flags URLs that would otherwise burn the page budget:
+calendar pages dated far from today, runaway pagination, repeating path
+segments and absurdly deep or long URLs.
+"""
+
+import re
+from datetime import date
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote_plus, urlsplit, urlunsplit
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRACKING_PARAMS = frozenset({
+    "gclid", "gclsrc", "dclid", "gbraid", "wbraid", "fbclid", "msclkid",
+    "yclid", "twclid", "ttclid", "li_fat_id", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "__hssc", "__hstc", "__hsfp", "hsctatracking",
+    "mkt_tok", "oly_anon_id", "oly_enc_id", "vero_id", "wickedid", "rb_clickid",
+    "s_cid", "ref_src", "ref_url", "spm", "scm",
+    "sessionid", "session_id", "phpsessid", "jsessionid", "sid", "cfid", "cftoken",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "matomo_")
+
+_PERCENT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PATH_SAFE = "/%:@!$&'()*+,;="
+_QUERY_SAFE = _PATH_SAFE + "?"
+_MULTI_SLASH_RE = re.compile(r"/{2,}")
+
+# Trap heuristics
+MAX_URL_LENGTH = 2_000
+MAX_PATH_DEPTH = 12
+MAX_SEGMENT_REPEATS = 3
+MAX_PAGINATION = 50
+MAX_OFFSET = 5_000
+CALENDAR_WINDOW_MONTHS = 12     # calendar pages this close to today are real listings
+
+# "p" is not here: WordPress uses it for post ids (/?p=1234)
+_PAGINATION_KEYS = frozenset({"page", "pg", "paged", "pagenum", "page_no", "pageno"})
+_OFFSET_KEYS = frozenset({"offset", "start", "from", "skip"})
+_CALENDAR_SEGMENT_RE = re.compile(r"^(?:calendar|cal|events?|agenda|schedule|ical)$", re.IGNORECASE)
+# year / month / day alone are ordinary filters (/cars?year=2020, /archive?month=5)
+_CALENDAR_KEYS = frozenset({"date", "cal", "calendar", "tribe-bar-date", "ical"})
+_DATE_RE = re.compile(r"(?<!\d)((?:19|20|21)\d{2})(?:[-/](0?[1-9]|1[0-2]))(?:[-/](0?[1-9]|[12]\d|3[01]))?(?!\d)")
+_PAGE_PATH_RE = re.compile(r"/page/(\d+)(?:/|$)", re.IGNORECASE)
+
+
+# ── Canonicalization ─────────────────────────────────────────────────────────
+
+def _normalize_percent_encoding(component: str, safe: str) -> str:
+    def _fix(m: "re.Match[str]") -> str:
+        char = chr(int(m.group(1), 16))
+        return char if char in _UNRESERVED else f"%{m.group(1).upper()}"
+
+    return quote(_PERCENT_RE.sub(_fix, component), safe=safe)
+
+
+def _remove_dot_segments(path: str) -> str:
+    """RFC 3986 §5.2.4, simplified for absolute paths."""
+    if "." not in path:
+        return path
+    output = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    result = "/".join(output)
+    if path.endswith(("/.", "/..")):
+        result += "/"
+    return result if result.startswith("/") else "/" + result
+
+
+def is_tracking_param(key: str) -> bool:
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(
+    url: str,
+    keep_query: bool = True,
+    strip_www: bool = False,
+    strip_html_ext: bool = False,
+    lowercase_path: bool = False,
+) -> str:
+    """
+    Return the canonical form of `url` (see module docstring).
+    Returns "" for empty input; non-http(s) URLs are returned stripped but
+    otherwise untouched.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+
+    host = (parts.hostname or "").rstrip(".")
+    if strip_www and host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    # urlsplit().hostname drops the brackets of IPv6 literals
+    netloc = f"[{host}]" if ":" in host else host
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = _MULTI_SLASH_RE.sub("/", parts.path or "/")
+    path = _remove_dot_segments(path)
+    path = _normalize_percent_encoding(path, _PATH_SAFE)
+    if strip_html_ext and path.endswith(".html"):
+        path = path[:-5]
+    if path != "/" and path.endswith("/"):
+        path = path.rstrip("/")
+    if not path:
+        path = "/"
+    if lowercase_path:
+        path = path.lower()
+
+    query = ""
+    if keep_query and parts.query:
+        # Raw pairs, not parse_qsl/urlencode: re-encoding turns "flag" into
+        # "flag=" and "+" into "%20", which some servers answer differently
+        pairs = [
+            pair for pair in parts.query.split("&")
+            if pair and not is_tracking_param(unquote_plus(pair.split("=", 1)[0]))
+        ]
+        pairs.sort(key=lambda pair: pair.split("=", 1)[0])
+        query = "&".join(_normalize_percent_encoding(pair, _QUERY_SAFE) for pair in pairs)
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+# ── Trap detection ───────────────────────────────────────────────────────────
+
+def _has_repeating_segments(segments) -> bool:
+    # Same segment many times anywhere: /a/b/a/c/a/d/a
+    counts = {}
+    for seg in segments:
+        counts[seg] = counts.get(seg, 0) + 1
+        if counts[seg] > MAX_SEGMENT_REPEATS:
+            return True
+
+    # Repeating run at the tail: /x/a/b/a/b/a/b
+    n = len(segments)
+    for period in range(1, 4):
+        span = period * MAX_SEGMENT_REPEATS
+        if n < span:
+            break
+        tail = segments[n - span:]
+        unit = tail[:period]
+        if all(tail[i] == unit[i % period] for i in range(span)):
+            return True
+    return False
+
+
+def _out_of_range_year(year: int) -> bool:
+    now = date.today().year
+    return year > now + 1 or year < now - 30
+
+
+def _outside_window(year: int, month: Optional[int] = None) -> bool:
+    """True when year (/ month) is more than CALENDAR_WINDOW_MONTHS away from today."""
+    today = date.today()
+    if month is None:
+        return abs(year - today.year) * 12 > CALENDAR_WINDOW_MONTHS
+    return abs((year * 12 + month) - (today.year * 12 + today.month)) > CALENDAR_WINDOW_MONTHS
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value and value.isdigit() else None
+
+
+def is_crawler_trap(url: str) -> Optional[str]:
+    """
+    Return a short reason string if `url` looks like a crawler trap,
+    otherwise None.
+    """
+    if len(url) > MAX_URL_LENGTH:
+        return "url too long"
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    segments = [s for s in parts.path.split("/") if s]
+    if len(segments) > MAX_PATH_DEPTH:
+        return "path too deep"
+    if _has_repeating_segments(segments):
+        return "repeating path segments"
+
+    params = parse_qsl(parts.query, keep_blank_values=True)
+
+    # Infinite pagination
+    for key, value in params:
+        k = key.lower()
+        if value.isdigit():
+            if k in _PAGINATION_KEYS and int(value) > MAX_PAGINATION:
+                return "pagination too deep"
+            if k in _OFFSET_KEYS and int(value) > MAX_OFFSET:
+                return "pagination too deep"
+    page_match = _PAGE_PATH_RE.search(parts.path)
+    if page_match and int(page_match.group(1)) > MAX_PAGINATION:
+        return "pagination too deep"
+
+    # Calendars: a calendar-ish URL whose path ends in (or query carries) a
+    # date more than CALENDAR_WINDOW_MONTHS from today — the "next month"
+    # links run forever. Listings near today (/events/2026/10) are real,
+    # and so are dated pages: /events/2024/05/launch-party, /history/1985-01-01-founding.
+    is_calendar = any(_CALENDAR_SEGMENT_RE.match(s) for s in segments) or any(
+        k.lower() in _CALENDAR_KEYS for k, _ in params
+    )
+    if not is_calendar:
+        return None
+    path = parts.path.rstrip("/")
+    for m in _DATE_RE.finditer(path):
+        year, month = int(m.group(1)), int(m.group(2))
+        if _out_of_range_year(year) or (m.end() == len(path) and _outside_window(year, month)):
+            return "calendar"
+    for m in _DATE_RE.finditer(parts.query):
+        if _outside_window(int(m.group(1)), int(m.group(2))):
+            return "calendar"
+    values = {k.lower(): v for k, v in params}
+    year = _int(values.get("year"))
+    if year is not None and _outside_window(year, _int(values.get("month"))):
+        return "calendar"
+
+    return None
@@ -16,6 +16,8 @@ logger = logging.getLogger(__name__)
 
 from urllib.parse import urlparse, urljoin
 
+from web_crawler.url_normalizer import canonicalize_url
+
 
 BLOCKED_EXTENSIONS = (
     ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg",
@@ -31,23 +33,9 @@ BLOCKED_KEYWORDS = (
 
 def normalize_url(url: str) -> str:
     """
-    Normalize URL to avoid duplicates
+    Normalize URL to avoid duplicates (query kept, tracking params removed)
     """
-    if not url:
-        return ""
-        
-    parsed = urlparse(url)
-
-    path = parsed.path.rstrip("/")
-    if not path:
-        path = "/"
-
-    normalized = parsed._replace(
-        fragment="",
-        path=path
-    )
-
-    return normalized.geturl()
+    return canonicalize_url(url)
 
 
 def is_valid_url(url: str, base_origin: str) -> bool:
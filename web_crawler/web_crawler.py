@@ -16,11 +16,18 @@ import threading
 from threading import Semaphore, Thread
 from web_crawler.config import CrawlConfig
 from web_crawler.file_manager import FileManager
-from web_crawler.page_crawler import PageCrawler
+from web_crawler.page_crawler import PageCrawler, persist_bandwidth
 from web_crawler.seo_report import CrawlReportWriter
 from web_crawler.utils import normalize_url
 from web_crawler.map_crawler import map_website
+from web_crawler.robots import RobotsCache, HostThrottle
+from web_crawler.content_dedup import ContentDeduplicator
+from web_crawler.response_cache import ResponseCache
+from web_crawler.bandwidth import BandwidthMeter
+from web_crawler.progress import ProgressReporter
+from web_crawler.url_normalizer import is_crawler_trap
 from web_crawler.search_engine import execute_search_router
+from web_crawler.search_scraper import scrape_search_results, format_scraped_results_markdown
 from urllib.parse import urlparse, parse_qs
 
 logger = logging.getLogger(__name__)
@@ -119,7 +126,61 @@ class WebCrawler:
         self.visited_canonical: Set[str] = set()
         self.failed: Set[str] = set()
         self.all_links: Set[str] = set()
+        self.disallowed: Set[str] = set()
+        self.duplicates: Set[str] = set()
+        self.traps: Set[str] = set()
         self.pages_data: List[Dict] = []
+        self.content_dedup = ContentDeduplicator()
+        self.response_cache: Optional[ResponseCache] = None
+        # Bytes per page / host / proxy tier, for proxy cost reporting
+        self.bandwidth = BandwidthMeter()
+        self.page_crawler.bandwidth = self.bandwidth
+        # Live page counts for /crawler/status (set by the Celery task)
+        self.progress: Optional[ProgressReporter] = None
+
+        # robots.txt rules are compiled once per host and consulted before
+        # any browser is spent on a frontier URL
+        self.robots: Optional[RobotsCache] = (
+            RobotsCache(proxy_for=self._robots_proxy) if config.respect_robots_txt else None
+        )
+        self.host_throttle = HostThrottle(max_delay=config.max_crawl_delay)
+
+    def _record_bandwidth(self, summary: Dict, crawl_id: Optional[str]) -> None:
+        """Add bandwidth totals to the summary and store the counters in the DB."""
+        summary["bandwidth"] = self.bandwidth.summary()
+        persist_bandwidth(crawl_id, self.bandwidth.rows())
+
+    def _map_with_proxy(self, start_url: str, proxy_tier: str) -> Optional[Dict]:
+        """Run map discovery through a pool proxy and report how that proxy did."""
+        proxy_manager = self.page_crawler.proxy_manager
+        host = urlparse(start_url).hostname
+        p_dict = proxy_manager.get_requests_proxies(proxy_tier, host=host)
+        if not p_dict:
+            return None
+        started = perf_counter()
+        map_result = map_website(start_url, proxy_dict=p_dict, bandwidth=self.bandwidth, proxy_tier=proxy_tier)
+        # Judge the proxy by whether it reached the site, not by how many URLs
+        # the site has: a one-page site mapped through a good proxy is a success
+        status = map_result.get("homepage_status")
+        ban = status in {403, 429}
+        proxy_manager.report(
+            p_dict["http"],
+            success=status is not None and status != 407 and not ban,
+            latency=perf_counter() - started,
+            ban=ban,
+            host=host,
+        )
+        return map_result
+
+    def _robots_proxy(self, host: str) -> Optional[Dict]:
+        """Proxy for robots.txt fetches: the BYOP proxy, else the crawl's first pool tier."""
+        if self.config.proxy_server and self.config.proxy:
+            return {"http": self.config.proxy, "https": self.config.proxy}
+        proxy_manager = self.page_crawler.proxy_manager
+        proxy_type = self._initial_proxy_type()
+        if not proxy_manager.has_proxies(proxy_type):
+            return None
+        return proxy_manager.get_requests_proxies(proxy_type, host=host)
 
     def _effective_proxy_mode(self) -> str:
         mode = (self.config.proxy_mode or "auto").strip().lower()
@@ -145,7 +206,8 @@ class WebCrawler:
         enable_seo: bool = False,
         client_id: Optional[str] = None,
         websocket_manager=None,
-        crawl_mode: str = "all"
+        crawl_mode: str = "all",
+        enable_structured: bool = False,
     ) -> Dict:
         """Main crawl orchestration"""
 
@@ -156,7 +218,11 @@ class WebCrawler:
         start_perf = perf_counter()
 
         queue = deque([(start_url, "START")])
-        seen_raw = {start_url}
+        # URLs whose pattern keeps rendering duplicate content wait here
+        low_priority = deque()
+        seen_raw = {start_url, normalize_url(start_url)}
+        # Extracted links are canonical (lower-case host, no default port); compare like with like
+        start_netloc = urlparse(normalize_url(start_url)).netloc
 
         attempted_pages = 0
         successful_pages = 0
@@ -176,16 +242,14 @@ class WebCrawler:
 
             # Step 1: Try without proxy first (as per user's "no proxy first" rule)
             logger.info("  → Attempting map discovery without proxy...")
-            map_result = map_website(start_url, proxy_dict=None)
+            map_result = map_website(start_url, proxy_dict=None, bandwidth=self.bandwidth)
 
             # Step 2: Fallback to proxy if discovery failed (only returned start_url)
             if map_result["total"] <= 1:
                 logger.info("  → Map discovery failed or returned only 1 URL. Retrying with proxy...")
-                p_dict = self.page_crawler.proxy_manager.get_requests_proxies(
-                    self._initial_proxy_type()
-                )
-                if p_dict:
-                    map_result = map_website(start_url, proxy_dict=p_dict)
+                proxied = self._map_with_proxy(start_url, self._initial_proxy_type())
+                if proxied:
+                    map_result = proxied
                 else:
                     logger.warning("  ⚠ No proxy configured for fallback.")
             
@@ -194,9 +258,7 @@ class WebCrawler:
                 and self._effective_proxy_mode() == "auto"
             ):
                 logger.info("Auto mode escalation: retrying map discovery with enhanced proxy.")
-                p_dict_enhanced = self.page_crawler.proxy_manager.get_requests_proxies("enhanced")
-                if p_dict_enhanced:
-                    map_result = map_website(start_url, proxy_dict=p_dict_enhanced)
+                map_result = self._map_with_proxy(start_url, "enhanced") or map_result
 
             elapsed = perf_counter() - start_perf
 
@@ -223,6 +285,7 @@ class WebCrawler:
                 "links_file_path": str(self.config.links_file),
                 "summary_file_path": str(self.config.summary_file),
             }
+            self._record_bandwidth(summary, client_id)
 
             with open(self.config.summary_file, "w", encoding="utf-8") as f:
                 json.dump(summary, f, indent=2)
@@ -240,11 +303,25 @@ class WebCrawler:
             logger.info(f"🔍 Search URL detected. Routing query '{query}' through search engine router...")
             
             search_results = execute_search_router(query, limit=10)
+
+            # Search-then-scrape: fetch the top-N result pages concurrently
+            scraped_results = []
+            if search_results and self.config.search_scrape_results > 0:
+                scraped_results = scrape_search_results(
+                    search_results,
+                    top_n=self.config.search_scrape_results,
+                    config=self.config,
+                    proxy_type=self._effective_proxy_mode(),
+                )
+
             elapsed = perf_counter() - start_perf
             
             if search_results:
                 successful_pages = 1
-                md_content = _format_search_results_markdown(query, search_results)
+                if scraped_results:
+                    md_content = format_scraped_results_markdown(query, scraped_results)
+                else:
+                    md_content = _format_search_results_markdown(query, search_results)
                 html_content = _format_search_results_html(query, search_results)
                 result_links = [r.get("url") for r in search_results if r.get("url")]
                 
@@ -272,16 +349,19 @@ class WebCrawler:
                 # Screenshot: render the HTML in a headless browser
                 if enable_ss:
                     try:
-                        from playwright.sync_api import sync_playwright
-                        screenshot_path = self.config.screenshot_dir / f"search_{query[:50].replace(' ', '_')}.png"
-                        screenshot_path.parent.mkdir(parents=True, exist_ok=True)
-                        with sync_playwright() as p:
-                            browser = p.chromium.launch(headless=True)
+                        from web_crawler.browser_pool import chromium
+                        from web_crawler.screenshot import capture as capture_screenshot
+                        self.config.screenshot_dir.mkdir(parents=True, exist_ok=True)
+                        # Pooled in warm workers; anywhere else the browser is closed afterwards
+                        with chromium() as browser:
                             page = browser.new_page(viewport={"width": 1280, "height": 800})
-                            page.set_content(html_content)
-                            page.wait_for_timeout(500)
-                            page.screenshot(path=str(screenshot_path), full_page=True)
-                            browser.close()
+                            try:
+                                page.set_content(html_content)
+                                screenshot_path = capture_screenshot(
+                                    page, self.config, f"search_{query[:50].replace(' ', '_')}"
+                                ).result()
+                            finally:
+                                page.close()
                         logger.info(f"📸 Search screenshot saved: {screenshot_path}")
                     except Exception as e:
                         logger.warning(f"Screenshot generation failed: {e}")
@@ -339,6 +419,7 @@ class WebCrawler:
                 "time_taken": f"{int(elapsed//60)}m {int(elapsed%60)}s",
                 "crawl_mode": "search",
                 "search_query": query,
+                "results_scraped": sum(1 for r in scraped_results if r.get("markdown")),
                 "markdown_file": result.get("markdown_file", "None"),
                 "links_file_path": str(self.config.links_file),
                 "summary_file_path": str(self.config.summary_file),
@@ -373,7 +454,8 @@ class WebCrawler:
                 client_id=client_id,
                 websocket_manager=websocket_manager,
                 crawl_mode=crawl_mode,
-                proxy_type=self._effective_proxy_mode()
+                proxy_type=self._effective_proxy_mode(),
+                enable_structured=enable_structured,
             )
 
             if result and "error" not in result:
@@ -414,9 +496,11 @@ class WebCrawler:
                 "seo_json": result.get("seo_json", None) if (result and "error" not in result) else None,
                 "seo_md": result.get("seo_md", None) if (result and "error" not in result) else None,
                 "seo_xlsx": result.get("seo_xlsx", None) if (result and "error" not in result) else None,
+                "structured_data": result.get("structured_data", None) if (result and "error" not in result) else None,
                 "links_file_path": str(self.config.links_file),
                 "summary_file_path": str(self.config.summary_file),
             }
+            self._record_bandwidth(summary, client_id)
 
             with open(self.config.summary_file, "w", encoding="utf-8") as f:
                 json.dump(summary, f, indent=2)
@@ -425,6 +509,30 @@ class WebCrawler:
             logger.info(json.dumps(summary, indent=2))
             return summary
 
+        # Full-site crawls fingerprint page content to skip duplicates
+        self.page_crawler.content_dedup = self.content_dedup
+        # Static sub-resources are fetched once per crawl, not once per page
+        if self.config.response_cache_mb > 0:
+            self.response_cache = ResponseCache(
+                max_bytes=self.config.response_cache_mb * 1024 * 1024,
+                disk_dir=self.config.response_cache_dir if self.config.response_cache_disk else None,
+            )
+        self.page_crawler.response_cache = self.response_cache
+
+        def report_progress(force: bool = False):
+            # Throttled inside the reporter; the due() check keeps the lock off the hot path
+            if not self.progress or not (force or self.progress.due()):
+                return
+            with lock:
+                counts = dict(
+                    pages_done=successful_pages,
+                    pages_failed=len(self.failed),
+                    pages_skipped=len(self.duplicates) + len(self.disallowed) + len(self.traps),
+                    pages_queued=len(queue) + len(low_priority),
+                    pages_in_flight=self.config.max_workers - semaphore._value,
+                )
+            self.progress.update(bytes=self.bandwidth.total_bytes(), force=force, **counts)
+
         # =========================================================
         # WORKER FUNCTION
         # =========================================================
@@ -444,7 +552,8 @@ class WebCrawler:
                     client_id,
                     websocket_manager,
                     crawl_mode=crawl_mode,
-                    proxy_type=proxy_type
+                    proxy_type=proxy_type,
+                    enable_structured=enable_structured,
                 )
 
                 if not result or "error" in result:
@@ -454,19 +563,24 @@ class WebCrawler:
                     return
 
                 canonical = result["canonical"]
+                # Duplicate content produces no outputs, but its links are still followed
+                duplicate = bool(result.get("duplicate_of"))
 
                 with lock:
-                    if canonical in self.visited_canonical:
+                    if duplicate:
+                        self.duplicates.add(url)
+                    elif canonical in self.visited_canonical:
                         logger.info(f"Skipping duplicate canonical: {canonical}")
                         return
+                    else:
+                        self.visited_canonical.add(canonical)
+                        successful_pages += 1
 
-                    self.visited_canonical.add(canonical)
-                    successful_pages += 1
+                        if enable_json:
+                            self.pages_data.append(result)
 
-                    if enable_json:
-                        self.pages_data.append(result)
-
-                logger.info(f"✓ Success [{successful_pages}]: {canonical}")
+                if not duplicate:
+                    logger.info(f"✓ Success [{successful_pages}]: {canonical}")
 
                 if crawl_mode == "all":
                     for link in result["links"]:
@@ -476,25 +590,56 @@ class WebCrawler:
                             seen_raw.add(link)
                             self.all_links.add(link)
 
-                            if urlparse(link).netloc == urlparse(start_url).netloc:
-                                queue.append((link, url))
+                            if urlparse(link).netloc == start_netloc:
+                                trap = is_crawler_trap(link)
+                                if trap:
+                                    logger.debug(f"Skipping crawler trap ({trap}): {link}")
+                                    self.traps.add(link)
+                                elif self.content_dedup.is_noisy(link):
+                                    low_priority.append((link, url))
+                                else:
+                                    queue.append((link, url))
 
             finally:
                 semaphore.release()
+                report_progress()
 
         # =========================================================
         # MAIN SEMAPHORE-BASED CRAWL LOOP
         # =========================================================
-        while (queue or semaphore._value < self.config.max_workers) and attempted_pages < max_pages:
-
-            if queue:
-                url, source = queue.popleft()
+        while (queue or low_priority or semaphore._value < self.config.max_workers) and attempted_pages < max_pages:
+
+            if queue or low_priority:
+                if queue:
+                    url, source = queue.popleft()
+                    # Pattern turned noisy after this URL was queued — demote it
+                    if self.content_dedup.is_noisy(url):
+                        low_priority.append((url, source))
+                        continue
+                else:
+                    url, source = low_priority.popleft()
                 url = normalize_url(url)
 
                 with lock:
                     if url in self.visited:
                         continue
                     self.visited.add(url)
+
+                # The start URL was explicitly requested — only discovered links are filtered
+                if self.robots and source != "START":
+                    if not self.robots.is_allowed(url):
+                        logger.info(f"🤖 Disallowed by robots.txt, skipping: {url}")
+                        self.disallowed.add(url)
+                        continue
+
+                if self.robots:
+                    self.host_throttle.set_delay(url, self.robots.crawl_delay(url))
+                    wait = self.host_throttle.reserve(url)
+                    if wait > 0:
+                        logger.debug(f"Crawl-delay: waiting {wait:.2f}s before {url}")
+                        threading.Event().wait(wait)
+
+                with lock:
                     attempted_pages += 1
                     page_no = attempted_pages
 
@@ -512,6 +657,7 @@ class WebCrawler:
 
             else:
                 # Workers are still running, wait for them to enqueue links
+                report_progress()
                 threading.Event().wait(0.05)
 
 
@@ -560,12 +706,21 @@ class WebCrawler:
             "pages_attempted": attempted_pages,
             "pages_crawled": successful_pages,
             "pages_failed": len(self.failed),
+            "pages_disallowed": len(self.disallowed),
+            "pages_duplicate": len(self.duplicates),
+            "pages_trapped": len(self.traps),
             "total_links_found": len(self.all_links),
             "started_at": start_time.strftime("%Y-%m-%d %H:%M:%S %Z"),
             "time_taken": f"{int(elapsed//60)}m {int(elapsed%60)}s",
             "links_file_path": str(self.config.links_file),
             "summary_file_path": str(self.config.summary_file),
         }
+        if enable_structured:
+            summary["structured_file_path"] = str(self.config.structured_file)
+        if self.response_cache:
+            summary["response_cache"] = self.response_cache.stats()
+            self.response_cache.close()
+        self._record_bandwidth(summary, client_id)
 
         with open(self.config.summary_file, "w", encoding="utf-8") as f:
             json.dump(summary, f, indent=2)
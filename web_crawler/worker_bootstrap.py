@@ -0,0 +1,214 @@
+"""
+Celery worker bootstrap — pay cold-start costs once per child process,
+not once per task.
+
+Loaded by the worker through celery_config's `include`, so these signal
+handlers are connected before the pool forks:
+
+  - module import    → heavy modules (Playwright, BeautifulSoup, lxml,
+                       html2text, openpyxl, stealth plugin, crawler modules)
+                       are imported in the parent and inherited by every child
+  - worker_process_init → each prefork child starts its Playwright driver
+                       and the stealth Chromium from browser_pool, so the
+                       first page of a single / links crawl finds a warm browser
+  - readiness        → the child registers itself in the Redis hash
+                       "celery:workers:ready" ({hostname}:{pid} → warm-up
+                       stats) and removes itself on shutdown; WORKER_READY_FILE,
+                       when set, is touched once the first child is warm
+                       (for container readiness probes)
+  - heartbeat        → a daemon thread in each child refreshes its score
+                       (last beat) in the sorted set "celery:workers:heartbeat"
+                       and in "celery:workers:heartbeat:{queue}" for every
+                       queue its worker consumes (-Q), so the scheduler can
+                       size each queue separately, every
+                       WORKER_HEARTBEAT_INTERVAL seconds. Children killed
+                       without a clean shutdown (time limit, SIGKILL, OOM, lost
+                       host) stop beating and count as gone after
+                       WORKER_READY_TTL; stale entries are pruned from all
+                       these keys by the surviving children
+
+WORKER_PREWARM_BROWSER=false skips the browser launch (imports still
+happen). Only prefork children are pre-warmed; the solo pool falls back
+to launching browsers per page as before.
+"""
+
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from celery.signals import worker_process_init, worker_process_shutdown
+
+logger = logging.getLogger(__name__)
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+PREWARM_BROWSER = os.getenv("WORKER_PREWARM_BROWSER", "true").strip().lower() in {"1", "true", "yes", "on"}
+READY_FILE = os.getenv("WORKER_READY_FILE", "")
+READY_KEY = "celery:workers:ready"
+HEARTBEAT_KEY = "celery:workers:heartbeat"
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "15"))
+READY_TTL = float(os.getenv("WORKER_READY_TTL", "60"))
+
+_HEAVY_MODULES = (
+    "playwright.sync_api",
+    "playwright_stealth",
+    "bs4",
+    "lxml.html",
+    "html2text",
+    "openpyxl",
+    "web_crawler.crawler",
+    "web_crawler.page_crawler",
+    "web_crawler.map_crawler",
+    "web_crawler.seo_report",
+)
+
+
+def preload_modules() -> float:
+    """Import the heavy modules tasks would otherwise import lazily; returns seconds taken."""
+    started = time.perf_counter()
+    for name in _HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Worker preload: could not import {name}: {e}")
+    return time.perf_counter() - started
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def queue_heartbeat_key(queue: str) -> str:
+    return f"{HEARTBEAT_KEY}:{queue}"
+
+
+def _queues(consumed: bool) -> list:
+    """Queues this worker consumes (-Q, selected before the pool forks), or all declared ones."""
+    from web_crawler.celery_config import celery_app
+    queues = celery_app.amqp.queues
+    return sorted(queues.consume_from if consumed else queues)
+
+
+def _beat(pipe, queues: list) -> None:
+    now = time.time()
+    pipe.zadd(HEARTBEAT_KEY, {_worker_id(): now})
+    for queue in queues:
+        pipe.zadd(queue_heartbeat_key(queue), {_worker_id(): now})
+
+
+def _redis_client():
+    import redis
+    return redis.Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        decode_responses=True,
+        socket_timeout=1,
+        socket_connect_timeout=1,
+    )
+
+
+def _mark_ready(stats: dict) -> None:
+    try:
+        pipe = _redis_client().pipeline()
+        pipe.hset(READY_KEY, _worker_id(), json.dumps(stats))
+        _beat(pipe, stats.get("queues", []))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Worker readiness could not be published: {e}")
+    if READY_FILE:
+        try:
+            Path(READY_FILE).touch()
+        except OSError as e:
+            logger.warning(f"Could not touch {READY_FILE}: {e}")
+
+
+def prune_dead(client) -> int:
+    """Drop children whose heartbeat is older than READY_TTL; returns how many."""
+    cutoff = time.time() - READY_TTL
+    stale = client.zrangebyscore(HEARTBEAT_KEY, "-inf", cutoff)
+    if stale:
+        pipe = client.pipeline()
+        pipe.zrem(HEARTBEAT_KEY, *stale)
+        pipe.hdel(READY_KEY, *stale)
+        for queue in _queues(consumed=False):
+            pipe.zremrangebyscore(queue_heartbeat_key(queue), "-inf", cutoff)
+        pipe.execute()
+    return len(stale)
+
+
+def ready_workers() -> dict:
+    """Warm, live worker children registered in Redis ({hostname}:{pid} → stats)."""
+    client = _redis_client()
+    prune_dead(client)
+    return {k: json.loads(v) for k, v in client.hgetall(READY_KEY).items()}
+
+
+_heartbeat_stop = threading.Event()
+
+
+def _heartbeat(queues: list) -> None:
+    while not _heartbeat_stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            client = _redis_client()
+            pipe = client.pipeline()
+            _beat(pipe, queues)
+            pipe.execute()
+            prune_dead(client)
+        except Exception as e:
+            logger.debug(f"Worker heartbeat failed: {e}")
+
+
+# ── Signal handlers ──────────────────────────────────────────────────────────
+
+@worker_process_init.connect
+def _init_child(**kwargs) -> None:
+    stats = {"pid": os.getpid(), "started_at": time.time(), "browser": False}
+    try:
+        stats["queues"] = _queues(consumed=True)
+    except Exception as e:
+        logger.warning(f"Worker queues unknown, capacity is not counted per queue: {e}")
+        stats["queues"] = []
+    stats["import_s"] = round(preload_modules(), 3)
+
+    if PREWARM_BROWSER:
+        try:
+            from web_crawler.browser_pool import prewarm
+            stats["browser_s"] = round(prewarm(headless=True), 3)
+            stats["browser"] = True
+        except Exception as e:
+            # A child without a warm browser still works — pages launch cold
+            logger.warning(f"Worker browser prewarm failed: {e}")
+
+    logger.info(f"Worker child {os.getpid()} warm: {stats}")
+    _mark_ready(stats)
+    _heartbeat_stop.clear()
+    threading.Thread(
+        target=_heartbeat, args=(stats["queues"],), name="worker-heartbeat", daemon=True
+    ).start()
+
+
+@worker_process_shutdown.connect
+def _shutdown_child(**kwargs) -> None:
+    _heartbeat_stop.set()
+    try:
+        pipe = _redis_client().pipeline()
+        pipe.hdel(READY_KEY, _worker_id())
+        pipe.zrem(HEARTBEAT_KEY, _worker_id())
+        for queue in _queues(consumed=False):
+            pipe.zrem(queue_heartbeat_key(queue), _worker_id())
+        pipe.execute()
+    except Exception:
+        pass
+    try:
+        from web_crawler.browser_pool import close_thread_browsers
+        close_thread_browsers()
+    except Exception:
+        pass
+
+
+# Parent process: import once, children inherit the loaded modules on fork
+preload_modules()